@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from lagrtools.compression import CODEC_EXTS, available_codecs
+from lagrtools.funcs       import (
+    construct_merged_graph, load_merged_graph, save_merged_graph
+)
+from lagrtools.graph       import load_single_graph_from_dict
+from lagrtools.intersect   import graph_intersection
+from lagrtools.synthetic   import generate_cluster_pair
+
+CODEC_SPECS = [
+    'none', 'zlib:1', 'zlib:6', 'zlib:9', 'lz4', 'lz4:9',
+    'zstd:1', 'zstd:3', 'zstd:9',
+]
+
+def generate_merged_graphs(n_graphs, edge_density, seed):
+    rng    = np.random.default_rng(seed)
+    result = []
+
+    for _ in range(n_graphs):
+        cluster_img, cluster_tru = generate_cluster_pair(
+            rng, edge_density = edge_density
+        )
+
+        graph_img = load_single_graph_from_dict(cluster_img)
+        graph_tru = load_single_graph_from_dict(cluster_tru)
+
+        graph_img, graph_tru = graph_intersection(graph_img, graph_tru)
+        result.append(construct_merged_graph(graph_img, graph_tru))
+
+    return result
+
+def benchmark_codec(codec, graphs, outdir, n_repeats):
+    paths = [
+        os.path.join(outdir, f'graph_{idx}.npz') for idx in range(len(graphs))
+    ]
+
+    encode_time = np.inf
+    decode_time = np.inf
+
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        for (path, graph) in zip(paths, graphs):
+            save_merged_graph(path, graph, codec)
+        encode_time = min(encode_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for path in paths:
+            load_merged_graph(path)
+        decode_time = min(decode_time, time.perf_counter() - start)
+
+    raw_bytes  = sum(v.nbytes for graph in graphs for v in graph.values())
+    disk_bytes = sum(os.path.getsize(path) for path in paths)
+
+    return {
+        'raw_bytes'   : raw_bytes,
+        'disk_bytes'  : disk_bytes,
+        'ratio'       : raw_bytes / disk_bytes,
+        'encode_MBps' : raw_bytes / encode_time / 1e6,
+        'decode_MBps' : raw_bytes / decode_time / 1e6,
+    }
+
+def parse_cmdargs():
+    parser = argparse.ArgumentParser(
+        "Benchmark compression codecs of merged graphs"
+    )
+
+    parser.add_argument(
+        '-n', '--n-graphs',
+        default = 50,
+        dest    = 'n_graphs',
+        help    = 'Number of synthetic graphs',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--edge-density',
+        default = 2.0,
+        dest    = 'edge_density',
+        help    = 'Number of edges per source node',
+        type    = float,
+    )
+
+    parser.add_argument(
+        '--repeats',
+        default = 3,
+        dest    = 'repeats',
+        help    = 'Number of repetitions. Best time is reported',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--seed',
+        default = 0,
+        dest    = 'seed',
+        help    = 'Random seed',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--output',
+        default = None,
+        dest    = 'output',
+        help    = 'Save results as JSON to this path',
+        type    = str,
+    )
+
+    return parser.parse_args()
+
+def main():
+    cmdargs = parse_cmdargs()
+    codecs  = available_codecs()
+
+    graphs = generate_merged_graphs(
+        cmdargs.n_graphs, cmdargs.edge_density, cmdargs.seed
+    )
+    results = {}
+
+    print(
+        f"{'codec':>8} {'disk, MB':>10} {'ratio':>6}"
+        f" {'encode, MB/s':>13} {'decode, MB/s':>13}"
+    )
+
+    for spec in CODEC_SPECS:
+        name = spec.partition(':')[0]
+
+        if (name in CODEC_EXTS) and (name not in codecs):
+            print(f'{spec:>8} is not available. Skipping...')
+            continue
+
+        with tempfile.TemporaryDirectory() as outdir:
+            stats = benchmark_codec(spec, graphs, outdir, cmdargs.repeats)
+
+        results[spec] = stats
+
+        print(
+            f"{spec:>8} {stats['disk_bytes'] / 1e6:10.2f}"
+            f" {stats['ratio']:6.2f} {stats['encode_MBps']:13.1f}"
+            f" {stats['decode_MBps']:13.1f}"
+        )
+
+    if cmdargs.output is not None:
+        with open(cmdargs.output, 'wt', encoding = 'utf-8') as f:
+            json.dump(results, f, sort_keys = True, indent = 4)
+
+if __name__ == '__main__':
+    main()
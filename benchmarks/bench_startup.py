@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from lagrtools.cli import COMMANDS
+
+# Startup time of each `lagrtools` command (`lagrtools COMMAND --help`) and
+# of the package imports, measured in fresh interpreters. The interpreter
+# startup itself is reported as 'python'.
+
+IMPORTS = {
+    'python'                 : 'pass',
+    'import lagrtools.torch' : 'import lagrtools.torch',
+}
+
+def get_startup_commands():
+    result = {
+        name : [ sys.executable, '-c', code ]
+            for (name, code) in IMPORTS.items()
+    }
+
+    for name in COMMANDS:
+        result[f'lagrtools {name}'] = [
+            sys.executable, '-m', 'lagrtools', name, '--help'
+        ]
+
+    return result
+
+def time_command(command, n_repeats):
+    result = []
+
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            command, check = True, stdout = subprocess.DEVNULL,
+            stderr = subprocess.DEVNULL
+        )
+        result.append(time.perf_counter() - start)
+
+    return result
+
+def parse_cmdargs():
+    parser = argparse.ArgumentParser(
+        "Benchmark startup time of lagrtools commands"
+    )
+
+    parser.add_argument(
+        '--repeats',
+        default = 10,
+        dest    = 'repeats',
+        help    = 'Number of runs of each command',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--output',
+        default = None,
+        dest    = 'output',
+        help    = 'Save results as JSON to this path',
+        type    = str,
+    )
+
+    return parser.parse_args()
+
+def main():
+    cmdargs = parse_cmdargs()
+    results = {}
+
+    print(f"{'command':>24} {'best, ms':>10} {'median, ms':>11}")
+
+    for (name, command) in get_startup_commands().items():
+        times = time_command(command, cmdargs.repeats)
+
+        results[name] = {
+            'best_s'   : float(np.min(times)),
+            'median_s' : float(np.median(times)),
+        }
+
+        print(
+            f'{name:>24} {np.min(times) * 1e3:10.1f}'
+            f' {np.median(times) * 1e3:11.1f}'
+        )
+
+    if cmdargs.output is not None:
+        with open(cmdargs.output, 'wt', encoding = 'utf-8') as f:
+            json.dump(results, f, sort_keys = True, indent = 4)
+
+if __name__ == '__main__':
+    main()
+
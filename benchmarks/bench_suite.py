@@ -0,0 +1,529 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from lagrtools.funcs     import (
+    construct_merged_graph, load_merged_graph, parse_features_config,
+    save_merged_graph
+)
+from lagrtools.graph     import load_single_graph_from_dict
+from lagrtools.intersect import graph_intersection
+from lagrtools.synthetic import (
+    NODE_COUNTS, generate_cluster_pair, write_raw_files
+)
+
+try:
+    from lagrtools.torch import LAGRDataset, LAGRStreamingDataset
+except ImportError:
+    LAGRDataset          = None  # pylint: disable=invalid-name
+    LAGRStreamingDataset = None  # pylint: disable=invalid-name
+
+# Benchmarks of the main processing steps on synthetic Wire-Cell graphs.
+#
+# Each benchmark reports the time per graph (best and median of several
+# rounds). Results are saved as JSON together with the commit they were
+# measured at, and can be compared against the results of another commit
+# with `--compare`.
+
+REPO_ROOT      = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREPROCESS     = os.path.join(REPO_ROOT, 'scripts', 'preprocess')
+DEFAULT_CONFIG = os.path.join(
+    REPO_ROOT, 'examples', 'preprocess_configs', 'simple.toml'
+)
+
+# Minimum duration of a round. Fast functions are called several times per
+# round to reduce the timer overhead.
+MIN_ROUND_TIME = 0.05
+
+class Fixtures:
+    # pylint: disable=too-few-public-methods
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, cmdargs, workdir):
+        rng = np.random.default_rng(cmdargs.seed)
+
+        self.config_path = cmdargs.config
+        self.workers     = cmdargs.workers
+
+        self.config_img, self.config_tru \
+            = parse_features_config(cmdargs.config)
+        self.node_counts = {
+            name : max(int(round(n * cmdargs.scale)), 1)
+                for (name, n) in NODE_COUNTS.items()
+        }
+
+        self.clusters = [
+            generate_cluster_pair(
+                rng, self.node_counts, cmdargs.edge_density, cmdargs.overlap
+            )
+            for _ in range(cmdargs.n_graphs)
+        ]
+
+        self.graphs = [
+            (
+                load_single_graph_from_dict(cluster_img, self.config_img),
+                load_single_graph_from_dict(cluster_tru, self.config_tru),
+            )
+            for (cluster_img, cluster_tru) in self.clusters
+        ]
+
+        self.merged_graphs = [
+            construct_merged_graph(*graph_intersection(g_img, g_tru))
+                for (g_img, g_tru) in self.graphs
+        ]
+
+        self.masks = [
+            {
+                name : (rng.random(len(nodes)) < cmdargs.overlap)
+                    for (name, nodes) in g_img.nodes_dict.items()
+            }
+            for (g_img, _g_tru) in self.graphs
+        ]
+
+        self.workdir = workdir
+        self.rawdir  = os.path.join(workdir, 'raw')
+        self.outdir  = os.path.join(workdir, 'preprocessed')
+
+        write_raw_files(
+            self.rawdir, rng, cmdargs.n_files, cmdargs.clusters_per_file,
+            self.node_counts, cmdargs.edge_density, cmdargs.overlap
+        )
+
+        self.n_raw_graphs = cmdargs.n_files * cmdargs.clusters_per_file
+        self.raw_bytes    = sum(
+            os.path.getsize(os.path.join(self.rawdir, fname))
+                for fname in os.listdir(self.rawdir)
+        )
+
+def time_func(func, n_rounds):
+    # Returns times of `n_rounds` rounds, per call of `func`
+    number = 1
+
+    while True:
+        start   = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+
+        if elapsed >= MIN_ROUND_TIME:
+            break
+
+        number *= 2
+
+    result = [ elapsed / number ]
+
+    for _ in range(n_rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        result.append((time.perf_counter() - start) / number)
+
+    return (result, number)
+
+def bench_load_single_graph(fixtures):
+    def func():
+        for (cluster_img, cluster_tru) in fixtures.clusters:
+            load_single_graph_from_dict(cluster_img, fixtures.config_img)
+            load_single_graph_from_dict(cluster_tru, fixtures.config_tru)
+
+    return (func, len(fixtures.clusters))
+
+def bench_graph_intersection(fixtures):
+    def func():
+        for (g_img, g_tru) in fixtures.graphs:
+            graph_intersection(g_img, g_tru)
+
+    return (func, len(fixtures.graphs))
+
+def bench_graph_filter(fixtures):
+    def func():
+        for ((g_img, _g_tru), masks) in zip(fixtures.graphs, fixtures.masks):
+            g_img.filter(masks)
+
+    return (func, len(fixtures.graphs))
+
+def bench_graph_filter_partial(fixtures):
+    # Only `bnodes`, that appear in most edge types, are filtered
+    def func():
+        for ((g_img, _g_tru), masks) in zip(fixtures.graphs, fixtures.masks):
+            g_img.filter({ 'bnodes' : masks['bnodes'] })
+
+    return (func, len(fixtures.graphs))
+
+def bench_edges_filter(fixtures):
+    def func():
+        for ((g_img, _g_tru), masks) in zip(fixtures.graphs, fixtures.masks):
+            for ((src, dst), edges) in g_img.edges_dict.items():
+                edges.filter(masks[src], masks[dst])
+
+    return (func, len(fixtures.graphs))
+
+def bench_save_merged_graph(fixtures):
+    paths = [
+        os.path.join(fixtures.workdir, f'graph_{idx}.npz')
+            for idx in range(len(fixtures.merged_graphs))
+    ]
+
+    def func():
+        for (path, graph) in zip(paths, fixtures.merged_graphs):
+            save_merged_graph(path, graph)
+
+    return (func, len(paths))
+
+def bench_load_merged_graph(fixtures):
+    paths = [
+        os.path.join(fixtures.workdir, f'graph_{idx}.npz')
+            for idx in range(len(fixtures.merged_graphs))
+    ]
+
+    for (path, graph) in zip(paths, fixtures.merged_graphs):
+        save_merged_graph(path, graph)
+
+    def func():
+        for path in paths:
+            load_merged_graph(path)
+
+    return (func, len(paths))
+
+def run_preprocess(fixtures, outdir, workers):
+    cmd = [
+        sys.executable, PREPROCESS, fixtures.rawdir, outdir,
+        '--config', fixtures.config_path,
+    ]
+
+    if workers is not None:
+        cmd += [ '--workers', str(workers) ]
+
+    subprocess.run(cmd, check = True, capture_output = True)
+
+def bench_preprocess(fixtures):
+    # End-to-end run of `scripts/preprocess`, including the startup
+    counter = [ 0 ]
+
+    def func():
+        counter[0] += 1
+        outdir = os.path.join(fixtures.workdir, f'preprocess_{counter[0]}')
+        run_preprocess(fixtures, outdir, fixtures.workers)
+
+    return (func, fixtures.n_raw_graphs)
+
+def bench_dataset_init(fixtures):
+    # Opening the dataset (index or directory listing), per graph
+    if LAGRDataset is None:
+        return None
+
+    if not os.path.exists(fixtures.outdir):
+        run_preprocess(fixtures, fixtures.outdir, fixtures.workers)
+
+    n_graphs = len(LAGRDataset(fixtures.outdir))
+
+    def func():
+        _ = LAGRDataset(fixtures.outdir)
+
+    return (func, n_graphs)
+
+def bench_dataset_getitem(fixtures):
+    if LAGRDataset is None:
+        return None
+
+    if not os.path.exists(fixtures.outdir):
+        run_preprocess(fixtures, fixtures.outdir, fixtures.workers)
+
+    dataset = LAGRDataset(fixtures.outdir)
+
+    def func():
+        for idx in range(len(dataset)):
+            _ = dataset[idx]
+
+    return (func, len(dataset))
+
+def bench_dataset_stream(fixtures):
+    if LAGRStreamingDataset is None:
+        return None
+
+    if not os.path.exists(fixtures.outdir):
+        run_preprocess(fixtures, fixtures.outdir, fixtures.workers)
+
+    dataset = LAGRStreamingDataset(fixtures.outdir)
+
+    def func():
+        for _ in dataset:
+            pass
+
+    return (func, len(dataset))
+
+BENCHMARKS = {
+    'load_single_graph'    : bench_load_single_graph,
+    'graph_intersection'   : bench_graph_intersection,
+    'graph_filter'         : bench_graph_filter,
+    'graph_filter_partial' : bench_graph_filter_partial,
+    'edges_filter'         : bench_edges_filter,
+    'save_merged_graph'    : bench_save_merged_graph,
+    'load_merged_graph'    : bench_load_merged_graph,
+    'dataset_init'         : bench_dataset_init,
+    'dataset_getitem'      : bench_dataset_getitem,
+    'dataset_stream'       : bench_dataset_stream,
+    'preprocess'           : bench_preprocess,
+}
+
+def get_commit():
+    try:
+        result = subprocess.run(
+            [ 'git', 'rev-parse', 'HEAD' ], cwd = REPO_ROOT, check = True,
+            capture_output = True, text = True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return result.stdout.strip()
+
+def get_environment():
+    return {
+        'commit'   : get_commit(),
+        'python'   : platform.python_version(),
+        'numpy'    : np.__version__,
+        'machine'  : platform.machine(),
+        'cpu_count' : os.cpu_count(),
+    }
+
+def run_benchmarks(cmdargs):
+    results = {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print("Generating synthetic graphs...")
+        fixtures = Fixtures(cmdargs, workdir)
+
+        print(
+            f"{'benchmark':>20} {'best, ms':>10} {'median, ms':>11}"
+            f" {'graphs/s':>10}"
+        )
+
+        for (name, setup) in BENCHMARKS.items():
+            if (cmdargs.filter is not None) and (cmdargs.filter not in name):
+                continue
+
+            bench = setup(fixtures)
+
+            if bench is None:
+                print(f'{name:>20} is not available. Skipping...')
+                continue
+
+            func, n_graphs = bench
+            n_rounds       = (
+                cmdargs.preprocess_repeats if name == 'preprocess'
+                else cmdargs.repeats
+            )
+            times, number  = time_func(func, n_rounds)
+            per_graph      = np.array(times) / n_graphs
+
+            results[name] = {
+                'best_s'       : float(np.min(per_graph)),
+                'median_s'     : float(np.median(per_graph)),
+                'graphs_per_s' : float(1 / np.min(per_graph)),
+                'n_graphs'     : n_graphs,
+                'rounds'       : n_rounds,
+                'number'       : number,
+            }
+
+            if name == 'preprocess':
+                results[name]['input_MBps'] = (
+                    fixtures.raw_bytes / (np.min(times) * 1e6)
+                )
+
+            print(
+                f"{name:>20} {np.min(per_graph) * 1e3:10.3f}"
+                f" {np.median(per_graph) * 1e3:11.3f}"
+                f" {1 / np.min(per_graph):10.1f}"
+            )
+
+    return results
+
+def compare_results(results, baseline, threshold):
+    # Returns names of benchmarks, that are slower than `threshold` times
+    # the baseline
+    regressions = []
+
+    print(f"\n{'benchmark':>20} {'baseline, ms':>13} {'ms':>10} {'ratio':>7}")
+
+    for (name, stats) in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = stats['median_s'] / baseline[name]['median_s']
+        flag  = ''
+
+        if ratio > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+
+        print(
+            f"{name:>20} {baseline[name]['median_s'] * 1e3:13.3f}"
+            f" {stats['median_s'] * 1e3:10.3f} {ratio:7.2f}{flag}"
+        )
+
+    return regressions
+
+def parse_cmdargs():
+    parser = argparse.ArgumentParser(
+        "Benchmark processing of synthetic Wire-Cell graphs"
+    )
+
+    parser.add_argument(
+        '-n', '--n-graphs',
+        default = 20,
+        dest    = 'n_graphs',
+        help    = 'Number of synthetic graphs for in-memory benchmarks',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--n-files',
+        default = 4,
+        dest    = 'n_files',
+        help    = 'Number of raw file pairs for the preprocessing benchmark',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--clusters-per-file',
+        default = 8,
+        dest    = 'clusters_per_file',
+        help    = 'Number of clusters in each raw file',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--scale',
+        default = 1.0,
+        dest    = 'scale',
+        help    = 'Multiplier of the default node counts of each type',
+        type    = float,
+    )
+
+    parser.add_argument(
+        '--edge-density',
+        default = 2.0,
+        dest    = 'edge_density',
+        help    = 'Number of edges per source node',
+        type    = float,
+    )
+
+    parser.add_argument(
+        '--overlap',
+        default = 0.9,
+        dest    = 'overlap',
+        help    = 'Fraction of img nodes that are present in tru graphs',
+        type    = float,
+    )
+
+    parser.add_argument(
+        '--config',
+        default = DEFAULT_CONFIG,
+        dest    = 'config',
+        help    = 'Features Config',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--workers',
+        default = None,
+        dest    = 'workers',
+        help    = 'Number of preprocessing workers. Default: number of CPUs',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--repeats',
+        default = 5,
+        dest    = 'repeats',
+        help    = 'Number of rounds of each benchmark',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--preprocess-repeats',
+        default = 2,
+        dest    = 'preprocess_repeats',
+        help    = 'Number of rounds of the end-to-end preprocessing',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--filter',
+        default = None,
+        dest    = 'filter',
+        help    = 'Run only benchmarks, whose names contain this string',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--seed',
+        default = 0,
+        dest    = 'seed',
+        help    = 'Random seed',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--output',
+        default = None,
+        dest    = 'output',
+        help    = 'Save results as JSON to this path',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--compare',
+        default = None,
+        dest    = 'compare',
+        help    = 'Compare results with a JSON file of an earlier run',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--threshold',
+        default = 1.1,
+        dest    = 'threshold',
+        help    = 'Slowdown ratio, that is reported as a regression',
+        type    = float,
+    )
+
+    return parser.parse_args()
+
+def main():
+    cmdargs = parse_cmdargs()
+    results = run_benchmarks(cmdargs)
+
+    if cmdargs.output is not None:
+        output = {
+            'environment' : get_environment(),
+            'parameters'  : vars(cmdargs),
+            'results'     : results,
+        }
+
+        with open(cmdargs.output, 'wt', encoding = 'utf-8') as f:
+            json.dump(output, f, sort_keys = True, indent = 4)
+
+    if cmdargs.compare is not None:
+        with open(cmdargs.compare, 'rt', encoding = 'utf-8') as f:
+            baseline = json.load(f)
+
+        regressions = compare_results(
+            results, baseline['results'], cmdargs.threshold
+        )
+
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
+
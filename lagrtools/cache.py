@@ -0,0 +1,282 @@
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Dict, Optional
+
+import numpy as np
+
+from .funcs import MergedGraph, get_stored_arrays, parse_stored_arrays
+
+# Graph cache, shared between processes (e.g. `DataLoader` workers).
+#
+# Each cached graph is stored uncompressed in a single file in a shared
+# memory filesystem (/dev/shm). Readers memory-map these files, so all the
+# processes share a single copy of the data and no decoding is needed.
+#
+# The LRU table and the counters live in a memory-mapped file as well, and
+# are updated under an exclusive `flock`. Evicted files are unlinked: the
+# processes that still have them mapped keep valid views.
+
+ALIGNMENT = 64
+SHM_ROOT  = '/dev/shm'
+
+# Columns of the table of cached items
+ITEM_NBYTES = 0
+ITEM_TICK   = 1
+
+# Counters
+COUNTERS = ( 'tick', 'nbytes', 'items', 'hits', 'misses', 'evictions' )
+COUNTER_IDX = { name : idx for (idx, name) in enumerate(COUNTERS) }
+
+def align(offset : int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_graph_blob(path : str, graph : MergedGraph) -> int:
+    # Layout: [ header size : u8 ] [ json header ] [ aligned arrays ... ]
+    # Arrays are kept in the layout of the files (see `get_stored_arrays`)
+    arrays = get_stored_arrays(graph)
+    header = []
+    offset = 0
+
+    for (key, values) in arrays.items():
+        header.append({
+            'key'    : key,
+            'dtype'  : values.dtype.str,
+            'shape'  : list(values.shape),
+            'offset' : offset,
+        })
+        offset = align(offset + values.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start   = align(8 + len(header_bytes))
+
+    with open(path, 'wb') as f:
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+
+        for (item, values) in zip(header, arrays.values()):
+            f.seek(data_start + item['offset'])
+            f.write(np.ascontiguousarray(values).tobytes())
+
+        f.truncate(data_start + offset)
+
+    return data_start + offset
+
+def load_graph_blob(path : str) -> MergedGraph:
+    # Copy-on-write map: in-place modifications stay private to a process
+    buffer = np.memmap(path, dtype = np.uint8, mode = 'c')
+
+    header_size = int(buffer[:8].view(np.uint64)[0])
+    header      = json.loads(buffer[8:8 + header_size].tobytes())
+    data_start  = align(8 + header_size)
+
+    arrays = {}
+
+    for item in header:
+        dtype  = np.dtype(item['dtype'])
+        shape  = tuple(item['shape'])
+        start  = data_start + item['offset']
+        stop   = start + dtype.itemsize * int(np.prod(shape))
+
+        arrays[item['key']] = buffer[start:stop].view(dtype).reshape(shape)
+
+    return parse_stored_arrays(arrays)
+
+def remove_cache_dir(path : str, owner_pid : int) -> None:
+    if os.getpid() == owner_pid:
+        shutil.rmtree(path, ignore_errors = True)
+
+class SharedGraphCache:
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        n_items   : int,
+        max_bytes : int,
+        root      : Optional[str] = None,
+    ) -> None:
+        if root is None:
+            root = SHM_ROOT if os.path.isdir(SHM_ROOT) else None
+
+        self._n_items   = n_items
+        self._max_bytes = max_bytes
+        self._path      = tempfile.mkdtemp(prefix = 'lagr-cache-', dir = root)
+
+        np.lib.format.open_memmap(
+            self._table_path, mode = 'w+', dtype = np.int64,
+            shape = (n_items, 2)
+        ).flush()
+        np.lib.format.open_memmap(
+            self._counters_path, mode = 'w+', dtype = np.int64,
+            shape = (len(COUNTERS), )
+        ).flush()
+
+        with open(self._lock_path, 'wb'):
+            pass
+
+        self._finalizer = weakref.finalize(
+            self, remove_cache_dir, self._path, os.getpid()
+        )
+
+        self._table    = None
+        self._counters = None
+        self._lock_fd  = None
+        self._open_pid = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def _table_path(self) -> str:
+        return os.path.join(self._path, 'table.npy')
+
+    @property
+    def _counters_path(self) -> str:
+        return os.path.join(self._path, 'counters.npy')
+
+    @property
+    def _lock_path(self) -> str:
+        return os.path.join(self._path, 'lock')
+
+    def _item_path(self, index : int) -> str:
+        return os.path.join(self._path, f'{index}.bin')
+
+    def _open(self) -> None:
+        # Opened lazily, s.t. each process has its own lock descriptor.
+        # Forked processes share descriptors, and `flock` would not
+        # exclude them from each other.
+        if self._open_pid == os.getpid():
+            return
+
+        self._table    = np.load(self._table_path,    mmap_mode = 'r+')
+        self._counters = np.load(self._counters_path, mmap_mode = 'r+')
+        self._lock_fd  = os.open(self._lock_path, os.O_RDWR)
+        self._open_pid = os.getpid()
+
+    def _lock(self) -> None:
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+    def _unlock(self) -> None:
+        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _touch(self, index : int) -> None:
+        self._counters[COUNTER_IDX['tick']] += 1
+        self._table[index, ITEM_TICK] = self._counters[COUNTER_IDX['tick']]
+
+    def get(self, index : int) -> Optional[MergedGraph]:
+        self._open()
+        result = None
+
+        if self._table[index, ITEM_NBYTES] > 0:
+            try:
+                result = load_graph_blob(self._item_path(index))
+            except FileNotFoundError:
+                # Evicted by another process
+                result = None
+
+        self._lock()
+        try:
+            if result is None:
+                self._counters[COUNTER_IDX['misses']] += 1
+            else:
+                self._counters[COUNTER_IDX['hits']] += 1
+                self._touch(index)
+        finally:
+            self._unlock()
+
+        return result
+
+    def _evict(self, nbytes : int) -> None:
+        # Evicts least recently used items until `nbytes` more fit
+        cached = np.flatnonzero(self._table[:, ITEM_NBYTES] > 0)
+        cached = cached[np.argsort(self._table[cached, ITEM_TICK])]
+
+        free = self._max_bytes - self._counters[COUNTER_IDX['nbytes']]
+
+        for index in cached:
+            if free >= nbytes:
+                break
+
+            size = int(self._table[index, ITEM_NBYTES])
+
+            try:
+                os.unlink(self._item_path(index))
+            except FileNotFoundError:
+                pass
+
+            self._table[index, ITEM_NBYTES]          = 0
+            self._counters[COUNTER_IDX['nbytes']]    -= size
+            self._counters[COUNTER_IDX['items']]     -= 1
+            self._counters[COUNTER_IDX['evictions']] += 1
+
+            free += size
+
+    def put(self, index : int, graph : MergedGraph) -> bool:
+        self._open()
+
+        if self._table[index, ITEM_NBYTES] > 0:
+            return True
+
+        nbytes = sum(align(v.nbytes) for v in graph.values())
+        if nbytes > self._max_bytes:
+            return False
+
+        path_tmp = self._item_path(index) + f'.{os.getpid()}.tmp'
+        nbytes   = save_graph_blob(path_tmp, graph)
+
+        self._lock()
+        try:
+            if self._table[index, ITEM_NBYTES] > 0:
+                os.unlink(path_tmp)
+                return True
+
+            self._evict(nbytes)
+
+            if self._counters[COUNTER_IDX['nbytes']] + nbytes \
+                    > self._max_bytes:
+                os.unlink(path_tmp)
+                return False
+
+            os.replace(path_tmp, self._item_path(index))
+
+            self._table[index, ITEM_NBYTES]       = nbytes
+            self._counters[COUNTER_IDX['nbytes']] += nbytes
+            self._counters[COUNTER_IDX['items']]  += 1
+            self._touch(index)
+        finally:
+            self._unlock()
+
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        self._open()
+
+        result = {
+            name : int(self._counters[idx])
+                for (name, idx) in COUNTER_IDX.items() if name != 'tick'
+        }
+        result['max_bytes'] = self._max_bytes
+
+        return result
+
+    def close(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        state['_table']     = None
+        state['_counters']  = None
+        state['_lock_fd']   = None
+        state['_open_pid']  = None
+        state['_finalizer'] = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
@@ -0,0 +1,62 @@
+import argparse
+import importlib
+
+# Command line interface: `lagrtools COMMAND [ARGS]`.
+#
+# The module of a command is imported only when the command is run, s.t. the
+# startup of a command does not pay for the imports of the others. Command
+# modules never import torch.
+
+# { command : (module, description) }
+COMMANDS = {
+    'preprocess' : (
+        'lagrtools.cli.preprocess', 'Preprocess raw Wire-Cell graphs'
+    ),
+    'stats'      : (
+        'lagrtools.cli.stats',
+        'Compute feature statistics of a preprocessed dataset'
+    ),
+    'normalize'  : (
+        'lagrtools.cli.normalize',
+        'Normalize node features of a preprocessed dataset'
+    ),
+    'inspect'    : (
+        'lagrtools.cli.inspect_dataset',
+        'Show a summary of a preprocessed dataset'
+    ),
+}
+
+def parse_cmdargs(argv = None):
+    parser = argparse.ArgumentParser(
+        'lagrtools',
+        description     = 'Tools to handle Wire-Cell Graphs',
+        epilog          = 'commands:\n' + '\n'.join(
+            f'  {name:<12}{description}'
+                for (name, (_, description)) in COMMANDS.items()
+        ),
+        formatter_class = argparse.RawDescriptionHelpFormatter,
+    )
+
+    parser.add_argument(
+        'command',
+        choices = list(COMMANDS),
+        help    = 'Command to run',
+        metavar = 'COMMAND',
+        type    = str,
+    )
+
+    parser.add_argument(
+        'args',
+        help    = "Arguments of the command. See 'lagrtools COMMAND --help'",
+        metavar = 'ARGS',
+        nargs   = argparse.REMAINDER,
+    )
+
+    return parser.parse_args(argv)
+
+def main(argv = None):
+    cmdargs = parse_cmdargs(argv)
+    module  = importlib.import_module(COMMANDS[cmdargs.command][0])
+
+    module.main(cmdargs.args, prog = f'lagrtools {cmdargs.command}')
+
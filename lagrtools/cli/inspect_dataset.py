@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+
+from lagrtools.index  import load_dataset_index
+from lagrtools.meta   import load_dataset_meta
+from lagrtools.shards import is_sharded, load_shards_index
+
+# Summary of a preprocessed dataset, from its index and metadata only. Graph
+# files are never opened.
+
+def parse_cmdargs(argv = None, prog = None):
+    parser = argparse.ArgumentParser(
+        prog, description = 'Show a summary of a preprocessed dataset'
+    )
+
+    parser.add_argument(
+        'root',
+        help    = 'Directory where the preprocessed dataset is located',
+        metavar = 'ROOT',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--graph',
+        default = None,
+        dest    = 'graph',
+        help    = 'Print metadata of the graph with this index as JSON',
+        type    = int,
+    )
+
+    return parser.parse_args(argv)
+
+def print_unindexed(root):
+    print('Index    : none (rerun preprocess to create it)')
+
+    if is_sharded(root):
+        shards = load_shards_index(root)
+
+        print('Layout   : shards')
+        print(f'Shards   : {len(shards)}')
+        print(f"Graphs   : {sum(x['size'] for x in shards)}")
+    else:
+        n_files = sum(1 for x in os.listdir(root) if x.endswith('.npz'))
+
+        print('Layout   : files')
+        print(f'Graphs   : {n_files}')
+
+def print_index(index):
+    print(f'Layout   : {index.layout}')
+
+    if index.shards:
+        print(f'Shards   : {len(index.shards)}')
+
+    print(f'Graphs   : {len(index)}')
+    print(f'Checksum : {index.checksum}')
+
+    print('\nFeatures:')
+
+    for (name, features) in sorted(index.features.items()):
+        print(f"  {name:<8} x: {', '.join(features['x']) or '-'}")
+        print(f"  {'':<8} y: {', '.join(features['y']) or '-'}")
+
+    if len(index) == 0:
+        return
+
+    print(f"\n{'counts':>24} {'mean':>10} {'max':>10} {'total':>12}")
+
+    for (key, values) in zip(index.keys, index.counts.T):
+        print(
+            f'{key:>24} {values.mean():10.1f} {values.max():10d}'
+            f' {values.sum():12d}'
+        )
+
+def main(argv = None, prog = None):
+    cmdargs = parse_cmdargs(argv, prog)
+    index   = load_dataset_index(cmdargs.root)
+
+    if cmdargs.graph is not None:
+        if index is None:
+            raise RuntimeError(f"Dataset '{cmdargs.root}' has no index")
+
+        print(json.dumps(index.get_metadata(cmdargs.graph), indent = 4))
+        return
+
+    if index is None:
+        print_unindexed(cmdargs.root)
+    else:
+        print_index(index)
+
+    normalization = load_dataset_meta(cmdargs.root).get('normalization')
+
+    if normalization is not None:
+        print(f"\nNormalized: {normalization['norm_type']}", end = '')
+
+        if not normalization.get('complete', True):
+            print(' (interrupted, see `lagrtools normalize --resume`)')
+        else:
+            print()
+
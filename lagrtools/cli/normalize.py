@@ -0,0 +1,292 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+
+import numpy as np
+
+from lagrtools.compression   import detect_codec
+from lagrtools.funcs         import (
+    load_merged_graph, parse_key, save_merged_graph
+)
+from lagrtools.index         import has_dataset_index, update_dataset_index
+from lagrtools.meta          import load_dataset_meta, update_dataset_meta
+from lagrtools.normalization import (
+    NORM_STATS, NORM_TYPES, check_not_normalized, get_norm_params,
+    load_feature_stats, normalize_values
+)
+from lagrtools.shards        import ShardedGraphs, is_sharded
+
+# In-place normalization can not be repeated, so it is journaled. Each
+# target (a per-cluster file, or a feature array of a shard) is normalized
+# into a temporary file, recorded in NORMALIZE_LOG, and only then moved over
+# the original. An interrupted run is finished with `--resume`, which
+# completes the moves of the recorded targets and normalizes the others.
+
+NORMALIZE_LOG = 'normalize.log'
+
+def get_params(params_dict, key):
+    if key[0] != 'node':
+        return None
+
+    return params_dict.get((key[2], key[1]), None)
+
+def get_tmp_path(path):
+    if path.endswith('.npz'):
+        return path + '.tmp.npz'
+
+    return path + '.tmp'
+
+def collect_targets(root, params_dict):
+    # Returns paths of files (or shard arrays) to normalize, relative to
+    # `root`
+    if not is_sharded(root):
+        return sorted(
+            fname for fname in os.listdir(root)
+                if fname.endswith('.npz') and (not fname.endswith('.tmp.npz'))
+        )
+
+    return [
+        os.path.join(name, fname)
+            for name in ShardedGraphs(root).shard_names
+            for fname in sorted(os.listdir(os.path.join(root, name)))
+            if fname.endswith('.npy') and (
+                get_params(params_dict, parse_key(fname[:-len('.npy')]))
+                    is not None
+            )
+    ]
+
+class NormalizeWorker:
+    # Writes normalized targets to their temporary paths
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, root, params_dict):
+        self._root        = root
+        self._params_dict = params_dict
+
+    def _normalize_array(self, path):
+        fname  = os.path.basename(path)
+        params = get_params(self._params_dict, parse_key(fname[:-len('.npy')]))
+        values = normalize_values(np.load(path), params)
+
+        with open(get_tmp_path(path), 'wb') as f:
+            np.save(f, values)
+
+    def _normalize_file(self, path):
+        codec = detect_codec(path)
+        graph = load_merged_graph(path)
+
+        for (key, values) in graph.items():
+            params = get_params(self._params_dict, key)
+
+            if params is not None:
+                graph[key] = normalize_values(values, params)
+
+        save_merged_graph(get_tmp_path(path), graph, codec)
+
+    def __call__(self, target):
+        path = os.path.join(self._root, target)
+
+        if path.endswith('.npz'):
+            self._normalize_file(path)
+        else:
+            self._normalize_array(path)
+
+        return target
+
+def load_normalize_log(root):
+    path = os.path.join(root, NORMALIZE_LOG)
+
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, 'rt', encoding = 'utf-8') as f:
+        return set(line.rstrip('\n') for line in f)
+
+def recover_targets(root, targets, done):
+    # Finishes the moves of recorded targets, and drops temporary files of
+    # the others
+    for target in targets:
+        path     = os.path.join(root, target)
+        tmp_path = get_tmp_path(path)
+
+        if not os.path.exists(tmp_path):
+            continue
+
+        if target in done:
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+
+def parse_cmdargs(argv = None, prog = None):
+    parser = argparse.ArgumentParser(
+        prog, description = 'Normalize node features of a preprocessed dataset'
+    )
+
+    parser.add_argument(
+        'root',
+        help    = 'Directory where the preprocessed dataset is located',
+        metavar = 'ROOT',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--outdir',
+        default = None,
+        dest    = 'outdir',
+        help    = 'Save normalized copy here. If not set, normalize in place',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--norm-type',
+        choices = NORM_TYPES,
+        default = 'standartize',
+        dest    = 'norm_type',
+        help    = 'Normalization type',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--resume',
+        action  = 'store_true',
+        dest    = 'resume',
+        help    = (
+            'Finish an interrupted normalization of ROOT, with its recorded'
+            ' parameters'
+        ),
+    )
+
+    parser.add_argument(
+        '--eps',
+        default = 1e-6,
+        dest    = 'eps',
+        help    = 'Regularization constant of the normalization',
+        type    = float,
+    )
+
+    return parser.parse_args(argv)
+
+def normalize(root, params_dict, resume = False):
+    import tqdm  # pylint: disable=import-outside-toplevel
+
+    targets = collect_targets(root, params_dict)
+    done    = load_normalize_log(root) if resume else set()
+
+    recover_targets(root, targets, done)
+    targets = [ x for x in targets if x not in done ]
+
+    progbar = tqdm.tqdm(
+        desc  = 'Normalizing',
+        total = len(targets),
+        dynamic_ncols = True
+    )
+    worker = NormalizeWorker(root, params_dict)
+
+    with open(
+        os.path.join(root, NORMALIZE_LOG), 'at' if resume else 'wt',
+        encoding = 'utf-8'
+    ) as log, multiprocessing.Pool() as pool:
+        for target in pool.imap_unordered(worker, targets):
+            # Recorded before the original is replaced
+            log.write(target + '\n')
+            log.flush()
+            os.fsync(log.fileno())
+
+            path = os.path.join(root, target)
+            os.replace(get_tmp_path(path), path)
+
+            progbar.update()
+
+    progbar.close()
+    os.remove(os.path.join(root, NORMALIZE_LOG))
+
+def get_normalization_meta(stats_dict, params_dict, norm_type, eps):
+    return {
+        'norm_type' : norm_type,
+        'eps'       : eps,
+        'stats'     : {
+            f'node:{io_type}:{node}' : {
+                stat : stats[stat].tolist() for stat in NORM_STATS[norm_type]
+            }
+            for ((node, io_type), stats) in stats_dict.items()
+        },
+        # normalized = (values - shift) / scale
+        'params'    : {
+            f'node:{io_type}:{node}' : {
+                'shift' : np.asarray(shift).tolist(),
+                'scale' : np.asarray(scale).tolist(),
+            }
+            for ((node, io_type), (shift, scale)) in params_dict.items()
+        },
+    }
+
+def set_normalization(root, normalization):
+    # The record is a part of the index checksum, which changes with data
+    update_dataset_meta(root, normalization = normalization)
+
+    if has_dataset_index(root):
+        update_dataset_index(root, normalization = normalization)
+
+def get_interrupted_normalization(root):
+    normalization = load_dataset_meta(root).get('normalization', None)
+
+    if (normalization is None) or normalization.get('complete', True):
+        raise RuntimeError(
+            f"Dataset '{root}' has no interrupted normalization to resume"
+        )
+
+    return {
+        k : v for (k, v) in normalization.items() if k != 'complete'
+    }
+
+def main(argv = None, prog = None):
+    cmdargs    = parse_cmdargs(argv, prog)
+    root       = cmdargs.root
+    stats_dict = load_feature_stats(root)
+
+    if cmdargs.resume:
+        if cmdargs.outdir is not None:
+            raise RuntimeError("--resume normalizes ROOT, without --outdir")
+
+        # Parameters of the interrupted run
+        normalization = get_interrupted_normalization(root)
+        norm_type     = normalization['norm_type']
+        eps           = normalization['eps']
+    else:
+        check_not_normalized(root)
+        norm_type = cmdargs.norm_type
+        eps       = cmdargs.eps
+
+    params_dict = {
+        path : get_norm_params(stats, norm_type, eps)
+            for (path, stats) in stats_dict.items()
+    }
+
+    if not cmdargs.resume:
+        if cmdargs.outdir is not None:
+            if os.path.exists(cmdargs.outdir):
+                raise RuntimeError(
+                    "Output directory exists. Refusing to override"
+                )
+
+            print("Copying dataset...")
+            shutil.copytree(root, cmdargs.outdir)
+            root = cmdargs.outdir
+
+        normalization = get_normalization_meta(
+            stats_dict, params_dict, norm_type, eps
+        )
+
+        # Mark dataset as (partially) normalized before touching any data,
+        # s.t. an interrupted run is never normalized again, but resumed
+        set_normalization(root, { **normalization, 'complete' : False })
+
+    print("Normalizing...")
+    normalize(root, params_dict, resume = cmdargs.resume)
+
+    set_normalization(root, { **normalization, 'complete' : True })
+
+if __name__ == '__main__':
+    main()
+
@@ -0,0 +1,753 @@
+import argparse
+import multiprocessing
+import os
+import re
+import shutil
+import time
+
+from collections import defaultdict
+
+from lagrtools             import instrument
+from lagrtools.compression import DEFAULT_CODEC, parse_codec
+from lagrtools.graph     import load_single_graph_from_dict
+from lagrtools.index     import (
+    DATASET_INDEX, LAYOUT_FILES, LAYOUT_SHARDS, get_features_meta,
+    save_dataset_index
+)
+from lagrtools.intersect import graph_intersection
+from lagrtools.funcs     import (
+    DEFAULT_FLOAT_DTYPE, DEFAULT_INDEX_DTYPE, FLOAT_DTYPES, INDEX_DTYPES,
+    parse_features_config, cast_merged_graph, construct_merged_graph,
+    flatten_key, save_merged_graph
+)
+from lagrtools.manifest  import Manifest, get_source_state, hash_config
+from lagrtools.normalization import get_dataset_normalization
+from lagrtools.raw       import RawClusterFile
+from lagrtools.shards    import (
+    SHARDS_INDEX, ShardWriter, is_sharded, load_shard_meta, load_shards_index
+)
+from lagrtools.sizes     import (
+    GraphSizes, get_merged_graph_sizes, load_graph_sizes, save_graph_sizes
+)
+from lagrtools.stats     import (
+    STATS, StatsAccumulator, load_stats_state, save_feature_stats,
+    save_stats_state
+)
+
+MANIFEST_SAVE_INTERVAL = 30
+
+# Merge-able feature statistics of each source: STATS_PARTS/SUFFIX.npz
+STATS_PARTS = 'stats_parts'
+
+# Node and edge counts of graphs of each source: SIZES_PARTS/SUFFIX.npz
+SIZES_PARTS = 'sizes_parts'
+
+# Target number of tasks per worker. Files are split into several tasks if
+# they are larger than `total size / (workers * TASKS_PER_WORKER)`.
+TASKS_PER_WORKER = 4
+
+FNAME_RE = re.compile(r'^clusters-(img|tru)-(.*)\.npz$')
+
+def merge_source_files(files_img, files_tru):
+    keys_img  = set(files_img.keys())
+    keys_tru  = set(files_tru.keys())
+    keys_diff = keys_img.symmetric_difference(keys_tru)
+    keys_int  = keys_img.intersection(keys_tru)
+
+    if len(keys_diff) > 0:
+        print('Mismatched img-tru files found')
+        print(keys_diff)
+
+    return [ (k, files_img[k], files_tru[k]) for k in keys_int ]
+
+def collect_files(root):
+    files_img = {}
+    files_tru = {}
+
+    for fname in os.listdir(root):
+        m = FNAME_RE.match(fname)
+        if not m:
+            continue
+
+        file_type, suffix = m.groups()
+
+        if file_type == 'img':
+            files_img[suffix] = fname
+        else:
+            files_tru[suffix] = fname
+
+    return merge_source_files(files_img, files_tru)
+
+def plan_tasks(source_list, root, n_workers):
+    # Splits sources into tasks of (suffix, fname_img, fname_tru, clusters),
+    # s.t. large files do not leave a single worker busy at the end of a run.
+    # Tasks are ordered largest first.
+    source_costs = []
+
+    for (suffix, fname_img, fname_tru) in source_list:
+        with RawClusterFile(os.path.join(root, fname_img)) as f:
+            sizes_img = f.get_cluster_sizes()
+
+        with RawClusterFile(os.path.join(root, fname_tru)) as f:
+            sizes_tru = f.get_cluster_sizes()
+
+        costs = {
+            cluster : size + sizes_tru.get(cluster, 0)
+                for (cluster, size) in sizes_img.items()
+        }
+        source_costs.append(((suffix, fname_img, fname_tru), costs))
+
+    total_cost  = sum(sum(costs.values()) for (_, costs) in source_costs)
+    target_cost = total_cost / (n_workers * TASKS_PER_WORKER)
+
+    tasks = []
+
+    for (source, costs) in source_costs:
+        group      = []
+        group_cost = 0
+
+        for (cluster, cost) in costs.items():
+            if group and (group_cost + cost > target_cost):
+                tasks.append((group_cost, (*source, group)))
+                group      = []
+                group_cost = 0
+
+            group.append(cluster)
+            group_cost += cost
+
+        # Sources without clusters still make a (trivial) task, s.t. they
+        # are recorded in the manifest
+        if group or (not costs):
+            tasks.append((group_cost, (*source, group)))
+
+    tasks.sort(key = lambda x : x[0], reverse = True)
+
+    return [ task for (_, task) in tasks ]
+
+def get_graph_size(graph):
+    return {
+        'nodes' : sum(len(x) for x in graph.nodes_dict.values()),
+        'edges' : sum(len(x) for x in graph.edges_dict.values()),
+    }
+
+class PreprocessWorker:
+    # pylint: disable=too-few-public-methods
+
+    def __init__(
+        self, root, outdir, features_config_img, features_config_tru,
+        return_graphs = False, codec = DEFAULT_CODEC, collect_stats = False,
+        float_dtype = DEFAULT_FLOAT_DTYPE, index_dtype = DEFAULT_INDEX_DTYPE
+    ):
+        # pylint: disable=too-many-arguments
+        # Features configs are compiled plans (`parse_features_config`),
+        # that are reused for every cluster
+        self._root   = root
+        self._outdir = outdir
+        self._features_config_tru = features_config_tru
+        self._features_config_img = features_config_img
+        self._return_graphs       = return_graphs
+        self._codec               = codec
+        self._collect_stats       = collect_stats
+        self._float_dtype         = float_dtype
+        self._index_dtype         = index_dtype
+
+    def __call__(self, task):
+        # Returns (suffix, outputs, stats, sizes). If `return_graphs`,
+        # outputs are merged graphs (to be sharded by the caller), otherwise
+        # -- names of saved per-cluster files. Stats are None, unless
+        # `collect_stats`. Sizes are { graph name : node and edge counts }.
+        suffix, fname_img, fname_tru, clusters = task
+
+        # Arrays are read lazily, one cluster at a time, and only those
+        # required by the features configs
+        path_img = os.path.join(self._root, fname_img)
+        path_tru = os.path.join(self._root, fname_tru)
+
+        stats = StatsAccumulator() if self._collect_stats else None
+
+        with RawClusterFile(path_img) as file_img, \
+             RawClusterFile(path_tru) as file_tru:
+            results = [
+                self._process_cluster(
+                    suffix, cluster, file_img, file_tru, stats
+                )
+                    for cluster in clusters
+            ]
+
+        outputs = [ output for (output, _) in results ]
+        sizes   = dict(size for (_, size) in results)
+
+        return (suffix, outputs, stats, sizes)
+
+    def _process_cluster(self, suffix, cluster, file_img, file_tru, stats):
+        # pylint: disable=too-many-arguments
+        with instrument.timer('preprocess.load') as t:
+            graph_img = load_single_graph_from_dict(
+                file_img.get_cluster(cluster, self._features_config_img),
+                self._features_config_img
+            )
+            graph_tru = load_single_graph_from_dict(
+                file_tru.get_cluster(cluster, self._features_config_tru),
+                self._features_config_tru
+            )
+            t.add(**get_graph_size(graph_img))
+
+        with instrument.timer('preprocess.intersect') as t:
+            graph_img, graph_tru = graph_intersection(graph_img, graph_tru)
+            t.add(**get_graph_size(graph_img))
+
+        with instrument.timer('preprocess.merge'):
+            merged_graph = construct_merged_graph(graph_img, graph_tru)
+
+        name = f'clusters_{suffix}_{cluster}'
+
+        if stats is not None:
+            with instrument.timer('preprocess.stats'):
+                stats.append({
+                    flatten_key(key) : values
+                        for (key, values) in merged_graph.items()
+                        if key[0] == 'node'
+                })
+
+        # Stats are computed in the original precision
+        merged_graph = cast_merged_graph(
+            merged_graph, self._float_dtype, self._index_dtype
+        )
+        size = (name, get_merged_graph_sizes(merged_graph))
+
+        if self._return_graphs:
+            return ((name, merged_graph), size)
+
+        # Atomic write: interrupted runs never leave truncated files
+        with instrument.timer('preprocess.write') as t:
+            path = os.path.join(self._outdir, name)
+            save_merged_graph(path + '.tmp.npz', merged_graph, self._codec)
+            os.replace(path + '.tmp.npz', path + '.npz')
+            t.add(bytes = os.path.getsize(path + '.npz'))
+
+        return (name + '.npz', size)
+
+def parse_cmdargs(argv = None, prog = None):
+    parser = argparse.ArgumentParser(
+        prog, description = 'Preprocess raw Wire-Cell graphs'
+    )
+
+    parser.add_argument(
+        'root',
+        help    = 'Directory where the original dataset is located',
+        metavar = 'ROOT',
+        type    = str,
+    )
+
+    parser.add_argument(
+        'outdir',
+        help    = 'Output directory',
+        metavar = 'OUTDIR',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--config',
+        dest     = 'config',
+        help     = 'Features Config',
+        type     = str,
+        required = True,
+    )
+
+    parser.add_argument(
+        '--shard-size',
+        default = None,
+        dest    = 'shard_size',
+        help    = (
+            'Number of graphs per shard. If specified, graphs are saved in'
+            ' the sharded memory-mappable format instead of one file per'
+            ' cluster'
+        ),
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--codec',
+        default = DEFAULT_CODEC,
+        dest    = 'codec',
+        help    = (
+            "Compression codec of per-cluster files: 'none', 'zlib[:LEVEL]',"
+            " 'lz4[:LEVEL]' or 'zstd[:LEVEL]'"
+        ),
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--float-dtype',
+        choices = FLOAT_DTYPES,
+        default = DEFAULT_FLOAT_DTYPE,
+        dest    = 'float_dtype',
+        help    = 'Storage dtype of node features',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--index-dtype',
+        choices = INDEX_DTYPES,
+        default = DEFAULT_INDEX_DTYPE,
+        dest    = 'index_dtype',
+        help    = 'Storage dtype of edges',
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--incremental',
+        action  = 'store_true',
+        dest    = 'incremental',
+        help    = (
+            'Update an existing output directory: process only new or'
+            ' changed source files and remove outputs of deleted ones'
+        ),
+    )
+
+    parser.add_argument(
+        '--stats',
+        action  = 'store_true',
+        dest    = 'stats',
+        help    = (
+            'Compute feature statistics while preprocessing and save them'
+            ' to stats.json (same as scripts/dataset_stats)'
+        ),
+    )
+
+    parser.add_argument(
+        '--instrument',
+        default = None,
+        dest    = 'instrument',
+        help    = (
+            'Save per-stage timers and counters to this directory'
+            ' (summary.json, metrics.prom)'
+        ),
+        type    = str,
+    )
+
+    parser.add_argument(
+        '--workers',
+        default = None,
+        dest    = 'workers',
+        help    = 'Number of worker processes. Default: number of CPUs',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--chunksize',
+        default = 1,
+        dest    = 'chunksize',
+        help    = 'Number of tasks sent to a worker at once',
+        type    = int,
+    )
+
+    parser.add_argument(
+        '--maxtasksperchild',
+        default = None,
+        dest    = 'maxtasksperchild',
+        help    = 'Restart worker processes after this number of tasks',
+        type    = int,
+    )
+
+    return parser.parse_args(argv)
+
+class ManifestSaver:
+    # Saves manifest at most once in `interval` seconds
+
+    def __init__(self, manifest, interval = MANIFEST_SAVE_INTERVAL):
+        self._manifest  = manifest
+        self._interval  = interval
+        self._last_save = time.monotonic()
+
+    def add_source(self, suffix, state, outputs, stats = None, sizes = None):
+        # pylint: disable=too-many-arguments
+        self._manifest.add_source(suffix, state, outputs, stats, sizes)
+
+        if time.monotonic() - self._last_save > self._interval:
+            self.save()
+
+    def save(self):
+        self._manifest.save()
+        self._last_save = time.monotonic()
+
+def remove_outputs(outdir, outputs):
+    for name in outputs:
+        path = os.path.join(outdir, name)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+def remove_temporary_files(outdir):
+    for name in os.listdir(outdir):
+        if '.tmp' in name:
+            remove_outputs(outdir, [ name, ])
+
+def plan_update(
+    manifest, source_list, root, outdir, config_hash, require_stats = False
+):
+    # Removes outputs of deleted or changed sources from `outdir` and
+    # returns a list of sources that need to be (re)processed. Sources
+    # processed without graph sizes (by older versions) are stale. If
+    # `require_stats`, sources processed without stats are stale as well.
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-locals
+    states = {
+        suffix : get_source_state(root, fname_img, fname_tru)
+            for (suffix, fname_img, fname_tru) in source_list
+    }
+
+    if manifest.config_hash != config_hash:
+        stale = set(manifest.sources)
+    else:
+        stale = set(
+            suffix for suffix in manifest.sources
+                if (suffix not in states)
+                or (not manifest.is_up_to_date(suffix, states[suffix]))
+                or (manifest.get_sizes(suffix) is None)
+                or (require_stats and (manifest.get_stats(suffix) is None))
+        )
+
+    # Shards hold graphs of several sources. The other sources of the
+    # removed shards need to be reprocessed as well.
+    stale_outputs = set()
+
+    while True:
+        for suffix in stale:
+            stale_outputs.update(manifest.get_outputs(suffix))
+
+        affected = set(
+            suffix for suffix in manifest.sources
+                if (suffix not in stale)
+                and stale_outputs.intersection(manifest.get_outputs(suffix))
+        )
+
+        if not affected:
+            break
+
+        stale.update(affected)
+
+    for suffix in stale:
+        manifest.remove_source(suffix)
+
+    if manifest.config_hash != config_hash:
+        manifest.reset(config_hash)
+
+    # Drop outputs that are not referenced by the manifest, e.g. shards
+    # written by an interrupted run
+    valid_outputs = set(
+        name for suffix in manifest.sources
+            for name in manifest.get_outputs(suffix)
+    )
+    orphans = set(
+        name for name in os.listdir(outdir)
+            if (name.startswith('clusters_') or name.startswith('shard_'))
+            and (name not in valid_outputs)
+    )
+    orphans.update(
+        name for name in (
+            os.path.join(parts, fname)
+                for parts in ( STATS_PARTS, SIZES_PARTS )
+                for fname in os.listdir(os.path.join(outdir, parts))
+        )
+            if name not in valid_outputs
+    )
+
+    remove_outputs(outdir, stale_outputs | orphans)
+
+    shards = [
+        x for x in load_shards_index(outdir) if x['name'] in valid_outputs
+    ]
+
+    if not shards:
+        remove_outputs(outdir, [ SHARDS_INDEX, ])
+
+    manifest.save()
+
+    source_list = [ x for x in source_list if x[0] not in manifest.sources ]
+    return (source_list, states, shards)
+
+class SourceTracker:
+    # Records a source in the manifest once all its tasks are done and (for
+    # sharded output) all the shards with its graphs are flushed
+
+    def __init__(self, tasks, states, saver, outdir):
+        self._n_tasks = defaultdict(int)
+        self._outputs = defaultdict(set)
+        self._stats   = {}
+        self._sizes   = defaultdict(dict)
+        self._pending = []
+        self._states  = states
+        self._saver   = saver
+        self._outdir  = outdir
+
+        for task in tasks:
+            self._n_tasks[task[0]] += 1
+
+    def task_done(
+        self, suffix, outputs, stats = None, sizes = None, open_shard = None
+    ):
+        # pylint: disable=too-many-arguments
+        self._outputs[suffix].update(outputs)
+        self._sizes[suffix].update(sizes or {})
+        self._n_tasks[suffix] -= 1
+
+        if stats is not None:
+            if suffix in self._stats:
+                self._stats[suffix] += stats
+            else:
+                self._stats[suffix] = stats
+
+        if self._n_tasks[suffix] == 0:
+            self._pending.append(suffix)
+
+        self.flush(open_shard)
+
+    def flush(self, open_shard = None):
+        still_pending = []
+
+        for suffix in self._pending:
+            if open_shard in self._outputs[suffix]:
+                still_pending.append(suffix)
+            else:
+                outputs = list(self._outputs.pop(suffix))
+                stats   = self._save_stats(suffix)
+                sizes   = self._save_sizes(suffix)
+
+                if stats is not None:
+                    outputs.append(stats)
+
+                outputs.append(sizes)
+
+                self._saver.add_source(
+                    suffix, self._states[suffix], outputs, stats, sizes
+                )
+
+        self._pending = still_pending
+
+    def _save_stats(self, suffix):
+        stats = self._stats.pop(suffix, None)
+
+        if stats is None:
+            return None
+
+        name = os.path.join(STATS_PARTS, suffix + '.npz')
+        save_stats_state(os.path.join(self._outdir, name), stats)
+
+        return name
+
+    def _save_sizes(self, suffix):
+        sizes = GraphSizes.from_dict(self._sizes.pop(suffix, {}))
+
+        name = os.path.join(SIZES_PARTS, suffix + '.npz')
+        save_graph_sizes(os.path.join(self._outdir, name), sizes)
+
+        return name
+
+def preprocess(
+    tasks, tracker, root_src, outdir,
+    features_config_img, features_config_tru,
+    shard_size = None, codec = DEFAULT_CODEC, shards = None,
+    workers = None, chunksize = 1, maxtasksperchild = None,
+    collect_stats = False, dtypes = (DEFAULT_FLOAT_DTYPE, DEFAULT_INDEX_DTYPE)
+):
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-locals
+    # Not needed by the workers
+    import tqdm  # pylint: disable=import-outside-toplevel
+
+    progbar = tqdm.tqdm(
+        desc  = 'Preprocessing',
+        total = len(tasks),
+        dynamic_ncols = True
+    )
+    worker = PreprocessWorker(
+        root_src, outdir, features_config_img, features_config_tru,
+        return_graphs = (shard_size is not None), codec = codec,
+        collect_stats = collect_stats,
+        float_dtype   = dtypes[0], index_dtype = dtypes[1]
+    )
+
+    with multiprocessing.Pool(
+        workers, maxtasksperchild = maxtasksperchild
+    ) as pool:
+        if shard_size is None:
+            for (suffix, outputs, stats, sizes) in pool.imap_unordered(
+                worker, tasks, chunksize
+            ):
+                tracker.task_done(suffix, outputs, stats, sizes)
+                progbar.update()
+        else:
+            # Ordered, to make shard contents deterministic
+            writer = ShardWriter(outdir, shard_size, shards)
+
+            for (suffix, graphs, stats, sizes) in pool.imap(
+                worker, tasks, chunksize
+            ):
+                outputs = set()
+
+                for (name, merged_graph) in graphs:
+                    outputs.add(writer.current_shard)
+
+                    with instrument.timer('preprocess.write') as t:
+                        writer.append(name, merged_graph)
+                        t.add(bytes = sum(
+                            v.nbytes for v in merged_graph.values()
+                        ))
+
+                tracker.task_done(
+                    suffix, outputs, stats, sizes, writer.current_shard
+                )
+                progbar.update()
+
+            writer.close()
+            tracker.flush()
+
+        # Workers that exit normally save their instrumentation counters
+        # (see `lagrtools.instrument`), unlike terminated ones
+        pool.close()
+        pool.join()
+
+    progbar.close()
+
+def save_stats(manifest, outdir):
+    # Merges stats of all sources, s.t. unchanged sources of incremental
+    # runs are not reread
+    result = StatsAccumulator()
+
+    for suffix in manifest.sources:
+        result += load_stats_state(
+            os.path.join(outdir, manifest.get_stats(suffix))
+        )
+
+    save_feature_stats(outdir, result)
+
+def save_index(manifest, outdir, features, config_hash):
+    # Index of all the graphs of the dataset, in the dataset order, s.t. the
+    # data loaders do not need to list the output directory
+    sizes = GraphSizes.concatenate(
+        load_graph_sizes(os.path.join(outdir, manifest.get_sizes(suffix)))
+            for suffix in sorted(manifest.sources)
+    )
+
+    if is_sharded(outdir):
+        layout    = LAYOUT_SHARDS
+        shards    = [ x['name'] for x in load_shards_index(outdir) ]
+        names     = []
+        locations = []
+
+        for (shard_idx, shard) in enumerate(shards):
+            meta = load_shard_meta(os.path.join(outdir, shard))
+
+            names     += meta['names']
+            locations += [
+                (shard_idx, idx) for idx in range(len(meta['names']))
+            ]
+    else:
+        layout    = LAYOUT_FILES
+        shards    = []
+        names     = sorted(sizes.names, key = lambda name: name + '.npz')
+        locations = [ (idx, 0) for idx in range(len(names)) ]
+
+    save_dataset_index(
+        outdir, layout, names, locations, sizes.select(names), shards,
+        features, config_hash
+    )
+
+def copy_config(config_path, outdir):
+    path = os.path.join(outdir, 'config.toml')
+
+    shutil.copy(config_path, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+def main(argv = None, prog = None):
+    cmdargs = parse_cmdargs(argv, prog)
+
+    if cmdargs.instrument is not None:
+        instrument.enable(cmdargs.instrument)
+
+    if os.path.exists(cmdargs.outdir) and (not cmdargs.incremental):
+        raise RuntimeError(
+            "Output directory exists. Refusing to override."
+            " Use --incremental to update it"
+        )
+
+    if cmdargs.incremental and (
+        get_dataset_normalization(cmdargs.outdir) is not None
+    ):
+        # New outputs would be mixed with normalized ones
+        raise RuntimeError(
+            f"Dataset '{cmdargs.outdir}' has been normalized."
+            " Refusing to update it incrementally"
+        )
+
+    # Fail early on unknown codecs
+    parse_codec(cmdargs.codec)
+
+    features_config_img, features_config_tru \
+        = parse_features_config(cmdargs.config)
+    config_hash = hash_config(
+        cmdargs.config, codec = cmdargs.codec, shard_size = cmdargs.shard_size,
+        float_dtype = cmdargs.float_dtype, index_dtype = cmdargs.index_dtype
+    )
+
+    print("Collecting Images...")
+    source_list = collect_files(cmdargs.root)
+
+    os.makedirs(os.path.join(cmdargs.outdir, STATS_PARTS), exist_ok = True)
+    os.makedirs(os.path.join(cmdargs.outdir, SIZES_PARTS), exist_ok = True)
+    remove_temporary_files(cmdargs.outdir)
+
+    manifest = Manifest(cmdargs.outdir)
+    sources_prev = set(manifest.sources)
+
+    source_list, states, shards = plan_update(
+        manifest, source_list, cmdargs.root, cmdargs.outdir, config_hash,
+        require_stats = cmdargs.stats
+    )
+
+    # The index is rewritten at the end of the run
+    remove_outputs(cmdargs.outdir, [ DATASET_INDEX, ])
+
+    print("Scheduling tasks...")
+    tasks = plan_tasks(
+        sorted(source_list), cmdargs.root,
+        cmdargs.workers or multiprocessing.cpu_count()
+    )
+
+    saver   = ManifestSaver(manifest)
+    tracker = SourceTracker(tasks, states, saver, cmdargs.outdir)
+
+    print("Preprocessing files...")
+    preprocess(
+        tasks, tracker, cmdargs.root, cmdargs.outdir,
+        features_config_img, features_config_tru,
+        cmdargs.shard_size, cmdargs.codec, shards,
+        cmdargs.workers, cmdargs.chunksize, cmdargs.maxtasksperchild,
+        cmdargs.stats, (cmdargs.float_dtype, cmdargs.index_dtype)
+    )
+
+    saver.save()
+
+    print("Saving Index...")
+    save_index(
+        manifest, cmdargs.outdir,
+        get_features_meta(features_config_img, features_config_tru),
+        config_hash
+    )
+
+    if cmdargs.stats:
+        print("Saving Stats...")
+        save_stats(manifest, cmdargs.outdir)
+
+    elif tasks or (set(manifest.sources) != sources_prev):
+        # Stats of a previous run no longer match the dataset
+        remove_outputs(cmdargs.outdir, [ STATS, ])
+
+    copy_config(cmdargs.config, cmdargs.outdir)
+
+if __name__ == '__main__':
+    main()
+
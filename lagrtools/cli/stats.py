@@ -0,0 +1,113 @@
+import argparse
+import multiprocessing
+import os
+
+from collections import defaultdict
+
+from lagrtools.compression import load_arrays
+from lagrtools.funcs       import flatten_key
+from lagrtools.shards      import Shard, ShardedGraphs, is_sharded
+from lagrtools.stats       import StatsAccumulator, save_feature_stats
+
+def collect_files(root):
+    if is_sharded(root):
+        return [
+            os.path.join(root, name)
+                for name in ShardedGraphs(root).shard_names
+        ]
+
+    result = []
+
+    for fname in os.listdir(root):
+        if not fname.endswith('.npz'):
+            continue
+
+        result.append(os.path.join(root, fname))
+
+    return result
+
+def load_shard_nodes_dict(path):
+    shard = Shard(path, mmap_mode = 'r')
+
+    return {
+        flatten_key(key) : shard.get_array(key)
+            for key in shard.keys if key[0] == 'node'
+    }
+
+def load_nodes_dict(path):
+    if os.path.isdir(path):
+        return load_shard_nodes_dict(path)
+
+    result = defaultdict(dict)
+
+    for name, values in load_arrays(path).items():
+        if not name.startswith('node:'):
+            continue
+
+        result[name] = values
+
+    return result
+
+class StatsWorker:
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        pass
+
+    def __call__(self, path):
+        result     = StatsAccumulator()
+
+        nodes_dict = load_nodes_dict(path)
+        result.append(nodes_dict)
+
+        return result
+
+def parse_cmdargs(argv = None, prog = None):
+    parser = argparse.ArgumentParser(
+        prog,
+        description = 'Compute feature statistics of a preprocessed dataset'
+    )
+
+    parser.add_argument(
+        'root',
+        help    = 'Directory where the original dataset is located',
+        metavar = 'ROOT',
+        type    = str,
+    )
+
+    return parser.parse_args(argv)
+
+def preprocess(path_list):
+    import tqdm  # pylint: disable=import-outside-toplevel
+
+    result = StatsAccumulator()
+
+    progbar = tqdm.tqdm(
+        desc  = 'Acumulating Stats',
+        total = len(path_list),
+        dynamic_ncols = True
+    )
+    worker = StatsWorker()
+
+    with multiprocessing.Pool() as pool:
+        for stats in pool.imap_unordered(worker, path_list):
+            result += stats
+            progbar.update()
+
+    progbar.close()
+
+    return result
+
+def main(argv = None, prog = None):
+    cmdargs = parse_cmdargs(argv, prog)
+
+    print("Collecting Stats...")
+    path_list = collect_files(cmdargs.root)
+    stats     = preprocess(path_list)
+
+    print("Saving Stats...")
+    save_feature_stats(cmdargs.root, stats)
+
+if __name__ == '__main__':
+    main()
+
@@ -0,0 +1,178 @@
+import io
+import zipfile
+from typing import (
+    BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+)
+
+import numpy as np
+
+# Merged graphs are stored as zip archives of `.npy` members (same as
+# `np.savez`). Codecs 'none' and 'zlib' use the zip compression, so the files
+# can be read by `np.load`. Fast codecs (LZ4, Zstandard) compress each `.npy`
+# member separately and mark it with an extra suffix, e.g. `KEY.npy.zst`.
+#
+# Codec spec is `NAME[:LEVEL]`, e.g. 'none', 'zlib:1', 'zstd:3', 'lz4'.
+
+NPY_EXT = '.npy'
+
+CODEC_EXTS = {
+    'lz4'  : '.lz4',
+    'zstd' : '.zst',
+}
+
+DEFAULT_CODEC = 'zlib'
+CODECS        = ( 'none', 'zlib', 'lz4', 'zstd' )
+
+Codec = Tuple[str, Optional[int]]
+
+def parse_codec(spec : str) -> Codec:
+    name, _, level = spec.partition(':')
+
+    if name not in CODECS:
+        raise ValueError(f'Unknown codec: {name}')
+
+    if not level:
+        return (name, None)
+
+    if name == 'none':
+        raise ValueError("Codec 'none' does not support compression levels")
+
+    return (name, int(level))
+
+def import_codec_module(name : str):
+    # pylint: disable=import-outside-toplevel
+    try:
+        if name == 'lz4':
+            import lz4.frame
+            return lz4.frame
+
+        if name == 'zstd':
+            import zstandard
+            return zstandard
+
+    except ImportError as e:
+        raise RuntimeError(
+            f"Codec '{name}' requires a package that is not installed"
+        ) from e
+
+    raise ValueError(f'Codec {name} is not a stand-alone codec')
+
+def available_codecs() -> List[str]:
+    result = []
+
+    for name in CODECS:
+        if name in CODEC_EXTS:
+            try:
+                import_codec_module(name)
+            except RuntimeError:
+                continue
+
+        result.append(name)
+
+    return result
+
+def get_compressor(codec : Codec) -> Callable[[bytes], bytes]:
+    name, level = codec
+    module      = import_codec_module(name)
+
+    if name == 'lz4':
+        if level is None:
+            return module.compress
+
+        return lambda data : module.compress(data, compression_level = level)
+
+    compressor = module.ZstdCompressor(level = (3 if level is None else level))
+    return compressor.compress
+
+def get_decompressor(name : str) -> Callable[[bytes], bytes]:
+    module = import_codec_module(name)
+
+    if name == 'lz4':
+        return module.decompress
+
+    return module.ZstdDecompressor().decompress
+
+def encode_array(values : np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.lib.format.write_array(
+        buffer, np.asanyarray(values), allow_pickle = False
+    )
+    return buffer.getvalue()
+
+def save_arrays(
+    path : str, arrays : Dict[str, np.ndarray], codec : str = DEFAULT_CODEC
+) -> None:
+    name, level = parse_codec(codec)
+
+    if name in CODEC_EXTS:
+        compressor  = get_compressor((name, level))
+        compression = zipfile.ZIP_STORED
+        suffix      = NPY_EXT + CODEC_EXTS[name]
+    else:
+        compressor  = None
+        compression = (
+            zipfile.ZIP_STORED if name == 'none' else zipfile.ZIP_DEFLATED
+        )
+        suffix      = NPY_EXT
+
+    with zipfile.ZipFile(
+        path, mode = 'w', compression = compression, compresslevel = level,
+        allowZip64 = True
+    ) as f:
+        for (key, values) in arrays.items():
+            if compressor is None:
+                with f.open(key + suffix, 'w', force_zip64 = True) as member:
+                    np.lib.format.write_array(
+                        member, np.asanyarray(values), allow_pickle = False
+                    )
+            else:
+                f.writestr(key + suffix, compressor(encode_array(values)))
+
+def split_member_name(member : str) -> Tuple[str, Optional[str]]:
+    for (name, ext) in CODEC_EXTS.items():
+        if member.endswith(NPY_EXT + ext):
+            return (member[:-len(NPY_EXT + ext)], name)
+
+    if member.endswith(NPY_EXT):
+        return (member[:-len(NPY_EXT)], None)
+
+    raise ValueError(f'Unknown array format: {member}')
+
+def detect_codec(path : str) -> str:
+    # Returns name of the codec a file was saved with (level is not stored)
+    with zipfile.ZipFile(path, mode = 'r') as f:
+        for info in f.infolist():
+            codec_name = split_member_name(info.filename)[1]
+
+            if codec_name is not None:
+                return codec_name
+
+            if info.compress_type == zipfile.ZIP_DEFLATED:
+                return 'zlib'
+
+    return 'none'
+
+def load_arrays(path : Union[str, BinaryIO]) -> Dict[str, np.ndarray]:
+    result        = {}
+    decompressors : Dict[str, Callable[[bytes], bytes]] = {}
+
+    with zipfile.ZipFile(path, mode = 'r') as f:
+        for member in f.namelist():
+            key, codec_name = split_member_name(member)
+
+            if codec_name is None:
+                with f.open(member, 'r') as stream:
+                    result[key] = np.lib.format.read_array(
+                        stream, allow_pickle = False
+                    )
+                continue
+
+            if codec_name not in decompressors:
+                decompressors[codec_name] = get_decompressor(codec_name)
+
+            data = decompressors[codec_name](f.read(member))
+            result[key] = np.lib.format.read_array(
+                io.BytesIO(data), allow_pickle = False
+            )
+
+    return result
@@ -1,25 +1,195 @@
-from typing import Set, Optional
+from typing import Dict, Set, Optional, Tuple
 import numpy as np
 
+# Segmented result: values of the i-th query are values[ptr[i]:ptr[i+1]]
+Segments = Tuple[np.ndarray, np.ndarray]
+
+class AdjacencyIndex:
+    # Compressed sparse index of edges by one of their endpoints (CSR for
+    # sources, CSC for destinations). Edges of node `i` are
+    #   perm[offsets[i]:offsets[i+1]]
+    # in their original order.
+    __slots__ = ( 'perm', 'offsets' )
+
+    def __init__(self, perm : np.ndarray, offsets : np.ndarray):
+        self.perm    = perm
+        self.offsets = offsets
+
+    @staticmethod
+    def from_keys(keys : np.ndarray, n_keys : int = 0) -> 'AdjacencyIndex':
+        keys   = np.asarray(keys, dtype = np.int64)
+        perm   = np.argsort(keys, kind = 'stable')
+        counts = np.bincount(keys, minlength = n_keys)
+
+        return AdjacencyIndex(
+            perm, np.concatenate(([ 0, ], np.cumsum(counts)))
+        )
+
+    @property
+    def n_keys(self) -> int:
+        return len(self.offsets) - 1
+
+    def degree(self, n_nodes : Optional[int] = None) -> np.ndarray:
+        result = np.diff(self.offsets)
+
+        if n_nodes is None:
+            return result
+
+        if n_nodes <= len(result):
+            return result[:n_nodes]
+
+        return np.pad(result, (0, n_nodes - len(result)))
+
+    def lookup(self, ids : np.ndarray) -> Segments:
+        # Returns (edge indices, ptr) of edges of each node of `ids`
+        ids    = np.asarray(ids, dtype = np.int64).ravel()
+        valid  = (ids >= 0) & (ids < self.n_keys)
+        safe   = np.where(valid, ids, 0)
+
+        starts = np.where(valid, self.offsets[safe], 0)
+        ends   = np.where(
+            valid, self.offsets[np.minimum(safe + 1, self.n_keys)], 0
+        )
+        counts = ends - starts
+        ptr    = np.concatenate(([ 0, ], np.cumsum(counts)))
+
+        positions = np.repeat(starts - ptr[:-1], counts) + np.arange(ptr[-1])
+
+        return (self.perm[positions], ptr)
+
+    def remap(
+        self, keep : np.ndarray, new_keys : np.ndarray, n_keys : int
+    ) -> 'AdjacencyIndex':
+        # Index of the edges `keep`, whose keys were renumbered in the same
+        # order. Sorted order is preserved, s.t. no sorting is needed.
+        new_positions = np.cumsum(keep) - 1
+        perm          = self.perm[keep[self.perm]]
+        counts        = np.bincount(new_keys, minlength = n_keys)
+
+        return AdjacencyIndex(
+            new_positions[perm], np.concatenate(([ 0, ], np.cumsum(counts)))
+        )
+
+class ReindexPlan:
+    # Renumbering of nodes of one type, that are kept by a filter: `mapping`
+    # maps old indices to new ones (-1 for dropped nodes). It is None, when
+    # all the nodes are kept.
+    __slots__ = ( 'mapping', 'n_keep' )
+
+    def __init__(self, mapping : Optional[np.ndarray], n_keep : int):
+        self.mapping = mapping
+        self.n_keep  = n_keep
+
+    @staticmethod
+    def from_mask(node_mask : Optional[np.ndarray]) -> 'ReindexPlan':
+        if node_mask is None:
+            return IDENTITY_PLAN
+
+        node_mask = np.asarray(node_mask, dtype = bool)
+        n_keep    = int(np.count_nonzero(node_mask))
+
+        if n_keep == len(node_mask):
+            return ReindexPlan(None, n_keep)
+
+        return ReindexPlan(reindex_map(node_mask), n_keep)
+
+    @property
+    def is_identity(self) -> bool:
+        return self.mapping is None
+
+    def get_n_keys(self, index : AdjacencyIndex) -> int:
+        if self.is_identity:
+            return index.n_keys
+
+        return self.n_keep
+
+IDENTITY_PLAN = ReindexPlan(None, -1)
+
 class Edges:
+    __slots__ = ( '_values', '_src_ids', '_dst_ids', '_csr', '_csc' )
 
     def __init__(self, values : np.ndarray):
         self._values  = values
-        self._src_set = set(values[:, 0])
-        self._dst_set = set(values[:, 1])
+        self._src_ids = None
+        self._dst_ids = None
+        self._csr     = None
+        self._csc     = None
+
+    @property
+    def src_ids(self) -> np.ndarray:
+        # Sorted unique source node indices
+        if self._src_ids is None:
+            self._src_ids = np.unique(self._values[:, 0])
+
+        return self._src_ids
+
+    @property
+    def dst_ids(self) -> np.ndarray:
+        # Sorted unique destination node indices
+        if self._dst_ids is None:
+            self._dst_ids = np.unique(self._values[:, 1])
+
+        return self._dst_ids
 
     @property
     def src_set(self) -> Set[int]:
-        return self._src_set
+        return set(self.src_ids.tolist())
 
     @property
     def dst_set(self) -> Set[int]:
-        return self._dst_set
+        return set(self.dst_ids.tolist())
 
     @property
     def values(self) -> np.ndarray:
         return self._values
 
+    @property
+    def csr(self) -> AdjacencyIndex:
+        # Index of edges by source node
+        if self._csr is None:
+            self._csr = AdjacencyIndex.from_keys(self._values[:, 0])
+
+        return self._csr
+
+    @property
+    def csc(self) -> AdjacencyIndex:
+        # Index of edges by destination node
+        if self._csc is None:
+            self._csc = AdjacencyIndex.from_keys(self._values[:, 1])
+
+        return self._csc
+
+    def _get_index(self, direction : str) -> AdjacencyIndex:
+        if direction == 'out':
+            return self.csr
+
+        if direction == 'in':
+            return self.csc
+
+        raise ValueError(f'Unknown edge direction: {direction}')
+
+    def out_edges(self, ids : np.ndarray) -> Segments:
+        # Returns (edge indices, ptr) of edges, outgoing from nodes `ids`
+        return self.csr.lookup(ids)
+
+    def in_edges(self, ids : np.ndarray) -> Segments:
+        # Returns (edge indices, ptr) of edges, incoming to nodes `ids`
+        return self.csc.lookup(ids)
+
+    def neighbors(self, ids : np.ndarray, direction : str = 'out') -> Segments:
+        # Returns (neighbor ids, ptr). Destinations of outgoing edges for
+        # direction 'out', sources of incoming edges for 'in'.
+        edge_idx, ptr = self._get_index(direction).lookup(ids)
+        column        = 1 if direction == 'out' else 0
+
+        return (self._values[edge_idx, column], ptr)
+
+    def degree(
+        self, direction : str = 'out', n_nodes : Optional[int] = None
+    ) -> np.ndarray:
+        # Number of outgoing (incoming) edges of nodes 0, 1, ..., n_nodes - 1
+        return self._get_index(direction).degree(n_nodes)
+
     def __len__(self):
         return len(self._values)
 
@@ -37,27 +207,60 @@ class Edges:
         node_mask_src : Optional[np.ndarray],
         node_mask_dst : Optional[np.ndarray]
     ) -> 'Edges':
+        return self.reindex(
+            ReindexPlan.from_mask(node_mask_src),
+            ReindexPlan.from_mask(node_mask_dst)
+        )
+
+    def reindex(
+        self, plan_src : ReindexPlan, plan_dst : ReindexPlan
+    ) -> 'Edges':
+        # pylint: disable=protected-access
+        if plan_src.is_identity and plan_dst.is_identity:
+            # No edge is dropped. Edges are never modified in place, so they
+            # are shared with the result, together with their indices.
+            return self
 
-        reindex_src = reindex_map(node_mask_src)
-        reindex_dst = reindex_map(node_mask_dst)
+        src  = self.values[:, 0]
+        dst  = self.values[:, 1]
+        keep = None
 
-        new_edges = self.values.copy()
+        # Only the filtered endpoints are gathered
+        if not plan_src.is_identity:
+            src  = plan_src.mapping[src]
+            keep = (src != -1)
 
-        if reindex_src is not None:
-            new_edges[:, 0] = reindex_src[new_edges[:, 0]]
+        if not plan_dst.is_identity:
+            dst  = plan_dst.mapping[dst]
+            keep = (dst != -1) if keep is None else (keep & (dst != -1))
 
-        if reindex_dst is not None:
-            new_edges[:, 1] = reindex_dst[new_edges[:, 1]]
+        new_edges = np.empty(
+            (np.count_nonzero(keep), 2), dtype = self.values.dtype
+        )
+        new_edges[:, 0] = src[keep]
+        new_edges[:, 1] = dst[keep]
 
-        drop_mask = np.any(new_edges == -1, axis = 1)
+        result = Edges(new_edges)
 
-        return Edges(new_edges[~drop_mask])
+        # Reindexing keeps the order of nodes, so the indices are remapped
+        # instead of being rebuilt
+        if self._csr is not None:
+            result._csr = self._csr.remap(
+                keep, new_edges[:, 0], plan_src.get_n_keys(self._csr)
+            )
+
+        if self._csc is not None:
+            result._csc = self._csc.remap(
+                keep, new_edges[:, 1], plan_dst.get_n_keys(self._csc)
+            )
+
+        return result
 
     def __getstate__(self):
         return { 'values' : self._values, }
 
     def __setstate__(self, state_dict):
-        return Edges(state_dict['values'])
+        Edges.__init__(self, state_dict['values'])
 
 def reindex_map(node_mask : Optional[np.ndarray]) -> Optional[np.ndarray]:
     if node_mask is None:
@@ -71,3 +274,10 @@ def reindex_map(node_mask : Optional[np.ndarray]) -> Optional[np.ndarray]:
 
     return result
 
+def get_reindex_plans(
+    mask_dict : Dict[str, Optional[np.ndarray]]
+) -> Dict[str, ReindexPlan]:
+    return {
+        k : ReindexPlan.from_mask(mask) for (k, mask) in mask_dict.items()
+    }
+
@@ -1,19 +1,41 @@
-from typing import Dict, Tuple
-import toml
+from typing import BinaryIO, Dict, Mapping, Tuple, Union
 import numpy as np
 
-from .graph import Graph
-from .nodes import FeatureConfig
+from .compression import DEFAULT_CODEC, save_arrays, load_arrays
+from .graph       import Graph
+from .nodes       import FeaturePlan
 
 MergedGraph = Dict[Tuple[str,...], np.ndarray]
 
-def parse_features_config(path : str) -> Tuple[FeatureConfig, FeatureConfig]:
+# Edges of merged graphs are (E, 2) arrays of (src, dst) rows. They are
+# stored transposed, as contiguous (2, E) arrays under EDGE_INDEX keys, and
+# are loaded as (E, 2) views of these arrays. Thus, `v.T` of a loaded edge
+# array is contiguous, and converts to an `edge_index` tensor without copies.
+EDGE_INDEX = 'edge_index'
+
+# Storage dtypes of node features and of edges
+FLOAT_DTYPES = ( 'float64', 'float32', 'float16' )
+INDEX_DTYPES = ( 'int64', 'int32' )
+
+DEFAULT_FLOAT_DTYPE = 'float32'
+DEFAULT_INDEX_DTYPE = 'int64'
+
+def flatten_key(key : Tuple[str, ...]) -> str:
+    return ':'.join(key)
+
+def parse_key(key : str) -> Tuple[str, ...]:
+    return tuple(key.split(':', maxsplit = 2))
+
+def parse_features_config(path : str) -> Tuple[FeaturePlan, FeaturePlan]:
+    # Plans are validated here, and are reused for every graph
+    import toml  # pylint: disable=import-outside-toplevel
+
     z = toml.load(path)
 
-    feature_config_img = z['img']
-    feature_config_tru = z['tru']
+    feature_plan_img = FeaturePlan.from_config(z['img'])
+    feature_plan_tru = FeaturePlan.from_config(z['tru'])
 
-    return feature_config_img, feature_config_tru
+    return feature_plan_img, feature_plan_tru
 
 def construct_merged_graph(g_img : Graph, g_tru : Graph) -> MergedGraph:
     result : MergedGraph = {}
@@ -36,21 +58,55 @@ def construct_merged_graph(g_img : Graph, g_tru : Graph) -> MergedGraph:
 
     return result
 
-def save_merged_graph(path : str, graph : MergedGraph) -> None:
-    def flatten_key(key : Tuple[str, ...]) -> str:
-        return ':'.join(key)
+def cast_merged_graph(
+    graph       : MergedGraph,
+    float_dtype : str = DEFAULT_FLOAT_DTYPE,
+    index_dtype : str = DEFAULT_INDEX_DTYPE,
+) -> MergedGraph:
+    return {
+        key : values.astype(
+            float_dtype if key[0] == 'node' else index_dtype, copy = False
+        )
+            for (key, values) in graph.items()
+    }
+
+def get_stored_arrays(graph : MergedGraph) -> Dict[str, np.ndarray]:
+    # Returns { flat key : array to store }
+    result = {}
+
+    for (key, values) in graph.items():
+        if key[0] == 'edge':
+            key    = (EDGE_INDEX, *key[1:])
+            values = np.ascontiguousarray(values.T)
 
-    np.savez_compressed(
-        path, **{ flatten_key(k) : v for (k, v) in graph.items() }
-    )
+        result[flatten_key(key)] = values
 
-def load_merged_graph(path : str) -> MergedGraph:
+    return result
+
+def parse_stored_arrays(arrays : Mapping[str, np.ndarray]) -> MergedGraph:
+    # Inverse of `get_stored_arrays`. Plain (E, 2) edge arrays are accepted
+    # as well.
     result = {}
 
-    with np.load(path) as f:
-        for key in f:
-            parsed_key = tuple(key.split(':', maxsplit = 2))
-            result[parsed_key] = f[key]
+    for (flat_key, values) in arrays.items():
+        key = parse_key(flat_key)
+
+        if key[0] == EDGE_INDEX:
+            key    = ('edge', *key[1:])
+            values = values.T
+
+        result[key] = values
 
     return result
 
+def save_merged_graph(
+    path : str, graph : MergedGraph, codec : str = DEFAULT_CODEC
+) -> None:
+    if not path.endswith('.npz'):
+        path = path + '.npz'
+
+    save_arrays(path, get_stored_arrays(graph), codec)
+
+def load_merged_graph(path : Union[str, BinaryIO]) -> MergedGraph:
+    return parse_stored_arrays(load_arrays(path))
+
@@ -1,8 +1,9 @@
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 import numpy as np
 
-from .nodes import Nodes, FeatureConfig
-from .edges import Edges
+from .nodes    import Nodes, FeatureConfig, FeaturePlan, get_feature_plan
+from .edges    import Edges, IDENTITY_PLAN, get_reindex_plans
+from .subgraph import get_k_hop_masks, iterate_partition_masks
 
 NodesDict = Dict[str, Nodes]
 EdgesDict = Dict[Tuple[str, str], Edges]
@@ -48,16 +49,59 @@ class Graph:
         for (k, nodes) in self.nodes_dict.items():
             new_nodes_dict[k] = nodes.filter(mask_dict.get(k, None))
 
+        # Node types are shared by several edge types. Each one is reindexed
+        # once.
+        plans = get_reindex_plans(mask_dict)
+
         for (edge_name, edges) in self.edges_dict.items():
             k_src = edge_name[0]
             k_dst = edge_name[1]
 
-            new_edges_dict[edge_name] = edges.filter(
-                mask_dict.get(k_src, None), mask_dict.get(k_dst, None)
+            new_edges_dict[edge_name] = edges.reindex(
+                plans.get(k_src, IDENTITY_PLAN),
+                plans.get(k_dst, IDENTITY_PLAN)
             )
 
         return Graph(new_nodes_dict, new_edges_dict)
 
+    def get_n_nodes_dict(self) -> Dict[str, int]:
+        return { k : len(nodes) for (k, nodes) in self.nodes_dict.items() }
+
+    def k_hop_masks(
+        self,
+        seeds    : Dict[str, np.ndarray],
+        n_hops   : int,
+        directed : bool = False,
+    ) -> MaskDict:
+        # `seeds` : { node type : node indices }
+        return get_k_hop_masks(
+            self.get_n_nodes_dict(), self.edges_dict, seeds, n_hops, directed
+        )
+
+    def k_hop_subgraph(
+        self,
+        seeds    : Dict[str, np.ndarray],
+        n_hops   : int,
+        directed : bool = False,
+    ) -> 'Graph':
+        return self.filter(self.k_hop_masks(seeds, n_hops, directed))
+
+    def partition(
+        self,
+        seed_type : str,
+        max_nodes : int,
+        n_hops    : int,
+        directed  : bool = False,
+    ) -> List['Graph']:
+        # Splits the graph into k-hop neighborhoods of groups of `seed_type`
+        # nodes, each with at most `max_nodes` nodes (see `subgraph.py`)
+        return [
+            self.filter(masks) for (_, masks) in iterate_partition_masks(
+                self.get_n_nodes_dict(), self.edges_dict, seed_type,
+                max_nodes, n_hops, directed
+            )
+        ]
+
 def parse_edge_name(name : str) -> Tuple[str, str]:
     src = name[0]
     dst = name[1]
@@ -66,19 +110,21 @@ def parse_edge_name(name : str) -> Tuple[str, str]:
 
 def load_single_graph_from_dict(
     graph_dict     : Dict[str, np.ndarray],
-    feature_config : Optional[FeatureConfig] = None
+    feature_config : Optional[Union[FeatureConfig, FeaturePlan]] = None
 ) -> Graph:
-    nodes_dict = { }
-    edges_dict = { }
+    nodes_dict   = { }
+    edges_dict   = { }
+    feature_plan = get_feature_plan(feature_config)
 
-    for name, values in graph_dict.items():
+    # Values are fetched by name, s.t. lazy mappings read each array once
+    for name in graph_dict:
         if name.endswith('nodes'):
-            nodes = Nodes.from_values(name, values, feature_config)
+            nodes = Nodes.from_values(name, graph_dict[name], feature_plan)
 
             if nodes is not None:
                 nodes_dict[name] = nodes
 
-    for name, values in graph_dict.items():
+    for name in graph_dict:
         if name.endswith('edges'):
             edge_tuple = parse_edge_name(name)
 
@@ -88,12 +134,13 @@ def load_single_graph_from_dict(
             ):
                 continue
 
-            edges_dict[edge_tuple] = Edges(values)
+            edges_dict[edge_tuple] = Edges(graph_dict[name])
 
     return Graph(nodes_dict, edges_dict)
 
 def load_single_graph(
-    path : str, feature_config : Optional[FeatureConfig] = None
+    path           : str,
+    feature_config : Optional[Union[FeatureConfig, FeaturePlan]] = None
 ) -> Graph:
     with np.load(path) as f:
         return load_single_graph_from_dict(f, feature_config)
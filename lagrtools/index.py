@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .nodes import FeaturePlan
+from .sizes import GraphSizes
+
+# Index of a preprocessed dataset: ROOT/index/
+#   meta.json     -- version, layout, shard names, features of node types,
+#                    keys of counts and checksum
+#   names.npy     -- (n_graphs, ) names of graphs, as fixed width bytes
+#   locations.npy -- (n_graphs, 2) [ unit, index in unit ] rows. Units are
+#                    shards (in the order of `shards`), or per-cluster files
+#                    (one per graph, named NAME.npz)
+#   counts.npy    -- (n_graphs, n_keys) node and edge counts of graphs
+#                    (see `lagrtools.sizes`)
+#
+# Graphs are in the order of the dataset: sorted file names, or shards. The
+# arrays are memory-mapped, s.t. a dataset is opened without listing its
+# directory, and all the processes share the same pages.
+#
+# The checksum (SHA-256 of the index content, the configuration hash, and
+# the normalization record) identifies the preprocessed dataset. Commands
+# that change the graphs in place (`lagrtools normalize`) record the
+# change in the index by `update_dataset_index`, s.t. the checksum follows.
+
+DATASET_INDEX = 'index'
+INDEX_META    = 'meta.json'
+INDEX_VERSION = 1
+
+LAYOUT_FILES  = 'files'
+LAYOUT_SHARDS = 'shards'
+
+# { node type : { 'x' : [ feature, ], 'y' : [ feature, ] } }
+FeaturesMeta = Dict[str, Dict[str, List[str]]]
+
+INDEX_ARRAYS = ( 'names', 'locations', 'counts' )
+
+def get_features_meta(
+    plan_img : FeaturePlan, plan_tru : FeaturePlan
+) -> FeaturesMeta:
+    return {
+        name : {
+            'x' : list(plan_img[name].features),
+            'y' : list(plan_tru[name].features) if name in plan_tru else [],
+        }
+            for name in plan_img
+    }
+
+def get_index_checksum(
+    meta : Dict[str, Any], arrays : Dict[str, np.ndarray]
+) -> str:
+    result = hashlib.sha256()
+
+    meta = { k : v for (k, v) in meta.items() if k != 'checksum' }
+    result.update(json.dumps(meta, sort_keys = True).encode('utf-8'))
+
+    for name in INDEX_ARRAYS:
+        values = np.ascontiguousarray(arrays[name])
+
+        result.update(f'{name}:{values.dtype.str}:{values.shape}'.encode())
+        result.update(values.data)
+
+    return result.hexdigest()
+
+def has_dataset_index(root : str) -> bool:
+    return os.path.isfile(os.path.join(root, DATASET_INDEX, INDEX_META))
+
+def save_dataset_index(
+    root        : str,
+    layout      : str,
+    names       : List[str],
+    locations   : np.ndarray,
+    sizes       : GraphSizes,
+    shards      : List[str],
+    features    : FeaturesMeta,
+    config_hash : Optional[str] = None,
+) -> str:
+    # `sizes` must be in the order of `names`. Returns the checksum.
+    # pylint: disable=too-many-arguments
+    arrays = {
+        'names'     : np.array(
+            [ name.encode('utf-8') for name in names ], dtype = np.bytes_
+        ),
+        'locations' : np.asarray(locations, dtype = np.int64).reshape((-1, 2)),
+        'counts'    : sizes.counts,
+    }
+    meta = {
+        'version'     : INDEX_VERSION,
+        'layout'      : layout,
+        'shards'      : shards,
+        'keys'        : sizes.keys,
+        'features'    : features,
+        'config_hash' : config_hash,
+    }
+    meta['checksum'] = get_index_checksum(meta, arrays)
+
+    path     = os.path.join(root, DATASET_INDEX)
+    path_tmp = path + '.tmp'
+
+    if os.path.exists(path_tmp):
+        shutil.rmtree(path_tmp)
+
+    os.makedirs(path_tmp)
+
+    for (name, values) in arrays.items():
+        np.save(os.path.join(path_tmp, name + '.npy'), values)
+
+    with open(
+        os.path.join(path_tmp, INDEX_META), 'wt', encoding = 'utf-8'
+    ) as f:
+        json.dump(meta, f)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    os.replace(path_tmp, path)
+
+    return meta['checksum']
+
+def update_dataset_index(root : str, **kwargs) -> str:
+    # Sets the fields of `kwargs` in the meta of an existing index, and
+    # recomputes its checksum. Returns the checksum.
+    path = os.path.join(root, DATASET_INDEX)
+
+    with open(os.path.join(path, INDEX_META), 'rt', encoding = 'utf-8') as f:
+        meta = { **json.load(f), **kwargs }
+
+    arrays = {
+        name : np.load(os.path.join(path, name + '.npy'), mmap_mode = 'r')
+            for name in INDEX_ARRAYS
+    }
+    meta['checksum'] = get_index_checksum(meta, arrays)
+
+    path_tmp = os.path.join(path, INDEX_META + '.tmp')
+
+    with open(path_tmp, 'wt', encoding = 'utf-8') as f:
+        json.dump(meta, f)
+
+    os.replace(path_tmp, os.path.join(path, INDEX_META))
+
+    return meta['checksum']
+
+class IndexedFiles(Sequence):
+    # Paths of per-cluster files of an indexed dataset
+
+    def __init__(self, root : str, index : 'DatasetIndex') -> None:
+        self._root  = root
+        self._index = index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ self[i] for i in range(*index.indices(len(self))) ]
+
+        return os.path.join(self._root, self._index.get_file(index))
+
+class DatasetIndex:
+
+    def __init__(self, root : str, mmap_mode : Optional[str] = 'r') -> None:
+        self._root      = root
+        self._mmap_mode = mmap_mode
+
+        path = os.path.join(root, DATASET_INDEX)
+
+        with open(
+            os.path.join(path, INDEX_META), 'rt', encoding = 'utf-8'
+        ) as f:
+            self._meta = json.load(f)
+
+        if self._meta['version'] != INDEX_VERSION:
+            raise RuntimeError(
+                f"Unsupported dataset index version: {self._meta['version']}"
+            )
+
+        self._arrays = {
+            name : np.load(
+                os.path.join(path, name + '.npy'), mmap_mode = mmap_mode
+            )
+                for name in INDEX_ARRAYS
+        }
+
+    @property
+    def layout(self) -> str:
+        return self._meta['layout']
+
+    @property
+    def shards(self) -> List[str]:
+        return self._meta['shards']
+
+    @property
+    def features(self) -> FeaturesMeta:
+        return self._meta['features']
+
+    @property
+    def checksum(self) -> str:
+        return self._meta['checksum']
+
+    @property
+    def config_hash(self) -> Optional[str]:
+        return self._meta['config_hash']
+
+    @property
+    def normalization(self) -> Optional[Dict[str, Any]]:
+        # Record of `lagrtools normalize` (see `lagrtools.normalization`)
+        return self._meta.get('normalization', None)
+
+    @property
+    def keys(self) -> List[str]:
+        return self._meta['keys']
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._arrays['counts']
+
+    @property
+    def locations(self) -> np.ndarray:
+        return self._arrays['locations']
+
+    @property
+    def files(self) -> IndexedFiles:
+        if self.layout != LAYOUT_FILES:
+            raise ValueError(f"Dataset '{self._root}' is sharded")
+
+        return IndexedFiles(self._root, self)
+
+    @property
+    def graph_sizes(self) -> GraphSizes:
+        return GraphSizes(self.get_names(), self.keys, self.counts)
+
+    def __len__(self) -> int:
+        return len(self._arrays['names'])
+
+    def get_name(self, index : int) -> str:
+        return self._arrays['names'][index].decode('utf-8')
+
+    def get_names(self) -> List[str]:
+        return [ x.decode('utf-8') for x in self._arrays['names'].tolist() ]
+
+    def get_file(self, index : int) -> str:
+        return self.get_name(index) + '.npz'
+
+    def get_location(self, index : int) -> Tuple[int, int]:
+        unit, position = self._arrays['locations'][index]
+        return (int(unit), int(position))
+
+    def get_metadata(self, index : int) -> Dict[str, Any]:
+        # Metadata of a graph, without opening it
+        unit, position = self.get_location(index)
+
+        if self.layout == LAYOUT_SHARDS:
+            location = { 'shard' : self.shards[unit], 'position' : position }
+        else:
+            location = { 'file' : self.get_file(index) }
+
+        return {
+            'name'     : self.get_name(index),
+            **location,
+            'sizes'    : {
+                k : int(n) for (k, n) in zip(self.keys, self.counts[index])
+            },
+            'features' : self.features,
+        }
+
+    def verify(self) -> bool:
+        # Reads the whole index
+        return get_index_checksum(self._meta, self._arrays) == self.checksum
+
+    def __getstate__(self):
+        # Memory maps are reopened, instead of being copied, by workers
+        return (self._root, self._mmap_mode)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+def load_dataset_index(
+    root : str, mmap_mode : Optional[str] = 'r'
+) -> Optional[DatasetIndex]:
+    if not has_dataset_index(root):
+        return None
+
+    return DatasetIndex(root, mmap_mode)
+
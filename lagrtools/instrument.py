@@ -0,0 +1,241 @@
+import json
+import os
+import time
+from multiprocessing.util import Finalize
+from typing import Dict, List, Optional
+
+# Opt-in instrumentation: per-stage timers and counters.
+#
+# Enabled by setting LAGR_INSTRUMENT to an output directory before the start
+# (or by calling `enable`, which sets it), s.t. pool and `DataLoader` workers
+# inherit it.
+# Each process keeps its own counters and periodically saves them to
+# DIR/proc-PID.json. The counters of all the processes are summed up into
+# DIR/summary.json and DIR/metrics.prom (Prometheus text format).
+#
+# When disabled, `timer` returns a shared no-op context manager and `count`
+# returns immediately.
+
+INSTRUMENT_ENV = 'LAGR_INSTRUMENT'
+
+FLUSH_INTERVAL = 5.0
+
+FIELDS  = ( 'calls', 'seconds', 'bytes', 'nodes', 'edges' )
+SUMMARY = 'summary.json'
+METRICS = 'metrics.prom'
+
+Counters = Dict[str, Dict[str, float]]
+
+class NullTimer:
+    # pylint: disable=too-few-public-methods
+
+    def __enter__(self) -> 'NullTimer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def add(self, **amounts : float) -> None:
+        pass
+
+NULL_TIMER = NullTimer()
+
+class Recorder:
+
+    def __init__(self, root : str, interval : float) -> None:
+        self._root       = root
+        self._interval   = interval
+        self._pid        = os.getpid()
+        self._counters   : Counters = {}
+        self._last_flush = time.monotonic()
+
+        os.makedirs(root, exist_ok = True)
+
+        # Unlike `atexit` handlers, these run in `multiprocessing` workers
+        # (e.g. `DataLoader` ones) that exit normally, and in the main process
+        self._finalizer = Finalize(None, self.flush, exitpriority = 10)
+
+    @property
+    def pid(self) -> int:
+        return self._pid
+
+    @property
+    def root(self) -> str:
+        return self._root
+
+    def record(self, stage : str, seconds : float, amounts : Dict) -> None:
+        counters = self._counters.get(stage, None)
+
+        if counters is None:
+            counters = self._counters[stage] = dict.fromkeys(FIELDS, 0)
+
+        counters['calls']   += 1
+        counters['seconds'] += seconds
+
+        for (field, value) in amounts.items():
+            counters[field] += value
+
+        if time.monotonic() - self._last_flush > self._interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if os.getpid() != self._pid:
+            return
+
+        path = os.path.join(self._root, f'proc-{self._pid}.json')
+
+        with open(path + '.tmp', 'wt', encoding = 'utf-8') as f:
+            json.dump(self._counters, f)
+
+        os.replace(path + '.tmp', path)
+        save_summary(self._root)
+
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._finalizer.cancel()
+
+class Timer:
+    __slots__ = ( '_recorder', '_stage', '_amounts', '_start' )
+
+    def __init__(self, recorder : Recorder, stage : str) -> None:
+        self._recorder = recorder
+        self._stage    = stage
+        self._amounts  : Dict[str, float] = {}
+        self._start    = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._recorder.record(
+            self._stage, time.perf_counter() - self._start, self._amounts
+        )
+
+    def add(self, **amounts : float) -> None:
+        # Adds amounts (bytes, nodes, edges) processed in this stage
+        for (field, value) in amounts.items():
+            self._amounts[field] = self._amounts.get(field, 0) + value
+
+_RECORDER : Optional[Recorder] = None
+
+# Process, in which the environment was checked last. Forked processes
+# check it again, and start with counters of their own.
+_CHECKED_PID : Optional[int] = None
+
+def get_recorder() -> Optional[Recorder]:
+    # pylint: disable=global-statement
+    global _RECORDER
+    global _CHECKED_PID
+
+    pid = os.getpid()
+
+    if _CHECKED_PID == pid:
+        return _RECORDER
+
+    root = os.environ.get(INSTRUMENT_ENV, None)
+
+    _RECORDER    = Recorder(root, FLUSH_INTERVAL) if root else None
+    _CHECKED_PID = pid
+
+    return _RECORDER
+
+def reset() -> None:
+    # pylint: disable=global-statement
+    global _RECORDER
+    global _CHECKED_PID
+
+    if (_RECORDER is not None) and (_CHECKED_PID == os.getpid()):
+        _RECORDER.close()
+
+    _RECORDER    = None
+    _CHECKED_PID = None
+
+def enable(root : str) -> None:
+    reset()
+    os.environ[INSTRUMENT_ENV] = root
+
+def disable() -> None:
+    reset()
+    os.environ.pop(INSTRUMENT_ENV, None)
+
+def is_enabled() -> bool:
+    return bool(os.environ.get(INSTRUMENT_ENV, None))
+
+def timer(stage : str):
+    recorder = get_recorder()
+
+    if recorder is None:
+        return NULL_TIMER
+
+    return Timer(recorder, stage)
+
+def count(stage : str, **amounts : float) -> None:
+    # Records an untimed event
+    recorder = get_recorder()
+
+    if recorder is not None:
+        recorder.record(stage, 0.0, amounts)
+
+def flush() -> None:
+    recorder = get_recorder()
+
+    if recorder is not None:
+        recorder.flush()
+
+def load_summary(root : str) -> Counters:
+    result : Counters = {}
+
+    for fname in sorted(os.listdir(root)):
+        if not (fname.startswith('proc-') and fname.endswith('.json')):
+            continue
+
+        path = os.path.join(root, fname)
+
+        try:
+            with open(path, 'rt', encoding = 'utf-8') as f:
+                counters = json.load(f)
+        except FileNotFoundError:
+            continue
+
+        for (stage, values) in counters.items():
+            total = result.setdefault(stage, dict.fromkeys(FIELDS, 0))
+
+            for field in FIELDS:
+                total[field] += values.get(field, 0)
+
+    return result
+
+def format_prometheus(summary : Counters) -> str:
+    lines : List[str] = []
+
+    for field in FIELDS:
+        metric = f'lagr_stage_{field}_total'
+
+        lines.append(f'# TYPE {metric} counter')
+        lines += [
+            f'{metric}{{stage="{stage}"}} {values[field]}'
+                for (stage, values) in sorted(summary.items())
+        ]
+
+    return '\n'.join(lines) + '\n'
+
+def save_summary(root : str) -> None:
+    # Several processes may save the summary at once. Each write is atomic,
+    # and is tagged by pid, s.t. the writers never clash.
+    summary = load_summary(root)
+    tmp_ext = f'.{os.getpid()}.tmp'
+
+    for (fname, text) in [
+        (SUMMARY, json.dumps(summary, sort_keys = True, indent = 4)),
+        (METRICS, format_prometheus(summary)),
+    ]:
+        path = os.path.join(root, fname)
+
+        with open(path + tmp_ext, 'wt', encoding = 'utf-8') as f:
+            f.write(text)
+
+        os.replace(path + tmp_ext, path)
+
@@ -2,16 +2,23 @@ from typing import Tuple
 
 import numpy as np
 
-from .nodes import Nodes
+from .nodes import Nodes, pack_ids_pair
 from .graph import NodesDict, MaskDict, Graph
 
 def get_node_intersection_masks(
     n1 : Nodes, n2 : Nodes
 ) -> Tuple[np.ndarray, np.ndarray]:
-    common_ids = n1.id_set.intersection(n2.id_set)
+    keys1, keys2 = pack_ids_pair(n1.ids, n2.ids)
 
-    mask1 = n1.ids_in_set_mask(common_ids)
-    mask2 = n2.ids_in_set_mask(common_ids)
+    _, idx1, idx2 = np.intersect1d(
+        keys1, keys2, assume_unique = True, return_indices = True
+    )
+
+    mask1 = np.zeros(len(keys1), dtype = bool)
+    mask2 = np.zeros(len(keys2), dtype = bool)
+
+    mask1[idx1] = True
+    mask2[idx2] = True
 
     return (mask1, mask2)
 
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+# Manifest of a preprocessed dataset: ROOT/manifest.json
+#
+# For each source pair `(img, tru)` it records the state of the input files
+# and the outputs, produced from them, s.t. a rerun of the preprocessing can
+# skip the pairs that did not change. All the records are invalidated if the
+# configuration hash changes.
+
+MANIFEST         = 'manifest.json'
+MANIFEST_VERSION = 1
+
+SourceState = Dict[str, Dict[str, Any]]
+
+def get_file_state(path : str) -> Dict[str, Any]:
+    stat = os.stat(path)
+
+    return {
+        'name'     : os.path.basename(path),
+        'size'     : stat.st_size,
+        'mtime_ns' : stat.st_mtime_ns,
+    }
+
+def get_source_state(
+    root : str, fname_img : str, fname_tru : str
+) -> SourceState:
+    return {
+        'img' : get_file_state(os.path.join(root, fname_img)),
+        'tru' : get_file_state(os.path.join(root, fname_tru)),
+    }
+
+def hash_config(config_path : str, **options : Any) -> str:
+    result = hashlib.sha256()
+
+    with open(config_path, 'rb') as f:
+        result.update(f.read())
+
+    result.update(json.dumps(options, sort_keys = True).encode('utf-8'))
+
+    return result.hexdigest()
+
+class Manifest:
+
+    def __init__(self, root : str) -> None:
+        self._path = os.path.join(root, MANIFEST)
+
+        self._config_hash : Optional[str]             = None
+        self._sources     : Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(self._path):
+            with open(self._path, 'rt', encoding = 'utf-8') as f:
+                manifest = json.load(f)
+
+            if manifest['version'] != MANIFEST_VERSION:
+                raise RuntimeError(
+                    f"Unsupported manifest version: {manifest['version']}"
+                )
+
+            self._config_hash = manifest['config_hash']
+            self._sources     = manifest['sources']
+
+    @property
+    def config_hash(self) -> Optional[str]:
+        return self._config_hash
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._sources.keys())
+
+    def reset(self, config_hash : str) -> None:
+        self._config_hash = config_hash
+        self._sources     = {}
+
+    def is_up_to_date(self, suffix : str, state : SourceState) -> bool:
+        record = self._sources.get(suffix, None)
+
+        if record is None:
+            return False
+
+        return (
+                (record['img'] == state['img'])
+            and (record['tru'] == state['tru'])
+        )
+
+    def get_outputs(self, suffix : str) -> List[str]:
+        return self._sources[suffix]['outputs']
+
+    def get_stats(self, suffix : str) -> Optional[str]:
+        # Name of the file with merge-able feature statistics of the outputs,
+        # if they were recorded
+        return self._sources[suffix].get('stats', None)
+
+    def get_sizes(self, suffix : str) -> Optional[str]:
+        # Name of the file with node and edge counts of the output graphs
+        # (see `lagrtools.sizes`), if they were recorded
+        return self._sources[suffix].get('sizes', None)
+
+    def add_source(
+        self, suffix : str, state : SourceState, outputs : List[str],
+        stats : Optional[str] = None, sizes : Optional[str] = None
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self._sources[suffix] = { **state, 'outputs' : sorted(outputs) }
+
+        if stats is not None:
+            self._sources[suffix]['stats'] = stats
+
+        if sizes is not None:
+            self._sources[suffix]['sizes'] = sizes
+
+    def remove_source(self, suffix : str) -> None:
+        del self._sources[suffix]
+
+    def save(self) -> None:
+        manifest = {
+            'version'     : MANIFEST_VERSION,
+            'config_hash' : self._config_hash,
+            'sources'     : self._sources,
+        }
+
+        with open(self._path + '.tmp', 'wt', encoding = 'utf-8') as f:
+            json.dump(manifest, f, sort_keys = True, indent = 4)
+
+        os.replace(self._path + '.tmp', self._path)
@@ -0,0 +1,33 @@
+import json
+import os
+from typing import Any, Dict
+
+# Dataset-wide metadata, stored as ROOT/dataset.json
+
+DATASET_META = 'dataset.json'
+
+DatasetMeta = Dict[str, Any]
+
+def load_dataset_meta(root : str) -> DatasetMeta:
+    path = os.path.join(root, DATASET_META)
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'rt', encoding = 'utf-8') as f:
+        return json.load(f)
+
+def save_dataset_meta(root : str, meta : DatasetMeta) -> None:
+    path = os.path.join(root, DATASET_META)
+
+    with open(path + '.tmp', 'wt', encoding = 'utf-8') as f:
+        json.dump(meta, f, sort_keys = True, indent = 4)
+
+    os.replace(path + '.tmp', path)
+
+def update_dataset_meta(root : str, **kwargs : Any) -> DatasetMeta:
+    meta = load_dataset_meta(root)
+    meta.update(kwargs)
+
+    save_dataset_meta(root, meta)
+    return meta
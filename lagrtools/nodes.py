@@ -1,4 +1,6 @@
-from typing import Dict, Set, Tuple, List, Optional
+from typing import (
+    Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
+)
 import numpy as np
 
 NODE_FEATURES = {
@@ -33,35 +35,207 @@ NODE_FEATURE_IDX_MAP = {
    } for (node, features) in NODE_FEATURES.items()
 }
 
+# Selection of columns: a slice for a contiguous run of columns (indexing
+# returns a view), an index array otherwise
+ColumnIndex = Union[slice, np.ndarray]
+
+def compile_columns(indices : List[int]) -> ColumnIndex:
+    indices = np.asarray(indices, dtype = np.intp)
+
+    if len(indices) == 0:
+        return slice(0, 0)
+
+    if np.all(np.diff(indices) == 1):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+
+    return indices
+
+class NodeSelection:
+    # Compiled selection of ids and features of one node type. If
+    # `features` is None, all the columns are kept.
+    __slots__ = ( 'name', 'features', 'id_columns', 'feature_columns' )
+
+    def __init__(self, name : str, features : Optional[List[str]]) -> None:
+        if name not in NODE_FEATURES:
+            raise ValueError(f"Unknown node type: '{name}'")
+
+        idx_map = NODE_FEATURE_IDX_MAP[name]
+        unknown = [ f for f in (features or []) if f not in idx_map ]
+
+        if unknown:
+            raise ValueError(f"Unknown features of '{name}': {unknown}")
+
+        self.name       = name
+        self.id_columns = compile_columns(
+            [ idx_map[feature] for feature in NODE_IDS[name] ]
+        )
+
+        if features is None:
+            self.features        = NODE_FEATURES[name]
+            self.feature_columns = slice(None)
+        else:
+            self.features        = list(features)
+            self.feature_columns = compile_columns(
+                [ idx_map[feature] for feature in features ]
+            )
+
+    def select_ids(self, values : np.ndarray) -> np.ndarray:
+        return values[:, self.id_columns].astype(np.int32, copy = False)
+
+    def select_features(self, values : np.ndarray) -> np.ndarray:
+        return values[:, self.feature_columns]
+
+class FeaturePlan(Mapping):
+    # Validated feature config: { node type : NodeSelection }. Node types,
+    # that are absent from it, are dropped.
+
+    def __init__(self, selections : Dict[str, NodeSelection]) -> None:
+        self._selections = selections
+
+    @staticmethod
+    def from_config(feature_config : FeatureConfig) -> 'FeaturePlan':
+        return FeaturePlan({
+            name : NodeSelection(name, features)
+                for (name, features) in feature_config.items()
+        })
+
+    def __getitem__(self, name : str) -> NodeSelection:
+        return self._selections[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._selections)
+
+    def __len__(self) -> int:
+        return len(self._selections)
+
+DEFAULT_FEATURE_PLAN = FeaturePlan.from_config(
+    { name : None for name in NODE_FEATURES }
+)
+
+def get_feature_plan(
+    feature_config : Optional[Union[FeatureConfig, FeaturePlan]]
+) -> FeaturePlan:
+    # Configs are compiled on each call. Plans should be reused instead.
+    if feature_config is None:
+        return DEFAULT_FEATURE_PLAN
+
+    if isinstance(feature_config, FeaturePlan):
+        return feature_config
+
+    return FeaturePlan.from_config(feature_config)
+
+def pack_ids(ids : np.ndarray) -> np.ndarray:
+    # Packs each row of `ids` into a single sortable key, s.t. two rows are
+    # equal iff their keys are equal. Single column ids and pairs of 32-bit
+    # ids are packed into int64, wider rows are viewed as opaque bytes.
+    ids = np.asarray(ids)
+
+    if ids.ndim == 1:
+        ids = ids[:, np.newaxis]
+
+    n_cols = ids.shape[1]
+
+    if n_cols == 1:
+        return ids[:, 0].astype(np.int64)
+
+    if (
+            (n_cols == 2)
+        and np.issubdtype(ids.dtype, np.integer)
+        and (ids.dtype.itemsize <= 4)
+    ):
+        hi = ids[:, 0].astype(np.int64)
+        lo = ids[:, 1].astype(np.int64) & 0xFFFFFFFF
+
+        return (hi << 32) | lo
+
+    ids = np.ascontiguousarray(ids, dtype = np.int64)
+    return ids.view(np.dtype((np.void, ids.itemsize * n_cols)))[:, 0]
+
+def pack_ids_pair(
+    ids1 : np.ndarray, ids2 : np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    keys1 = pack_ids(ids1)
+    keys2 = pack_ids(ids2)
+
+    if keys1.dtype != keys2.dtype:
+        keys1 = pack_ids(np.asarray(ids1, dtype = np.int64))
+        keys2 = pack_ids(np.asarray(ids2, dtype = np.int64))
+
+    return (keys1, keys2)
+
 class Nodes:
+    __slots__ = (
+        '_ids', '_values', '_features', '_keys', '_index_keys', '_index_perm'
+    )
 
     def __init__(
         self,
         ids      : np.ndarray,
         values   : np.ndarray,
-        features : Optional[List[str]] = None
+        features : Optional[List[str]] = None,
+        validate : bool = True,
     ) -> None:
         self._ids      = ids
         self._values   = values
         self._features = features
 
-        self._id_set = set(tuple(x) for x in ids)
-        self._id_index_map = { tuple(x) : i for (i, x) in enumerate(ids) }
+        self._keys       = None
+        self._index_keys = None
+        self._index_perm = None
 
-        assert len(self._ids) == len(self._id_set), \
-            'Duplicated ids found'
+        if validate:
+            assert len(np.unique(self.keys)) == len(self._ids), \
+                'Duplicated ids found'
 
     @property
     def ids(self) -> np.ndarray:
         return self._ids
 
+    @property
+    def keys(self) -> np.ndarray:
+        if self._keys is None:
+            self._keys = pack_ids(self._ids)
+
+        return self._keys
+
+    def _get_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._index_perm is None:
+            self._index_perm = np.argsort(self.keys, kind = 'stable')
+            self._index_keys = self.keys[self._index_perm]
+
+        return (self._index_keys, self._index_perm)
+
     @property
     def id_set(self) -> Set[NodeId]:
-        return self._id_set
+        return set(tuple(x) for x in self._ids.tolist())
 
     @property
     def id_index_map(self) -> Dict[NodeId, int]:
-        return self._id_index_map
+        return { tuple(x) : i for (i, x) in enumerate(self._ids.tolist()) }
+
+    def index_of(self, ids : np.ndarray) -> np.ndarray:
+        # Returns positions of `ids` rows in this node set (-1 if absent)
+        ids = np.asarray(ids)
+        ids = ids.reshape((-1, *self._ids.shape[1:]))
+
+        index_keys, index_perm = self._get_index()
+        query_keys = pack_ids(ids)
+
+        if query_keys.dtype != index_keys.dtype:
+            keys, query_keys = pack_ids_pair(self._ids, ids)
+            index_keys       = keys[index_perm]
+
+        result = np.full(len(query_keys), -1, dtype = np.int64)
+
+        if len(index_keys) == 0:
+            return result
+
+        pos   = np.searchsorted(index_keys, query_keys)
+        pos   = np.minimum(pos, len(index_keys) - 1)
+        found = (index_keys[pos] == query_keys)
+
+        result[found] = index_perm[pos[found]]
+        return result
 
     @property
     def values(self) -> np.ndarray:
@@ -88,47 +262,45 @@ class Nodes:
 
     @staticmethod
     def get_ids(name : str, values : np.ndarray) -> np.ndarray:
-        id_indices  = [
-            NODE_FEATURE_IDX_MAP[name][feature] for feature in NODE_IDS[name]
-        ]
-        result = values[:, id_indices]
-
-        return result.astype(np.int32)
+        return DEFAULT_FEATURE_PLAN[name].select_ids(values)
 
     @staticmethod
     def from_values(
         name : str, values : np.ndarray,
-        feature_config : Optional[FeatureConfig]
+        feature_config : Optional[Union[FeatureConfig, FeaturePlan]]
     ) -> Optional['Nodes']:
 
-        if (feature_config is not None) and (name not in feature_config):
-            return None
+        feature_plan = get_feature_plan(feature_config)
 
-        ids               = Nodes.get_ids(name, values)
-        feature_config    = feature_config or {}
-        selected_features = feature_config.get(name, None)
+        if name not in feature_plan:
+            return None
 
-        if selected_features is not None:
-            selected_indices  = [
-                NODE_FEATURE_IDX_MAP[name][feature]
-                    for feature in selected_features
-            ]
-            values = values[:, selected_indices]
-        else:
-            selected_features = NODE_FEATURES[name]
+        selection = feature_plan[name]
 
-        return Nodes(ids, values, selected_features)
+        return Nodes(
+            selection.select_ids(values), selection.select_features(values),
+            selection.features
+        )
 
     def ids_in_set_mask(self, filter_ids : Set[NodeId]) -> np.ndarray:
-        mask = np.isin(self.ids, list(filter_ids), assume_unique = True)
-        mask = np.all(mask, axis = 1)
-        return mask
+        filter_ids = np.array(list(filter_ids), dtype = self.ids.dtype)
+        return self.ids_in_mask(filter_ids)
+
+    def ids_in_mask(self, filter_ids : np.ndarray) -> np.ndarray:
+        filter_ids = np.asarray(filter_ids)
+        filter_ids = filter_ids.reshape((-1, *self.ids.shape[1:]))
+
+        keys, filter_keys = pack_ids_pair(self.ids, filter_ids)
+        return np.isin(keys, filter_keys)
 
     def filter(self, mask : np.ndarray) -> 'Nodes':
         if mask is None:
             return self
 
-        return Nodes(self.ids[mask], self.values[mask], self.features)
+        # A subset of unique ids is unique -- no need to validate again
+        return Nodes(
+            self.ids[mask], self.values[mask], self.features, validate = False
+        )
 
     def __getstate__(self):
         return {
@@ -138,7 +310,8 @@ class Nodes:
         }
 
     def __setstate__(self, state_dict):
-        return Nodes(
-            state_dict['ids'], state_dict['values'], state_dict['features']
+        Nodes.__init__(
+            self, state_dict['ids'], state_dict['values'],
+            state_dict['features'], validate = False
         )
 
@@ -0,0 +1,108 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .meta import load_dataset_meta
+
+# FeaturePath : (node_name, io_type)
+FeaturePath = Tuple[str, str]
+
+# StatDict : { feature_path : { stat : [ value, ] } }
+StatDict    = Dict[FeaturePath, Dict[str, List[float]]]
+
+# NormParams : (shift, scale), s.t. normalized = (values - shift) / scale
+NormParams  = Tuple[np.ndarray, np.ndarray]
+
+NORM_TYPES = ( 'standartize', 'robust', 'minmax' )
+
+# Statistics used by each norm type
+NORM_STATS = {
+    'standartize' : ( 'mean', 'stdev' ),
+    'robust'      : ( 'p25', 'p50', 'p75' ),
+    'minmax'      : ( 'min', 'max' ),
+}
+
+def unpack_stat_name(name : str) -> FeaturePath:
+    tokens = name.split(':', maxsplit = 2)
+    assert tokens[0] == 'node'
+
+    io_type   = tokens[1]
+    node_name = tokens[2]
+
+    return (node_name, io_type)
+
+def load_feature_stats(root : str) -> StatDict:
+    path = os.path.join(root, 'stats.json')
+
+    with open(path, 'rt', encoding = 'utf-8') as f:
+        result = json.load(f)
+
+    return {
+        unpack_stat_name(name) : {
+            stat : np.array(values, dtype = np.float32)
+            for (stat, values) in values_dict.items()
+        }
+        for (name, values_dict) in result.items()
+    }
+
+def get_norm_params(
+    stats : Dict[str, np.ndarray], norm_type : str, eps : float
+) -> NormParams:
+    if norm_type == 'standartize':
+        return (stats['mean'], stats['stdev'] + eps)
+
+    if norm_type == 'robust':
+        # Median and interquartile range, insensitive to heavy tails
+        if 'p50' not in stats:
+            raise ValueError(
+                "Feature stats have no percentiles. Recompute them with"
+                " scripts/dataset_stats or scripts/preprocess --stats"
+            )
+
+        return (stats['p50'], stats['p75'] - stats['p25'] + eps)
+
+    if norm_type == 'minmax':
+        return (stats['min'], stats['max'] - stats['min'] + eps)
+
+    raise ValueError(f'Unknown norm type: {norm_type}')
+
+def normalize_values(values : np.ndarray, params : NormParams) -> np.ndarray:
+    # Keeps the stored float dtype (e.g. float16 of `--float-dtype`), but
+    # computes in at least float32
+    shift, scale = params
+
+    dtype = values.dtype
+    if not np.issubdtype(dtype, np.floating):
+        dtype = np.dtype(np.float32)
+
+    result  = np.array(values, dtype = np.promote_types(dtype, np.float32))
+    result -= shift
+    result /= scale
+
+    return result.astype(dtype, copy = False)
+
+def get_dataset_normalization(root : str) -> Optional[Dict]:
+    # Returns normalization that was applied to the dataset offline. Raises,
+    # if the dataset is only partially normalized (interrupted run).
+    normalization = load_dataset_meta(root).get('normalization', None)
+
+    if (normalization is not None) and (
+        not normalization.get('complete', True)
+    ):
+        raise RuntimeError(
+            f"Normalization of dataset '{root}' was interrupted. Finish it"
+            " with `lagrtools normalize --resume`"
+        )
+
+    return normalization
+
+def check_not_normalized(root : str) -> None:
+    normalization = get_dataset_normalization(root)
+
+    if normalization is not None:
+        raise RuntimeError(
+            f"Dataset '{root}' has already been normalized"
+            f" ({normalization['norm_type']}). Refusing to normalize twice"
+        )
@@ -0,0 +1,42 @@
+import heapq
+import os
+from typing import List, Sequence
+
+# Deterministic partitioning of dataset units (per-cluster files or shards)
+# between ranks of a distributed run.
+#
+# Units are assigned greedily, largest first, to the least loaded rank. The
+# result depends only on the unit weights and their order, s.t. all ranks
+# agree on it. Units of each rank keep their original order.
+
+BALANCE_TYPES = ( 'size', 'count' )
+
+def partition_units(
+    weights : Sequence[float], world_size : int
+) -> List[List[int]]:
+    # Returns indices of units of each rank
+    if world_size < 1:
+        raise ValueError(f'Invalid world size: {world_size}')
+
+    order  = sorted(range(len(weights)), key = lambda i: (-weights[i], i))
+    loads  = [ (0, rank) for rank in range(world_size) ]
+    result : List[List[int]] = [ [] for _ in range(world_size) ]
+
+    for idx in order:
+        load, rank = heapq.heappop(loads)
+
+        result[rank].append(idx)
+        heapq.heappush(loads, (load + weights[idx], rank))
+
+    return [ sorted(indices) for indices in result ]
+
+def get_path_size(path : str) -> int:
+    # Size of a file, or total size of files in a directory (shard)
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+
+    return sum(
+        os.path.getsize(os.path.join(path, fname))
+            for fname in os.listdir(path)
+    )
+
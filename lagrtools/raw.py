@@ -0,0 +1,171 @@
+import re
+import struct
+import zipfile
+from collections.abc import Mapping
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from .graph import parse_edge_name
+from .nodes import FeatureConfig, FeaturePlan
+
+# Lazy reader of raw Wire-Cell files `clusters-(img|tru)-*.npz`.
+#
+# Members `cluster_N_NAME.npy` are grouped by cluster, and the arrays of a
+# cluster are read only on access. Only members stored without compression
+# (ZIP_STORED, i.e. `np.savez`) are memory-mapped, s.t. selecting feature
+# columns reads only the pages of these columns. Compressed members (e.g.
+# of `np.savez_compressed`) can not be mapped: each access decompresses the
+# whole array, and the columns are selected afterwards.
+
+ARRAY_RE = re.compile(r'^(cluster_\d+)_(.*)$')
+
+NPY_EXT = '.npy'
+
+# Size of the fixed part of a zip local file header, and offsets of the
+# file name and extra field lengths in it
+ZIP_LOCAL_HEADER_SIZE = 30
+ZIP_LOCAL_HEADER_FMT  = '<26xHH'
+
+def is_array_required(
+    name           : str,
+    feature_config : Optional[Union[FeatureConfig, FeaturePlan]]
+) -> bool:
+    # Mirrors `load_single_graph_from_dict`: nodes absent from the config
+    # are dropped, together with the edges that connect them
+    if feature_config is None:
+        return True
+
+    if name.endswith('nodes'):
+        return name in feature_config
+
+    if name.endswith('edges'):
+        return all(n in feature_config for n in parse_edge_name(name))
+
+    return False
+
+def get_member_data_offset(f : BinaryIO, info : zipfile.ZipInfo) -> int:
+    f.seek(info.header_offset)
+    header = f.read(ZIP_LOCAL_HEADER_SIZE)
+
+    len_name, len_extra = struct.unpack(ZIP_LOCAL_HEADER_FMT, header)
+
+    return info.header_offset + ZIP_LOCAL_HEADER_SIZE + len_name + len_extra
+
+def map_stored_member(
+    path : str, f : BinaryIO, info : zipfile.ZipInfo
+) -> Optional[np.ndarray]:
+    # Returns a read-only memory map of a stored `.npy` member, or None if
+    # the member cannot be mapped
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    offset = get_member_data_offset(f, info)
+    f.seek(offset)
+
+    version = np.lib.format.read_magic(f)
+
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    elif version == (2, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    else:
+        return None
+
+    if dtype.hasobject or (np.prod(shape) == 0):
+        return None
+
+    return np.memmap(
+        path, dtype = dtype, mode = 'r', offset = f.tell(), shape = shape,
+        order = ('F' if fortran else 'C')
+    )
+
+class RawClusterArrays(Mapping):
+    # Read-only mapping { array name : values } of a single cluster.
+    # Arrays are not kept: each access reads (or maps) a member again.
+
+    def __init__(
+        self, raw_file : 'RawClusterFile', members : Dict[str, zipfile.ZipInfo]
+    ) -> None:
+        self._raw_file = raw_file
+        self._members  = members
+
+    def __getitem__(self, name : str) -> np.ndarray:
+        return self._raw_file.read_member(self._members[name])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+class RawClusterFile:
+
+    def __init__(self, path : str, mmap : bool = True) -> None:
+        self._path    = path
+        self._mmap    = mmap
+        self._zipfile = zipfile.ZipFile(path, mode = 'r')
+        # Separate handle for memory mapping, to not move the zip position
+        self._file    = open(path, 'rb')  # pylint: disable=consider-using-with
+
+        self._clusters : Dict[str, Dict[str, zipfile.ZipInfo]] = {}
+
+        for info in self._zipfile.infolist():
+            name = info.filename
+
+            if name.endswith(NPY_EXT):
+                name = name[:-len(NPY_EXT)]
+
+            m = ARRAY_RE.match(name)
+            if not m:
+                raise ValueError(f'Unknown array name: {info.filename}')
+
+            cluster_name, array_name = m.groups()
+            self._clusters.setdefault(cluster_name, {})[array_name] = info
+
+    @property
+    def clusters(self) -> List[str]:
+        return list(self._clusters.keys())
+
+    def get_cluster_sizes(self) -> Dict[str, int]:
+        # Returns { cluster : uncompressed size of its arrays }, in file order
+        return {
+            cluster : sum(info.file_size for info in members.values())
+                for (cluster, members) in self._clusters.items()
+        }
+
+    def read_member(self, info : zipfile.ZipInfo) -> np.ndarray:
+        # Memory map of a stored member, or a decompressed copy
+        if self._mmap:
+            result = map_stored_member(self._path, self._file, info)
+
+            if result is not None:
+                return result
+
+        with self._zipfile.open(info, 'r') as stream:
+            return np.lib.format.read_array(stream, allow_pickle = False)
+
+    def get_cluster(
+        self,
+        cluster        : str,
+        feature_config : Optional[Union[FeatureConfig, FeaturePlan]] = None
+    ) -> RawClusterArrays:
+        # Unknown clusters are empty, as if they had no nodes
+        members = {
+            name : info
+                for (name, info) in self._clusters.get(cluster, {}).items()
+                if is_array_required(name, feature_config)
+        }
+
+        return RawClusterArrays(self, members)
+
+    def close(self) -> None:
+        self._zipfile.close()
+        self._file.close()
+
+    def __enter__(self) -> 'RawClusterFile':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
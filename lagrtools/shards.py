@@ -0,0 +1,334 @@
+import json
+import os
+import shutil
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .funcs import EDGE_INDEX, MergedGraph, flatten_key, parse_key
+
+# Sharded dataset layout:
+#   ROOT/shards.json              -- list of shards and their sizes
+#   ROOT/SHARD/meta.json          -- keys and names of the graphs in a shard
+#   ROOT/SHARD/offsets.npy        -- (n_graphs, n_keys, 2) [start, stop) rows
+#   ROOT/SHARD/{flat_key}.npy     -- arrays of all graphs, concatenated
+#
+# Missing keys of a graph are marked by start = stop = -1.
+#
+# Since version 2, edges are stored under EDGE_INDEX keys (as in merged graph
+# files, see `get_stored_arrays`): a flat array of contiguous (2, E) blocks
+# of each graph, with offsets in edges. Thus, edges of each graph are loaded
+# as a contiguous (2, E) array, without copies.
+
+SHARDS_INDEX   = 'shards.json'
+SHARD_META     = 'meta.json'
+SHARD_OFFSETS  = 'offsets.npy'
+SHARDS_VERSION = 2
+
+# Versions, that can be read
+SHARDS_VERSIONS = ( 1, 2 )
+
+def is_sharded(root : str) -> bool:
+    return os.path.isfile(os.path.join(root, SHARDS_INDEX))
+
+def get_shard_name(index : int) -> str:
+    return f'shard_{index:06d}'
+
+def load_shards_index(root : str) -> List[Dict]:
+    path = os.path.join(root, SHARDS_INDEX)
+
+    if not os.path.exists(path):
+        return []
+
+    with open(path, 'rt', encoding = 'utf-8') as f:
+        index = json.load(f)
+
+    if index['version'] not in SHARDS_VERSIONS:
+        raise RuntimeError(
+            f"Unsupported sharded dataset version: {index['version']}"
+        )
+
+    return index['shards']
+
+def save_shard(
+    path : str, names : List[str], graphs : List[MergedGraph]
+) -> None:
+    keys    = sorted(set(k for graph in graphs for k in graph))
+    offsets = np.full((len(graphs), len(keys), 2), -1, dtype = np.int64)
+
+    # Names of the stored arrays, in the order of `keys`
+    key_names = []
+
+    path_tmp = path + '.tmp'
+    os.makedirs(path_tmp)
+
+    for (key_idx, key) in enumerate(keys):
+        arrays = []
+        start  = 0
+
+        for (graph_idx, graph) in enumerate(graphs):
+            if key not in graph:
+                continue
+
+            values = graph[key]
+            offsets[graph_idx, key_idx] = (start, start + len(values))
+
+            arrays.append(values)
+            start += len(values)
+
+        if key[0] == 'edge':
+            flat_key = flatten_key((EDGE_INDEX, *key[1:]))
+            values   = np.concatenate(
+                [ np.ascontiguousarray(x.T).ravel() for x in arrays ]
+            )
+        else:
+            flat_key = flatten_key(key)
+            values   = np.concatenate(arrays, axis = 0)
+
+        key_names.append(flat_key)
+        np.save(os.path.join(path_tmp, flat_key + '.npy'), values)
+
+    np.save(os.path.join(path_tmp, SHARD_OFFSETS), offsets)
+
+    meta = {
+        'version' : SHARDS_VERSION,
+        'keys'    : key_names,
+        'names'   : names,
+    }
+
+    with open(
+        os.path.join(path_tmp, SHARD_META), 'wt', encoding = 'utf-8'
+    ) as f:
+        json.dump(meta, f)
+
+    # Leftover of an interrupted run
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    os.replace(path_tmp, path)
+
+class ShardWriter:
+    # `shards` -- records of existing shards to keep in the index
+
+    def __init__(
+        self,
+        root       : str,
+        shard_size : int,
+        shards     : Optional[List[Dict]] = None
+    ) -> None:
+        assert shard_size > 0
+
+        self._root       = root
+        self._shard_size = shard_size
+        self._shards     : List[Dict] = list(shards or [])
+        self._names      : List[str] = []
+        self._graphs     : List[MergedGraph] = []
+        self._next_index = 1 + max(
+            (int(x['name'].split('_')[-1]) for x in self._shards),
+            default = -1
+        )
+
+    @property
+    def shards(self) -> List[Dict]:
+        return self._shards
+
+    @property
+    def current_shard(self) -> str:
+        # Name of the shard, the next appended graph will be saved to
+        return get_shard_name(self._next_index)
+
+    def append(self, name : str, graph : MergedGraph) -> None:
+        self._names.append(name)
+        self._graphs.append(graph)
+
+        if len(self._graphs) >= self._shard_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._graphs:
+            return
+
+        name = self.current_shard
+        save_shard(os.path.join(self._root, name), self._names, self._graphs)
+
+        self._shards.append({ 'name' : name, 'size' : len(self._graphs) })
+        self._names       = []
+        self._graphs      = []
+        self._next_index += 1
+
+        self.save_index()
+
+    def save_index(self) -> None:
+        index = { 'version' : SHARDS_VERSION, 'shards' : self._shards }
+        path  = os.path.join(self._root, SHARDS_INDEX)
+
+        with open(path + '.tmp', 'wt', encoding = 'utf-8') as f:
+            json.dump(index, f, indent = 4)
+
+        os.replace(path + '.tmp', path)
+
+    def close(self) -> None:
+        self.flush()
+        self.save_index()
+
+    def __enter__(self) -> 'ShardWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+
+def load_shard_meta(path : str) -> Dict:
+    with open(
+        os.path.join(path, SHARD_META), 'rt', encoding = 'utf-8'
+    ) as f:
+        meta = json.load(f)
+
+    if meta['version'] not in SHARDS_VERSIONS:
+        raise RuntimeError(f"Unsupported shard version: {meta['version']}")
+
+    return meta
+
+class Shard:
+
+    def __init__(self, path : str, mmap_mode : Optional[str] = 'r') -> None:
+        self._path      = path
+        self._mmap_mode = mmap_mode
+
+        meta = load_shard_meta(path)
+
+        self._names   = meta['names']
+        self._offsets = np.load(os.path.join(path, SHARD_OFFSETS))
+        self._keys    = []
+        self._arrays  = []
+
+        for flat_key in meta['keys']:
+            key = parse_key(flat_key)
+
+            self._arrays.append(np.load(
+                os.path.join(path, flat_key + '.npy'), mmap_mode = mmap_mode
+            ))
+
+            if key[0] == EDGE_INDEX:
+                key = ('edge', *key[1:])
+
+            self._keys.append(key)
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def keys(self) -> List[Tuple[str, ...]]:
+        return self._keys
+
+    def _get_values(
+        self, key_idx : int, start : int, stop : int
+    ) -> np.ndarray:
+        key    = self._keys[key_idx]
+        values = self._arrays[key_idx]
+
+        if (key[0] == 'edge') and (values.ndim == 1):
+            return values[2 * start:2 * stop].reshape((2, -1)).T
+
+        return values[start:stop]
+
+    def get_array(self, key : Tuple[str, ...]) -> np.ndarray:
+        # Returns concatenated values of `key` of all graphs in the shard
+        key_idx = self._keys.index(key)
+        values  = self._arrays[key_idx]
+
+        if (key[0] == 'edge') and (values.ndim == 1):
+            return np.concatenate([
+                self._get_values(key_idx, start, stop)
+                    for (start, stop) in self._offsets[:, key_idx]
+                    if start >= 0
+            ])
+
+        return values
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index : int) -> MergedGraph:
+        result = {}
+
+        for (key_idx, key) in enumerate(self._keys):
+            start, stop = self._offsets[index, key_idx]
+
+            if start < 0:
+                continue
+
+            result[key] = self._get_values(key_idx, start, stop)
+
+        return result
+
+class ShardedGraphs:
+    # Shards are opened lazily, so that the memory maps are created by the
+    # process that reads them (e.g. by each `DataLoader` worker).
+
+    def __init__(
+        self,
+        root        : str,
+        mmap_mode   : Optional[str]       = 'r',
+        shard_names : Optional[List[str]] = None,
+    ) -> None:
+        # If `shard_names` are given, only these shards are used
+        self._root      = root
+        self._mmap_mode = mmap_mode
+
+        shards = load_shards_index(root)
+
+        if shard_names is not None:
+            shard_names = set(shard_names)
+            shards      = [ x for x in shards if x['name'] in shard_names ]
+
+        self._shard_names = [ x['name'] for x in shards ]
+        self._bounds      = np.cumsum([ 0, ] + [ x['size'] for x in shards ])
+        self._shards      : Dict[int, Shard] = {}
+
+    @property
+    def shard_names(self) -> List[str]:
+        return self._shard_names
+
+    def __len__(self):
+        return int(self._bounds[-1])
+
+    def locate(self, index : int) -> Tuple[int, int]:
+        if (index < 0) or (index >= len(self)):
+            raise IndexError(f'Graph index out of range: {index}')
+
+        shard_idx = int(np.searchsorted(self._bounds, index, side = 'right'))
+        shard_idx = shard_idx - 1
+
+        return (shard_idx, index - int(self._bounds[shard_idx]))
+
+    def get_names(self) -> List[str]:
+        # Names of all graphs, without opening the shards
+        return [
+            name
+                for shard_name in self._shard_names
+                for name in load_shard_meta(
+                    os.path.join(self._root, shard_name)
+                )['names']
+        ]
+
+    def get_shard(self, shard_idx : int) -> Shard:
+        shard = self._shards.get(shard_idx, None)
+
+        if shard is None:
+            path  = os.path.join(self._root, self._shard_names[shard_idx])
+            shard = Shard(path, self._mmap_mode)
+
+            self._shards[shard_idx] = shard
+
+        return shard
+
+    def __getitem__(self, index : int) -> MergedGraph:
+        shard_idx, local_idx = self.locate(index)
+        return self.get_shard(shard_idx)[local_idx]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shards'] = {}
+        return state
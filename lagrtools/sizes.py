@@ -0,0 +1,140 @@
+import os
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from .compression import load_arrays, save_arrays
+from .funcs       import MergedGraph, flatten_key, parse_key
+
+# Node and edge counts of each graph of a preprocessed dataset, s.t. graphs
+# can be grouped by size without opening them. They are saved by preprocess
+# to the dataset index (see `lagrtools.index`), as
+#   names  -- (n_graphs, ) names of graphs (file names without extension)
+#   keys   -- (n_keys, ) counted arrays: 'node:TYPE' and 'edge:SRC:DST'
+#   counts -- (n_graphs, n_keys) counts, 0 if a graph has no such array
+
+def get_merged_graph_sizes(graph : MergedGraph) -> Dict[str, int]:
+    result = {}
+
+    for (key, values) in graph.items():
+        if key[0] == 'node':
+            if key[1] == 'x':
+                result[flatten_key(('node', key[2]))] = len(values)
+        elif key[0] == 'edge':
+            result[flatten_key(key)] = len(values)
+
+    return result
+
+class GraphSizes:
+
+    def __init__(
+        self, names : List[str], keys : List[str], counts : np.ndarray
+    ) -> None:
+        if counts.shape != (len(names), len(keys)):
+            raise ValueError(
+                f'Invalid counts shape: {counts.shape}.'
+                f' Expected: {(len(names), len(keys))}'
+            )
+
+        self._names  = list(names)
+        self._keys   = list(keys)
+        self._counts = counts
+
+    @staticmethod
+    def from_dict(sizes : Dict[str, Dict[str, int]]) -> 'GraphSizes':
+        # { name : get_merged_graph_sizes(graph) }
+        names  = sorted(sizes)
+        keys   = sorted(set(k for x in sizes.values() for k in x))
+        counts = np.array(
+            [ [ sizes[name].get(k, 0) for k in keys ] for name in names ],
+            dtype = np.int64
+        ).reshape((len(names), len(keys)))
+
+        return GraphSizes(names, keys, counts)
+
+    @staticmethod
+    def concatenate(parts : Iterable['GraphSizes']) -> 'GraphSizes':
+        parts  = list(parts)
+        keys   = sorted(set(k for x in parts for k in x.keys))
+        names  = [ name for x in parts for name in x.names ]
+        counts = np.zeros((len(names), len(keys)), dtype = np.int64)
+
+        start = 0
+
+        for x in parts:
+            columns = [ keys.index(k) for k in x.keys ]
+            counts[start:start + len(x), columns] = x.counts
+            start += len(x)
+
+        return GraphSizes(names, keys, counts)
+
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    @property
+    def keys(self) -> List[str]:
+        return self._keys
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    def __len__(self):
+        return len(self._names)
+
+    def get_totals(self, kind : str) -> np.ndarray:
+        # Total number of nodes (kind = 'node') or edges ('edge') per graph
+        columns = [
+            idx for (idx, k) in enumerate(self._keys)
+                if parse_key(k)[0] == kind
+        ]
+
+        return self._counts[:, columns].sum(axis = 1)
+
+    @property
+    def n_nodes(self) -> np.ndarray:
+        return self.get_totals('node')
+
+    @property
+    def n_edges(self) -> np.ndarray:
+        return self.get_totals('edge')
+
+    def take(self, rows : np.ndarray) -> 'GraphSizes':
+        return GraphSizes(
+            [ self._names[idx] for idx in rows ], self._keys,
+            self._counts[rows]
+        )
+
+    def select(self, names : List[str]) -> 'GraphSizes':
+        # Sizes of graphs `names`, in this order
+        index   = { name : idx for (idx, name) in enumerate(self._names) }
+        missing = [ name for name in names if name not in index ]
+
+        if missing:
+            raise KeyError(f'Unknown graphs: {missing[:5]}')
+
+        return self.take(
+            np.array([ index[name] for name in names ], dtype = np.int64)
+        )
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {
+            'names'  : np.array(self._names, dtype = str),
+            'keys'   : np.array(self._keys,  dtype = str),
+            'counts' : self._counts,
+        }
+
+    @staticmethod
+    def from_state(state : Dict[str, np.ndarray]) -> 'GraphSizes':
+        return GraphSizes(
+            state['names'].tolist(), state['keys'].tolist(), state['counts']
+        )
+
+def save_graph_sizes(path : str, sizes : GraphSizes) -> None:
+    save_arrays(path + '.tmp', sizes.get_state(), 'zlib')
+    os.replace(path + '.tmp', path)
+
+def load_graph_sizes(path : str) -> GraphSizes:
+    return GraphSizes.from_state(load_arrays(path))
+
@@ -0,0 +1,251 @@
+import json
+import os
+from typing import Dict, List, Mapping
+
+import numpy as np
+
+from .compression import load_arrays, save_arrays
+
+# Per-feature statistics of node arrays (`node:x:*`, `node:y:*`).
+#
+# Means and sums of squared deviations from the mean (M2) are accumulated in
+# float64. Each batch of values and each partial accumulator is merged with
+# the pairwise update of Chan et al. (Welford's update for batches). Unlike
+# sums of squares, this does not lose precision when the mean is large
+# compared to the spread of values.
+#
+# Quantiles are estimated from fixed-size, mergeable sketches: histograms
+# with logarithmic bins of |x| (as in DDSketch), one per sign. Quantiles of
+# values within [SKETCH_MIN, SKETCH_MAX] in magnitude have relative error at
+# most SKETCH_ALPHA. Smaller magnitudes fall into a single zero bin, larger
+# ones into the last bin.
+
+STATS = 'stats.json'
+
+# Percentiles saved to `stats.json` as 'p1', 'p5', ...
+PERCENTILES = ( 1, 5, 25, 50, 75, 95, 99 )
+
+SKETCH_ALPHA = 0.01
+SKETCH_MIN   = 1e-9
+SKETCH_MAX   = 1e15
+
+SKETCH_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+SKETCH_NBINS = int(np.ceil(
+    np.log(SKETCH_MAX / SKETCH_MIN) / np.log(SKETCH_GAMMA)
+))
+
+# Bins: [ -SKETCH_NBINS, ..., -1 | 0 | 1, ..., SKETCH_NBINS ] + SKETCH_ZERO
+SKETCH_ZERO = SKETCH_NBINS
+SKETCH_SIZE = 2 * SKETCH_NBINS + 1
+
+def get_sketch_bins(values : np.ndarray) -> np.ndarray:
+    magnitude = np.abs(values)
+    nonzero   = (magnitude >= SKETCH_MIN)
+
+    with np.errstate(divide = 'ignore'):
+        k = np.ceil(np.log(magnitude / SKETCH_MIN) / np.log(SKETCH_GAMMA))
+
+    k = np.clip(np.nan_to_num(k), 0, SKETCH_NBINS - 1).astype(np.int64)
+
+    bins = np.where(nonzero, np.sign(values) * (k + 1), 0)
+
+    return SKETCH_ZERO + bins.astype(np.int64)
+
+def get_bin_values(bins : np.ndarray) -> np.ndarray:
+    # Value of a bin, with relative error at most SKETCH_ALPHA
+    offset = bins - SKETCH_ZERO
+    k      = np.abs(offset) - 1
+
+    magnitude = SKETCH_MIN * SKETCH_GAMMA**k * 2 / (SKETCH_GAMMA + 1)
+
+    return np.where(offset == 0, 0, np.sign(offset) * magnitude)
+
+def update_sketch(sketch : np.ndarray, values : np.ndarray) -> None:
+    # sketch : (n_columns, SKETCH_SIZE), values : (n, n_columns)
+    n_cols = values.shape[1]
+    bins   = get_sketch_bins(values) + SKETCH_SIZE * np.arange(n_cols)
+
+    sketch += np.bincount(
+        bins.ravel(), minlength = n_cols * SKETCH_SIZE
+    ).reshape(sketch.shape)
+
+def get_sketch_quantiles(
+    sketch : np.ndarray, quantiles : np.ndarray
+) -> np.ndarray:
+    # Returns (n_quantiles, n_columns) array
+    result = np.zeros((len(quantiles), len(sketch)))
+
+    for (col, counts) in enumerate(sketch):
+        cumsum = np.cumsum(counts)
+
+        if cumsum[-1] == 0:
+            continue
+
+        ranks = quantiles * (cumsum[-1] - 1)
+        bins  = np.searchsorted(cumsum, ranks, side = 'right')
+
+        result[:, col] = get_bin_values(bins)
+
+    return result
+
+# StatsState : { 'NAME#FIELD' : values }
+StatsState = Dict[str, np.ndarray]
+
+class StatsAccumulator:
+
+    def __init__(self) -> None:
+        self._counts : Dict[str, int]        = {}
+        self._mean   : Dict[str, np.ndarray] = {}
+        self._m2     : Dict[str, np.ndarray] = {}
+        self._min    : Dict[str, np.ndarray] = {}
+        self._max    : Dict[str, np.ndarray] = {}
+        self._sketch : Dict[str, np.ndarray] = {}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._counts.keys())
+
+    def _init_stats(self, name : str, size : int) -> None:
+        self._counts[name] = 0
+        self._mean[name]   = np.zeros(size)
+        self._m2[name]     = np.zeros(size)
+        self._min[name]    = np.full(size,  np.inf)
+        self._max[name]    = np.full(size, -np.inf)
+        self._sketch[name] = np.zeros((size, SKETCH_SIZE), dtype = np.int64)
+
+    def _merge(
+        self, name : str, count : int, mean : np.ndarray, m2 : np.ndarray,
+        vmin : np.ndarray, vmax : np.ndarray, sketch : np.ndarray
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        if name not in self._counts:
+            self._init_stats(name, len(mean))
+
+        if count == 0:
+            return
+
+        n_a   = self._counts[name]
+        n     = n_a + count
+        delta = mean - self._mean[name]
+
+        self._mean[name] = self._mean[name] + delta * (count / n)
+        self._m2[name]   = self._m2[name] + m2 + delta**2 * (n_a * count / n)
+        self._counts[name] = n
+
+        self._min[name] = np.minimum(self._min[name], vmin)
+        self._max[name] = np.maximum(self._max[name], vmax)
+
+        self._sketch[name] += sketch
+
+    def update(self, name : str, values : np.ndarray) -> None:
+        values = np.asarray(values, dtype = np.float64)
+
+        if len(values) == 0:
+            if name not in self._counts:
+                self._init_stats(name, values.shape[1])
+            return
+
+        mean   = np.mean(values, axis = 0)
+        sketch = np.zeros((values.shape[1], SKETCH_SIZE), dtype = np.int64)
+        update_sketch(sketch, values)
+
+        self._merge(
+            name, len(values), mean,
+            np.sum((values - mean)**2, axis = 0),
+            np.min(values, axis = 0), np.max(values, axis = 0), sketch
+        )
+
+    def append(self, node_dict : Mapping[str, np.ndarray]) -> None:
+        for (name, values) in node_dict.items():
+            self.update(name, values)
+
+    def __iadd__(self, other : 'StatsAccumulator') -> 'StatsAccumulator':
+        # pylint: disable=protected-access
+        for name in other.names:
+            self._merge(
+                name, other._counts[name], other._mean[name], other._m2[name],
+                other._min[name], other._max[name], other._sketch[name]
+            )
+
+        return self
+
+    def get_state(self) -> StatsState:
+        # Flat state { 'NAME#FIELD' : values }, that can be merged later
+        result = {}
+
+        for name in self.names:
+            result[f'{name}#count']  = np.array(self._counts[name])
+            result[f'{name}#mean']   = self._mean[name]
+            result[f'{name}#m2']     = self._m2[name]
+            result[f'{name}#min']    = self._min[name]
+            result[f'{name}#max']    = self._max[name]
+            result[f'{name}#sketch'] = self._sketch[name]
+
+        return result
+
+    @staticmethod
+    def from_state(state : StatsState) -> 'StatsAccumulator':
+        result = StatsAccumulator()
+        names  = sorted(set(key.rsplit('#', 1)[0] for key in state))
+
+        for name in names:
+            result._merge(
+                name, int(state[f'{name}#count']),
+                *(
+                    state[f'{name}#{field}']
+                        for field in ('mean', 'm2', 'min', 'max', 'sketch')
+                )
+            )
+
+        return result
+
+    def get_percentiles(self, name : str) -> Dict[str, np.ndarray]:
+        # Returns { 'pN' : values }, clipped to the exact range of values
+        quantiles = get_sketch_quantiles(
+            self._sketch[name], np.array(PERCENTILES) / 100
+        )
+        quantiles = np.clip(quantiles, self._min[name], self._max[name])
+
+        return {
+            f'p{percentile}' : values
+                for (percentile, values) in zip(PERCENTILES, quantiles)
+        }
+
+    def to_dict(self) -> Dict[str, Dict[str, List[float]]]:
+        # Format of `stats.json`
+        result = {}
+
+        for name in self.names:
+            var = self._m2[name] / max(self._counts[name], 1)
+
+            result[name] = {
+                'mean'  : self._mean[name].tolist(),
+                'var'   : var.tolist(),
+                'stdev' : np.sqrt(var).tolist(),
+                'min'   : self._min[name].tolist(),
+                'max'   : self._max[name].tolist(),
+                **{
+                    stat : values.tolist()
+                        for (stat, values)
+                        in self.get_percentiles(name).items()
+                },
+            }
+
+        return result
+
+def save_feature_stats(root : str, stats : StatsAccumulator) -> None:
+    path = os.path.join(root, STATS)
+
+    with open(path + '.tmp', 'wt', encoding = 'utf-8') as f:
+        json.dump(stats.to_dict(), f, sort_keys = True, indent = 4)
+
+    os.replace(path + '.tmp', path)
+
+def save_stats_state(path : str, stats : StatsAccumulator) -> None:
+    # Sketches are mostly empty and compress well
+    save_arrays(path + '.tmp', stats.get_state(), 'zlib')
+    os.replace(path + '.tmp', path)
+
+def load_stats_state(path : str) -> StatsAccumulator:
+    return StatsAccumulator.from_state(load_arrays(path))
+
@@ -0,0 +1,307 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .edges import Edges, get_reindex_plans
+
+# k-hop neighborhoods and partitioning of heterogeneous graphs into pieces of
+# bounded size.
+#
+# Neighborhoods are found by a frontier expansion: each hop looks up the
+# neighbors of all frontier nodes at once with the CSR/CSC indices of
+# `Edges`, over all edge types. The resulting node masks are meant for
+# `Graph.filter` (or `filter_merged_graph`), which reindexes the edges.
+
+MaskDict  = Dict[str, np.ndarray]
+EdgesDict = Dict[Tuple[str, str], Edges]
+
+def count_masked_nodes(masks : MaskDict) -> int:
+    return sum(int(np.count_nonzero(m)) for m in masks.values())
+
+def get_k_hop_masks(
+    n_nodes_dict : Dict[str, int],
+    edges_dict   : EdgesDict,
+    seeds        : Dict[str, np.ndarray],
+    n_hops       : int,
+    directed     : bool = False,
+) -> MaskDict:
+    # Returns masks of nodes within `n_hops` of the `seeds` (node indices).
+    # If `directed`, only outgoing edges are followed.
+    masks = {
+        name : np.zeros(n, dtype = bool) for (name, n) in n_nodes_dict.items()
+    }
+    frontier = {}
+
+    for (name, ids) in seeds.items():
+        ids = np.unique(np.asarray(ids, dtype = np.int64))
+
+        masks[name][ids] = True
+        frontier[name]   = ids
+
+    for _ in range(n_hops):
+        reached = defaultdict(list)
+
+        for ((src, dst), edges) in edges_dict.items():
+            if src in frontier:
+                reached[dst].append(edges.neighbors(frontier[src], 'out')[0])
+
+            if (not directed) and (dst in frontier):
+                reached[src].append(edges.neighbors(frontier[dst], 'in')[0])
+
+        frontier = {}
+
+        for (name, arrays) in reached.items():
+            ids = np.unique(np.concatenate(arrays))
+            ids = ids[~masks[name][ids]]
+
+            if len(ids) > 0:
+                masks[name][ids] = True
+                frontier[name]   = ids
+
+        if not frontier:
+            break
+
+    return masks
+
+def get_unreachable_types(
+    node_types : Iterable[str],
+    edge_types : Iterable[Tuple[str, str]],
+    seed_type  : str,
+    n_hops     : int,
+    directed   : bool = False,
+) -> List[str]:
+    # Node types that `n_hops` neighborhoods of `seed_type` nodes never
+    # contain, e.g. `cnodes` (connected to `wnodes` only) within 1 hop of
+    # `bnodes`. Tiles have no nodes of these types.
+    edge_types = list(edge_types)
+    reached    = { seed_type, }
+    frontier   = { seed_type, }
+
+    for _ in range(n_hops):
+        frontier = (
+            { dst for (src, dst) in edge_types if src in frontier }
+            | {
+                src for (src, dst) in edge_types
+                    if (not directed) and (dst in frontier)
+            }
+        ) - reached
+
+        if not frontier:
+            break
+
+        reached |= frontier
+
+    return sorted(set(node_types) - reached)
+
+def iterate_partition_masks(
+    n_nodes_dict : Dict[str, int],
+    edges_dict   : EdgesDict,
+    seed_type    : str,
+    max_nodes    : int,
+    n_hops       : int,
+    directed     : bool = False,
+) -> Iterator[Tuple[np.ndarray, MaskDict]]:
+    # Splits nodes of `seed_type` into contiguous groups, s.t. the k-hop
+    # neighborhood of each group has at most `max_nodes` nodes. Groups are
+    # halved until they fit. A single seed, whose neighborhood is too large,
+    # still makes a piece of its own.
+    #
+    # Yields (seed indices, node masks). Every seed node belongs to exactly
+    # one piece, while their neighbors may be shared by several pieces.
+    # pylint: disable=too-many-arguments
+    stack = [ np.arange(n_nodes_dict.get(seed_type, 0)) ]
+
+    while stack:
+        seeds = stack.pop()
+
+        if len(seeds) == 0:
+            continue
+
+        masks = get_k_hop_masks(
+            n_nodes_dict, edges_dict, { seed_type : seeds }, n_hops, directed
+        )
+
+        if (count_masked_nodes(masks) <= max_nodes) or (len(seeds) == 1):
+            yield (seeds, masks)
+            continue
+
+        half = len(seeds) // 2
+
+        # Second half goes first on the stack, s.t. pieces come in order
+        stack.append(seeds[half:])
+        stack.append(seeds[:half])
+
+def get_partition_masks(
+    n_nodes_dict : Dict[str, int],
+    edges_dict   : EdgesDict,
+    seed_type    : str,
+    max_nodes    : int,
+    n_hops       : int,
+    directed     : bool = False,
+) -> List[Tuple[np.ndarray, MaskDict]]:
+    # pylint: disable=too-many-arguments
+    return list(iterate_partition_masks(
+        n_nodes_dict, edges_dict, seed_type, max_nodes, n_hops, directed
+    ))
+
+# Merged graphs: { ('node', io, name) : values, ('edge', src, dst) : values }
+#
+# Tiles of merged graphs mark their own seed nodes with a boolean
+# ('node', SEED_IO, seed_type) array, e.g. to restrict a loss to them.
+
+SEED_IO = 'seed'
+
+def get_merged_graph_structure(
+    merged_graph : Dict[Tuple[str, ...], np.ndarray]
+) -> Tuple[Dict[str, int], EdgesDict]:
+    n_nodes_dict = {}
+    edges_dict   = {}
+
+    for (key, values) in merged_graph.items():
+        if key[0] == 'node':
+            n_nodes_dict[key[2]] = len(values)
+        elif key[0] == 'edge':
+            edges_dict[(key[1], key[2])] = Edges(values)
+
+    return (n_nodes_dict, edges_dict)
+
+def filter_merged_graph(
+    merged_graph : Dict[Tuple[str, ...], np.ndarray],
+    masks        : MaskDict,
+    edges_dict   : Optional[EdgesDict] = None,
+) -> Dict[Tuple[str, ...], np.ndarray]:
+    # Same as `Graph.filter`, but for merged graphs. `edges_dict` allows
+    # reusing edge indices between calls.
+    result = {}
+    plans  = get_reindex_plans(masks)
+
+    for (key, values) in merged_graph.items():
+        if key[0] == 'node':
+            result[key] = values[masks[key[2]]]
+
+        elif key[0] == 'edge':
+            src, dst = key[1], key[2]
+
+            if edges_dict is not None:
+                edges = edges_dict[(src, dst)]
+            else:
+                edges = Edges(values)
+
+            result[key] = edges.reindex(plans[src], plans[dst]).values
+
+        else:
+            result[key] = values
+
+    return result
+
+def get_merged_graph_tile(
+    merged_graph : Dict[Tuple[str, ...], np.ndarray],
+    seed_type    : str,
+    seeds        : np.ndarray,
+    masks        : MaskDict,
+    edges_dict   : Optional[EdgesDict] = None,
+) -> Dict[Tuple[str, ...], np.ndarray]:
+    # Seeds are a contiguous range of indices (see `iterate_partition_masks`)
+    result  = filter_merged_graph(merged_graph, masks, edges_dict)
+    indices = np.flatnonzero(masks[seed_type])
+
+    result[('node', SEED_IO, seed_type)] = (
+        (indices >= seeds[0]) & (indices <= seeds[-1])
+    )
+
+    return result
+
+def get_tile_seed_ranges(
+    n_nodes_dict : Dict[str, int],
+    edges_dict   : EdgesDict,
+    seed_type    : str,
+    max_nodes    : int,
+    n_hops       : int,
+    directed     : bool = False,
+) -> np.ndarray:
+    # Returns (n_tiles, 2) [ start, stop ) ranges of seeds of the tiles of a
+    # graph (see `iterate_partition_masks`). A few ranges are enough to
+    # rebuild any single tile, without keeping masks of all of them. No
+    # ranges, if the graph fits into `max_nodes`, or has no seeds.
+    # pylint: disable=too-many-arguments
+    if sum(n_nodes_dict.values()) <= max_nodes:
+        return np.zeros((0, 2), dtype = np.int64)
+
+    ranges = [
+        (seeds[0], seeds[-1] + 1)
+            for (seeds, _) in iterate_partition_masks(
+                n_nodes_dict, edges_dict, seed_type, max_nodes, n_hops,
+                directed
+            )
+    ]
+
+    return np.array(ranges, dtype = np.int64).reshape((-1, 2))
+
+def get_merged_graph_range_tile(
+    merged_graph : Dict[Tuple[str, ...], np.ndarray],
+    seed_type    : str,
+    seed_range   : Tuple[int, int],
+    n_hops       : int,
+    directed     : bool = False,
+    structure    : Optional[Tuple[Dict[str, int], EdgesDict]] = None,
+) -> Dict[Tuple[str, ...], np.ndarray]:
+    # Tile of a seed range of `get_tile_seed_ranges`. `structure` allows
+    # reusing the result of `get_merged_graph_structure`.
+    # pylint: disable=too-many-arguments
+    if structure is None:
+        structure = get_merged_graph_structure(merged_graph)
+
+    n_nodes_dict, edges_dict = structure
+
+    seeds = np.arange(seed_range[0], seed_range[1])
+    masks = get_k_hop_masks(
+        n_nodes_dict, edges_dict, { seed_type : seeds }, n_hops, directed
+    )
+
+    return get_merged_graph_tile(
+        merged_graph, seed_type, seeds, masks, edges_dict
+    )
+
+def add_seed_mask(
+    merged_graph : Dict[Tuple[str, ...], np.ndarray], seed_type : str
+) -> Dict[Tuple[str, ...], np.ndarray]:
+    # Marks all the nodes of an untiled graph as seeds
+    n_nodes_dict, _ = get_merged_graph_structure(merged_graph)
+
+    if seed_type not in n_nodes_dict:
+        return merged_graph
+
+    return {
+        **merged_graph,
+        ('node', SEED_IO, seed_type) : np.ones(
+            n_nodes_dict[seed_type], dtype = bool
+        ),
+    }
+
+def get_merged_graph_tiles(
+    merged_graph : Dict[Tuple[str, ...], np.ndarray],
+    seed_type    : str,
+    max_nodes    : int,
+    n_hops       : int,
+    directed     : bool = False,
+) -> List[Dict[Tuple[str, ...], np.ndarray]]:
+    # pylint: disable=too-many-arguments
+    n_nodes_dict, edges_dict = get_merged_graph_structure(merged_graph)
+
+    if sum(n_nodes_dict.values()) <= max_nodes:
+        return [ add_seed_mask(merged_graph, seed_type), ]
+
+    result = [
+        get_merged_graph_tile(
+            merged_graph, seed_type, seeds, masks, edges_dict
+        )
+            for (seeds, masks) in iterate_partition_masks(
+                n_nodes_dict, edges_dict, seed_type, max_nodes, n_hops,
+                directed
+            )
+    ]
+
+    # Graphs without seed nodes are kept whole
+    return result or [ add_seed_mask(merged_graph, seed_type), ]
+
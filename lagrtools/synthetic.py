@@ -0,0 +1,183 @@
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .nodes import NODE_FEATURES
+
+# Generator of synthetic Wire-Cell clusters, that follow the layout of the
+# raw `clusters-(img|tru)-*.npz` files. Used by tests and benchmarks.
+
+RawCluster = Dict[str, np.ndarray]
+
+NODE_COUNTS = {
+    'cnodes' : 600,
+    'wnodes' : 1500,
+    'bnodes' : 400,
+    'snodes' : 40,
+    'mnodes' : 300,
+}
+
+EDGE_TYPES = ( 'bb', 'bm', 'bs', 'bw', 'cw' )
+
+N_CHANNELS = 8256
+
+def generate_nodes(
+    rng : np.random.Generator, name : str, idents : np.ndarray
+) -> np.ndarray:
+    n_nodes  = len(idents)
+    features = NODE_FEATURES[name]
+    result   = np.empty((n_nodes, len(features)), dtype = np.float64)
+
+    for (idx, feature) in enumerate(features):
+        if feature == 'ident':
+            values = idents
+        elif feature in ('value', 'uncertainty'):
+            # Charges are heavy-tailed
+            values = np.round(rng.lognormal(6, 1.5, size = n_nodes), 1)
+        elif feature in ('channel', 'index', 'wip', 'sliceid', 'start'):
+            values = rng.integers(0, N_CHANNELS, size = n_nodes)
+        elif feature in ('plane', 'faceid', 'wpid', 'frameid', 'segment'):
+            values = rng.integers(0, 3, size = n_nodes)
+        else:
+            values = np.round(rng.uniform(-1000, 1000, size = n_nodes), 2)
+
+        result[:, idx] = values
+
+    return result
+
+def generate_edges(
+    rng : np.random.Generator, n_src : int, n_dst : int, density : float
+) -> np.ndarray:
+    if (n_src == 0) or (n_dst == 0):
+        return np.zeros((0, 2), dtype = np.int64)
+
+    n_edges = int(round(n_src * density))
+
+    result = np.stack(
+        (
+            rng.integers(0, n_src, size = n_edges),
+            rng.integers(0, n_dst, size = n_edges),
+        ),
+        axis = 1
+    )
+
+    return result[np.lexsort((result[:, 1], result[:, 0]))]
+
+def generate_cluster_from_idents(
+    rng          : np.random.Generator,
+    idents_dict  : Dict[str, np.ndarray],
+    edge_density : float
+) -> RawCluster:
+    result = {
+        name : generate_nodes(rng, name, idents)
+            for (name, idents) in idents_dict.items()
+    }
+
+    for edge in EDGE_TYPES:
+        n_src = len(idents_dict.get(edge[0] + 'nodes', []))
+        n_dst = len(idents_dict.get(edge[1] + 'nodes', []))
+
+        result[edge + 'edges'] = generate_edges(
+            rng, n_src, n_dst, edge_density
+        )
+
+    return result
+
+def generate_cluster(
+    rng          : np.random.Generator,
+    node_counts  : Optional[Dict[str, int]] = None,
+    edge_density : float = 2.0,
+) -> RawCluster:
+    node_counts = node_counts or NODE_COUNTS
+
+    return generate_cluster_from_idents(
+        rng,
+        { name : np.arange(n) for (name, n) in node_counts.items() },
+        edge_density
+    )
+
+def generate_cluster_pair(
+    rng          : np.random.Generator,
+    node_counts  : Optional[Dict[str, int]] = None,
+    edge_density : float = 2.0,
+    overlap      : float = 0.9,
+) -> Tuple[RawCluster, RawCluster]:
+    # `overlap` is a fraction of img nodes that are also present in tru.
+    # tru graph gets the same number of unmatched nodes of its own. Common
+    # nodes keep their relative order, as `construct_merged_graph` expects.
+    node_counts = node_counts or NODE_COUNTS
+
+    idents_img = {}
+    idents_tru = {}
+
+    for (name, n) in node_counts.items():
+        n_common = int(round(n * overlap))
+
+        idents_img[name] = np.arange(n)
+        idents_tru[name] = np.concatenate((
+            np.sort(rng.choice(n, size = n_common, replace = False)),
+            np.arange(n, 2 * n - n_common),
+        ))
+
+    cluster_img = generate_cluster_from_idents(rng, idents_img, edge_density)
+    cluster_tru = generate_cluster_from_idents(rng, idents_tru, edge_density)
+
+    # Composite wnodes id is (ident, channel). Keep channels of common nodes.
+    if ('wnodes' in idents_img) and ('wnodes' in idents_tru):
+        ch_idx  = NODE_FEATURES['wnodes'].index('channel')
+        wn_img  = cluster_img['wnodes']
+        wn_tru  = cluster_tru['wnodes']
+        matched = idents_tru['wnodes'] < len(wn_img)
+
+        wn_tru[matched, ch_idx] = \
+            wn_img[idents_tru['wnodes'][matched].astype(int), ch_idx]
+
+    return (cluster_img, cluster_tru)
+
+def write_raw_files(
+    root         : str,
+    rng          : np.random.Generator,
+    n_files      : int,
+    n_clusters   : int,
+    node_counts  : Optional[Dict[str, int]] = None,
+    edge_density : float = 2.0,
+    overlap      : float = 0.9,
+    compress     : bool  = True,
+) -> List[str]:
+    # Writes pairs `clusters-(img|tru)-sN.npz` of `n_clusters` clusters each.
+    # Returns file suffixes.
+    # pylint: disable=too-many-arguments
+    save_func = np.savez_compressed if compress else np.savez
+    result    = []
+
+    os.makedirs(root, exist_ok = True)
+
+    for file_idx in range(n_files):
+        arrays_img = {}
+        arrays_tru = {}
+
+        for cluster_idx in range(n_clusters):
+            cluster_img, cluster_tru = generate_cluster_pair(
+                rng, node_counts, edge_density, overlap
+            )
+
+            for (name, values) in cluster_img.items():
+                arrays_img[f'cluster_{cluster_idx}_{name}'] = values
+
+            for (name, values) in cluster_tru.items():
+                arrays_tru[f'cluster_{cluster_idx}_{name}'] = values
+
+        suffix = f's{file_idx}'
+
+        save_func(
+            os.path.join(root, f'clusters-img-{suffix}.npz'), **arrays_img
+        )
+        save_func(
+            os.path.join(root, f'clusters-tru-{suffix}.npz'), **arrays_tru
+        )
+
+        result.append(suffix)
+
+    return result
+
@@ -1 +1,28 @@
-from .dataset import LAGRDataset
+import importlib
+
+# Submodules are imported on the first access to their names, s.t. importing
+# `lagrtools.torch` does not import torch and torch_geometric
+
+# { name : submodule }
+EXPORTS = {
+    'collate_batch'         : 'collate',
+    'collate_merged_graphs' : 'collate',
+    'LAGRDataset'           : 'dataset',
+    'PartitionSampler'      : 'distributed',
+    'SizeBucketSampler'     : 'samplers',
+    'LAGRStreamingDataset'  : 'streaming',
+    'TransformPipeline'     : 'transforms',
+}
+
+__all__ = list(EXPORTS)
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    module = importlib.import_module('.' + EXPORTS[name], __name__)
+    return getattr(module, name)
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
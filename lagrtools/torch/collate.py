@@ -0,0 +1,130 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch_geometric.data import Batch, HeteroData
+
+from lagrtools.funcs    import MergedGraph
+from lagrtools.subgraph import SEED_IO
+
+# Collation of merged graphs directly into a batched `HeteroData`.
+#
+# Arrays of each key are concatenated with a single `np.concatenate` and
+# edge indices are offset by a vectorized cumulative sum of node counts.
+# The result is equivalent to `Batch.from_data_list` of converted graphs:
+# it has `batch`/`ptr` vectors, and supports `get_example`/`to_data_list`.
+
+def get_key_arrays(
+    merged_graphs : Sequence[MergedGraph], key : Tuple[str, ...]
+) -> List[np.ndarray]:
+    template = next(g[key] for g in merged_graphs if key in g)
+    empty    = np.zeros((0, *template.shape[1:]), dtype = template.dtype)
+
+    return [ g.get(key, empty) for g in merged_graphs ]
+
+def get_node_ptrs(
+    merged_graphs : Sequence[MergedGraph]
+) -> Dict[str, np.ndarray]:
+    node_names = sorted(set(
+        k[2] for g in merged_graphs for k in g if k[0] == 'node'
+    ))
+    result = {}
+
+    for name in node_names:
+        counts = np.zeros(len(merged_graphs), dtype = np.int64)
+
+        for (idx, graph) in enumerate(merged_graphs):
+            values = graph.get(('node', 'x', name), None)
+
+            if values is None:
+                values = graph.get(('node', 'y', name), ())
+
+            counts[idx] = len(values)
+
+        result[name] = np.concatenate(([ 0, ], np.cumsum(counts)))
+
+    return result
+
+def collate_merged_graphs(
+    merged_graphs : Sequence[MergedGraph],
+    float_dtype   : torch.dtype = torch.float32,
+    index_dtype   : torch.dtype = torch.long,
+) -> Batch:
+    # pylint: disable=protected-access
+    n_graphs   = len(merged_graphs)
+    keys       = sorted(set(k for g in merged_graphs for k in g))
+    node_ptrs  = get_node_ptrs(merged_graphs)
+    result     = Batch(_base_cls = HeteroData)
+    slice_dict = {}
+    inc_dict   = {}
+
+    for (name, ptr) in node_ptrs.items():
+        counts = np.diff(ptr)
+
+        result[name].batch = torch.from_numpy(
+            np.repeat(np.arange(n_graphs, dtype = np.int64), counts)
+        )
+        result[name].ptr   = torch.from_numpy(ptr)
+
+        slice_dict[name] = {}
+        inc_dict[name]   = {}
+
+    for key in keys:
+        arrays = get_key_arrays(merged_graphs, key)
+        sizes  = np.array([ len(x) for x in arrays ], dtype = np.int64)
+        slices = torch.from_numpy(np.concatenate(([ 0, ], np.cumsum(sizes))))
+
+        if key[0] == 'node':
+            io     = key[1]
+            name   = key[2]
+            values = np.concatenate(arrays, axis = 0)
+
+            if io == SEED_IO:
+                attr, tensor = 'seed_mask', torch.from_numpy(values)
+            elif io in ('x', 'y'):
+                attr, tensor = io, torch.from_numpy(values).to(float_dtype)
+            else:
+                raise ValueError(f'Unknown io type: {io}')
+
+            if (io == 'y') and (values.shape[1] == 0):
+                continue
+
+            result[name][attr]     = tensor
+            slice_dict[name][attr] = slices
+            inc_dict[name][attr]   = torch.zeros(n_graphs, dtype = torch.long)
+
+        elif key[0] == 'edge':
+            src, dst     = key[1], key[2]
+            edge_triplet = (src, f'{src}-{dst}', dst)
+
+            # Offsets of source/destination nodes of each graph
+            incs = np.stack(
+                (node_ptrs[src][:-1], node_ptrs[dst][:-1]), axis = 1
+            )
+
+            # Stored edges are (E, 2) views of (2, E) arrays, so they are
+            # concatenated in the (2, E) layout
+            edge_index = np.concatenate([ x.T for x in arrays ], axis = 1)
+            edge_index = edge_index + np.repeat(incs.T, sizes, axis = 1)
+
+            result[edge_triplet].edge_index \
+                = torch.from_numpy(edge_index).to(index_dtype)
+
+            slice_dict[edge_triplet] = { 'edge_index' : slices }
+            inc_dict[edge_triplet]   = {
+                'edge_index' : torch.from_numpy(incs)[:, :, None]
+            }
+
+    result._num_graphs = n_graphs
+    result._slice_dict = slice_dict
+    result._inc_dict   = inc_dict
+
+    return result
+
+def collate_batch(batch : Batch) -> Batch:
+    # `collate_fn` for `DataLoader`s that fetch whole batches at once, e.g.
+    #   DataLoader(
+    #       dataset, batch_size = None, collate_fn = collate_batch,
+    #       sampler = BatchSampler(RandomSampler(dataset), 32, False),
+    #   )
+    return batch
@@ -1,9 +1,31 @@
+import io
 import os
+import warnings
 
+import numpy as np
 import torch
 from torch_geometric.data import HeteroData
 
-from lagrtools.funcs import load_merged_graph
+from lagrtools               import instrument
+from lagrtools.cache         import SharedGraphCache
+from lagrtools.funcs         import load_merged_graph
+from lagrtools.index         import load_dataset_index
+from lagrtools.normalization import get_dataset_normalization
+from lagrtools.partition     import (
+    BALANCE_TYPES, get_path_size, partition_units
+)
+from lagrtools.shards        import (
+    ShardedGraphs, is_sharded, load_shards_index
+)
+from lagrtools.subgraph      import (
+    SEED_IO, add_seed_mask, get_merged_graph_range_tile,
+    get_merged_graph_structure, get_merged_graph_tiles, get_tile_seed_ranges,
+    get_unreachable_types
+)
+
+from .collate     import collate_merged_graphs
+from .distributed import broadcast_object, is_distributed
+from .transforms  import NodeFeatureNorm
 
 def collect_files(root):
     result = []
@@ -22,7 +44,72 @@ def collect_files(root):
     result.sort()
     return result
 
-def convert_merged_graph(merged_graph):
+def list_dataset_files(root, index = None):
+    # Paths of per-cluster files. The directory is listed only if the
+    # dataset has no index (see `lagrtools.index`).
+    if index is not None:
+        return index.files
+
+    return collect_files(root)
+
+def list_dataset_units(root, index = None):
+    # Names of files or shards, and their numbers of graphs
+    if is_sharded(root):
+        shards = load_shards_index(root)
+        return ([ x['name'] for x in shards ], [ x['size'] for x in shards ])
+
+    files = list_dataset_files(root, index)
+    return ([ os.path.basename(x) for x in files ], [ 1, ] * len(files))
+
+def get_unit_weights(root, names, index = None):
+    # Sizes of units: total node and edge counts of their graphs, if the
+    # dataset is indexed, or sizes on disk otherwise
+    if index is None:
+        return [ get_path_size(os.path.join(root, x)) for x in names ]
+
+    sizes  = index.graph_sizes
+    totals = sizes.n_nodes + sizes.n_edges
+
+    return np.bincount(
+        index.locations[:, 0], weights = totals, minlength = len(names)
+    ).tolist()
+
+def compute_dataset_partition(root, world_size, balance = 'size'):
+    index         = load_dataset_index(root)
+    names, counts = list_dataset_units(root, index)
+
+    if balance == 'size':
+        weights = get_unit_weights(root, names, index)
+    else:
+        weights = counts
+
+    ranks = partition_units(weights, world_size)
+
+    return {
+        'units'  : [ [ names[i] for i in indices ] for indices in ranks ],
+        'counts' : [ sum(counts[i] for i in indices) for indices in ranks ],
+    }
+
+def get_dataset_partition(root, world_size, balance = 'size'):
+    # If torch.distributed is initialized, the dataset is listed by the
+    # first rank only, and the partition is broadcast to the other ranks
+    if balance not in BALANCE_TYPES:
+        raise ValueError(f'Unknown balance type: {balance}')
+
+    partition = None
+
+    if (not is_distributed()) or (torch.distributed.get_rank() == 0):
+        partition = compute_dataset_partition(root, world_size, balance)
+
+    return broadcast_object(partition)
+
+def as_tensor(values, dtype):
+    # Zero-copy, if `values` already have the requested dtype
+    return torch.from_numpy(values).to(dtype)
+
+def convert_merged_graph(
+    merged_graph, float_dtype = torch.float32, index_dtype = torch.long
+):
     result = HeteroData()
 
     for (k, v) in merged_graph.items():
@@ -31,36 +118,399 @@ def convert_merged_graph(merged_graph):
             name = k[2]
 
             if io == 'x':
-                result[name].x = torch.from_numpy(v).float()
+                result[name].x = as_tensor(v, float_dtype)
             elif io == 'y':
                 if v.shape[1] > 0:
-                    result[name].y = torch.from_numpy(v).float()
+                    result[name].y = as_tensor(v, float_dtype)
+            elif io == SEED_IO:
+                result[name].seed_mask = torch.from_numpy(v)
             else:
                 raise ValueError(f'Unknown io type: {io}')
 
         elif k[0] == 'edge':
+            # Stored edges are (E, 2) views of contiguous (2, E) arrays
             edge_triplet = (k[1], f'{k[1]}-{k[2]}', k[2])
-            result[edge_triplet].edge_index = torch.from_numpy(v.T).long()
+            result[edge_triplet].edge_index = as_tensor(v.T, index_dtype)
+
+    return result
+
+def get_merged_graphs_size(merged_graphs):
+    return {
+        'nodes' : sum(
+            len(v) for g in merged_graphs for (k, v) in g.items()
+                if k[:2] == ('node', 'x')
+        ),
+        'edges' : sum(
+            len(v) for g in merged_graphs for (k, v) in g.items()
+                if k[0] == 'edge'
+        ),
+    }
+
+def find_transforms(transform, transform_type):
+    if transform is None:
+        return []
+
+    if isinstance(transform, transform_type):
+        return [ transform, ]
+
+    result = []
+
+    for t in getattr(transform, 'transforms', []):
+        result += find_transforms(t, transform_type)
 
     return result
 
+def check_transform(root, normalization, transform):
+    if (normalization is not None) and find_transforms(
+        transform, NodeFeatureNorm
+    ):
+        raise RuntimeError(
+            f"Dataset '{root}' is already normalized. Refusing to apply"
+            " NodeFeatureNorm on top of it"
+        )
+
 class LAGRDataset(torch.utils.data.Dataset):
 
-    def __init__(self, root, transform = None):
-        self._root      = root
-        self._transform = transform
-        self._files     = collect_files(self._root)
+    def __init__(
+        self, root, transform = None, cache_bytes = None, cache_root = None,
+        max_nodes = None, tile_type = 'bnodes', tile_hops = 1,
+        tile_seed = None, float_dtype = torch.float32,
+        index_dtype = torch.long, rank = None, world_size = None,
+        balance = 'size',
+    ):
+        # If `cache_bytes` is specified, decoded graphs are kept in a shared
+        # memory cache of this size, which is common for all `DataLoader`
+        # workers. The cache must be created before the workers start.
+        #
+        # If `max_nodes` is specified, graphs with more nodes are split into
+        # tiles: `tile_hops` neighborhoods of groups of `tile_type` nodes
+        # (see `lagrtools.subgraph`). Each access returns one tile: a random
+        # one, or, if `tile_seed` is given, the tile that is fixed by the
+        # seed, the index, and the epoch (see `set_epoch`), s.t. `n_tiles`
+        # consecutive epochs see every tile of a graph once. Tile seeds are
+        # marked by `data[tile_type].seed_mask`. Node types further than
+        # `tile_hops` from `tile_type` are not in the tiles (a warning is
+        # issued), e.g. `cnodes` need 2 hops from `bnodes`.
+        #
+        # Node features and edges are converted to `float_dtype` and
+        # `index_dtype`. Stored arrays of these dtypes are used without
+        # conversions (see `--float-dtype` and `--index-dtype` of
+        # preprocess).
+        #
+        # If `world_size` is specified, the files (or shards) are split into
+        # `world_size` disjoint partitions, and the dataset contains only
+        # the partition of `rank` (by default, the rank of torch.distributed,
+        # if it is initialized). Partitions are balanced by the size of the
+        # graphs (`balance = 'size'`) or by their number ('count').
+        # Use `PartitionSampler` to get the same number of steps per rank.
+        # pylint: disable=too-many-arguments,too-many-locals
+        self._root          = root
+        self._transform     = transform
+        self._normalization = get_dataset_normalization(root)
+        self._max_nodes     = max_nodes
+        self._tile_type     = tile_type
+        self._tile_hops     = tile_hops
+        self._tile_seed     = tile_seed
+        self._epoch         = 0
+        self._dtypes        = {
+            'float_dtype' : float_dtype, 'index_dtype' : index_dtype
+        }
+        self._index         = load_dataset_index(root)
+        self._partition     = None
+        self._sizes         = None
+        self._global_idx    = None
+
+        # { index : seed ranges of tiles } of graphs that were tiled by this
+        # process (see `get_tile_seed_ranges`)
+        self._tile_ranges   = {}
+        self._tile_checked  = False
+
+        check_transform(root, self._normalization, transform)
+
+        units = None
+
+        if (world_size is not None) and (rank is None):
+            rank = torch.distributed.get_rank() if is_distributed() else 0
+
+        if world_size is not None:
+            if not 0 <= rank < world_size:
+                raise ValueError(f'Invalid rank: {rank} of {world_size}')
+
+            self._partition = get_dataset_partition(root, world_size, balance)
+            units           = self._partition['units'][rank]
+
+        self._rank = rank
+
+        if is_sharded(self._root):
+            # Read-only maps, that are kept open by each process. Graphs are
+            # copied out of them (see `_load_merged_graph_uncached`)
+            self._files  = None
+            self._graphs = ShardedGraphs(
+                self._root, mmap_mode = 'r', shard_names = units
+            )
+        elif units is not None:
+            self._files  = [ os.path.join(self._root, x) for x in units ]
+            self._graphs = None
+        else:
+            self._files  = list_dataset_files(self._root, self._index)
+            self._graphs = None
+
+        if cache_bytes is not None:
+            self._cache = SharedGraphCache(len(self), cache_bytes, cache_root)
+        else:
+            self._cache = None
+
+        if (max_nodes is not None) and (self._index is not None):
+            keys = [ k.split(':') for k in self._index.keys ]
+
+            self.check_tile_types(
+                [ k[1] for k in keys if k[0] == 'node' ],
+                [ (k[1], k[2]) for k in keys if k[0] == 'edge' ],
+            )
+
+    @property
+    def normalization(self):
+        # Normalization that was applied to the dataset offline (or None)
+        return self._normalization
+
+    @property
+    def rank(self):
+        return self._rank
+
+    @property
+    def partition_units(self):
+        # Names of files (or shards) of each rank (or None)
+        if self._partition is None:
+            return None
+
+        return self._partition['units']
+
+    @property
+    def partition_counts(self):
+        # Numbers of graphs of each rank (or None)
+        if self._partition is None:
+            return None
+
+        return self._partition['counts']
+
+    @property
+    def index(self):
+        # Dataset index (`lagrtools.index.DatasetIndex`), or None for older
+        # datasets
+        return self._index
+
+    @property
+    def graph_sizes(self):
+        # Node and edge counts of the graphs (`lagrtools.sizes.GraphSizes`),
+        # or None if the dataset has no index
+        if (self._sizes is None) and (self._index is not None):
+            self._sizes = self._index.graph_sizes.take(
+                self.get_global_indices()
+            )
+
+        return self._sizes
+
+    def get_global_indices(self):
+        # Positions of the graphs in the dataset index
+        if self._global_idx is not None:
+            return self._global_idx
+
+        if self._partition is None:
+            self._global_idx = np.arange(len(self))
+        else:
+            positions = {
+                name : idx
+                    for (idx, name) in enumerate(self._index.get_names())
+            }
+            self._global_idx = np.array(
+                [ positions[name] for name in self.get_graph_names() ],
+                dtype = np.int64
+            )
+
+        return self._global_idx
+
+    def get_graph_metadata(self, index):
+        # Name, location and node and edge counts of a graph, without
+        # opening it. Requires the dataset index.
+        if self._index is None:
+            raise RuntimeError(f"Dataset '{self._root}' has no index")
+
+        return self._index.get_metadata(
+            int(self.get_global_indices()[index])
+        )
+
+    def get_graph_names(self):
+        if (self._index is not None) and (self._partition is None):
+            return self._index.get_names()
+
+        if self._graphs is not None:
+            return self._graphs.get_names()
+
+        return [
+            os.path.splitext(os.path.basename(x))[0] for x in self._files
+        ]
+
+    def cache_stats(self):
+        if self._cache is None:
+            return None
+
+        return self._cache.stats()
 
     def __len__(self):
+        if self._graphs is not None:
+            return len(self._graphs)
+
         return len(self._files)
 
+    def _load_merged_graph_uncached(self, index):
+        if self._graphs is not None:
+            # Memory-mapped, no decoding is needed. The arrays are copied (in
+            # their layout, e.g. transposed edges), s.t. in-place transforms
+            # never modify the maps, that are read by later accesses.
+            with instrument.timer('dataset.read') as t:
+                result = {
+                    k : np.array(v, order = 'K')
+                        for (k, v) in self._graphs[index].items()
+                }
+                t.add(bytes = sum(v.nbytes for v in result.values()))
+
+            return result
+
+        if not instrument.is_enabled():
+            return load_merged_graph(self._files[index])
+
+        # Whole files are read at once, to separate the filesystem reads
+        # from the decoding
+        with instrument.timer('dataset.read') as t:
+            with open(self._files[index], 'rb') as f:
+                data = f.read()
+
+            t.add(bytes = len(data))
+
+        with instrument.timer('dataset.decode'):
+            return load_merged_graph(io.BytesIO(data))
+
+    def load_merged_graph(self, index):
+        if self._cache is None:
+            return self._load_merged_graph_uncached(index)
+
+        with instrument.timer('dataset.cache_get'):
+            result = self._cache.get(index)
+
+        if result is None:
+            result = self._load_merged_graph_uncached(index)
+            self._cache.put(index, result)
+
+        return result
+
+    def get_tiles(self, index):
+        # All the tiles of a graph, as merged graphs
+        merged_graph = self.load_merged_graph(index)
+
+        if self._max_nodes is None:
+            return [ merged_graph, ]
+
+        with instrument.timer('dataset.tile'):
+            return get_merged_graph_tiles(
+                merged_graph, self._tile_type, self._max_nodes,
+                self._tile_hops
+            )
+
+    def check_tile_types(self, node_types, edge_types):
+        # Warns about node types that tiles never contain
+        self._tile_checked = True
+        unreachable        = get_unreachable_types(
+            node_types, edge_types, self._tile_type, self._tile_hops
+        )
+
+        if unreachable:
+            warnings.warn(
+                f"Tiles of '{self._tile_type}' nodes within {self._tile_hops}"
+                f" hop(s) contain no nodes of types {unreachable}."
+                " Increase `tile_hops` to keep them"
+            )
+
+    def get_tile_ranges(self, index, structure):
+        # The partition of a graph is found once, and only the seed ranges
+        # of its tiles are kept
+        if index not in self._tile_ranges:
+            self._tile_ranges[index] = get_tile_seed_ranges(
+                *structure, self._tile_type, self._max_nodes, self._tile_hops
+            )
+
+        return self._tile_ranges[index]
+
+    def set_epoch(self, epoch):
+        # Call before the `DataLoader` workers of the epoch are started
+        # (i.e. not with `persistent_workers`)
+        self._epoch = epoch
+
+    def choose_tile(self, index, n_tiles):
+        if self._tile_seed is None:
+            # torch RNG is seeded separately in each `DataLoader` worker
+            return int(torch.randint(n_tiles, ()))
+
+        # Each graph starts at a random tile, and moves to the next one
+        # every epoch
+        rng   = np.random.default_rng([ self._tile_seed, index ])
+        start = int(rng.integers(n_tiles))
+
+        return (start + self._epoch) % n_tiles
+
+    def load_tile(self, index):
+        merged_graph = self.load_merged_graph(index)
+
+        if self._max_nodes is None:
+            return merged_graph
+
+        with instrument.timer('dataset.tile'):
+            structure = get_merged_graph_structure(merged_graph)
+            ranges    = self.get_tile_ranges(index, structure)
+
+            if (len(ranges) > 0) and (not self._tile_checked):
+                # Datasets without an index
+                self.check_tile_types(structure[0], structure[1])
+
+            if len(ranges) == 0:
+                return add_seed_mask(merged_graph, self._tile_type)
+
+            # Edge indexes are built lazily, only for the neighborhood of the
+            # chosen tile
+            seed_range = ranges[self.choose_tile(index, len(ranges))]
+
+            return get_merged_graph_range_tile(
+                merged_graph, self._tile_type, seed_range, self._tile_hops,
+                structure = structure
+            )
+
+    def get_batch(self, indices):
+        # NOTE: transforms are applied to the whole batch, so they must act
+        #       on each node independently (e.g. `NodeFeatureNorm`)
+        merged_graphs = [ self.load_tile(int(i)) for i in indices ]
+
+        with instrument.timer('dataset.convert') as t:
+            batch = collate_merged_graphs(merged_graphs, **self._dtypes)
+            t.add(**get_merged_graphs_size(merged_graphs))
+
+        if self._transform is not None:
+            with instrument.timer('dataset.transform'):
+                batch = self._transform(batch)
+
+        return batch
+
     def __getitem__(self, index):
-        path         = self._files[index]
-        merged_graph = load_merged_graph(path)
-        graph        = convert_merged_graph(merged_graph)
+        if isinstance(index, (list, tuple, np.ndarray, torch.Tensor)):
+            return self.get_batch(index)
+
+        merged_graph = self.load_tile(index)
+
+        with instrument.timer('dataset.convert') as t:
+            graph = convert_merged_graph(merged_graph, **self._dtypes)
+            t.add(**get_merged_graphs_size([ merged_graph, ]))
 
         if self._transform is not None:
-            graph = self._transform(graph)
+            with instrument.timer('dataset.transform'):
+                graph = self._transform(graph)
 
         return graph
 
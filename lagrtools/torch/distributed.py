@@ -0,0 +1,70 @@
+import numpy as np
+import torch
+import torch.distributed as dist
+
+# Helpers for distributed training, where each rank reads its own partition
+# of the dataset (see `rank` and `world_size` of `LAGRDataset`).
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized()
+
+def broadcast_object(obj, src = 0):
+    # Returns `obj` of rank `src`, if torch.distributed is initialized
+    if (not is_distributed()) or (dist.get_world_size() == 1):
+        return obj
+
+    objects = [ obj, ]
+    dist.broadcast_object_list(objects, src)
+
+    return objects[0]
+
+class PartitionSampler(torch.utils.data.Sampler):
+    # Samples local indices of a partitioned `LAGRDataset`. All the ranks
+    # get the same number of samples: smaller partitions are padded by
+    # repeated indices, or larger ones are truncated if `drop_last`.
+    #
+    # The order depends only on `seed`, the rank and the epoch, that must be
+    # set by `set_epoch` before each epoch.
+
+    def __init__(self, dataset, shuffle = True, seed = 0, drop_last = False):
+        super().__init__()
+
+        counts = dataset.partition_counts
+
+        if counts is None:
+            counts = [ len(dataset), ]
+
+        self._size      = len(dataset)
+        self._rank      = dataset.rank or 0
+        self._shuffle   = shuffle
+        self._seed      = seed
+        self._epoch     = 0
+        self._n_samples = min(counts) if drop_last else max(counts)
+
+        if (self._size == 0) and (self._n_samples > 0):
+            raise ValueError(
+                f'Partition of rank {self._rank} is empty. Use fewer ranks'
+                ' or `drop_last`'
+            )
+
+    def set_epoch(self, epoch):
+        self._epoch = epoch
+
+    def __len__(self):
+        return self._n_samples
+
+    def __iter__(self):
+        if self._shuffle:
+            rng   = np.random.default_rng(
+                [ self._seed, self._rank, self._epoch ]
+            )
+            order = rng.permutation(self._size)
+        else:
+            order = np.arange(self._size)
+
+        if self._n_samples > self._size:
+            n_repeats = -(-self._n_samples // self._size)
+            order     = np.tile(order, n_repeats)
+
+        return iter(order[:self._n_samples].tolist())
+
@@ -0,0 +1,123 @@
+import numpy as np
+import torch
+
+from lagrtools.sizes import GraphSizes
+
+class SizeBucketSampler(torch.utils.data.Sampler):
+    # Yields batches of indices, s.t. each batch has at most `max_nodes`
+    # nodes, `max_edges` edges and `max_graphs` graphs (graphs that exceed
+    # the budget alone form single-graph batches).
+    #
+    # Graphs are sorted by size (edges if only `max_edges` is given, nodes
+    # otherwise) and split into `n_buckets` buckets of equal counts. Each
+    # epoch, graphs are shuffled within the buckets and packed into batches,
+    # and the batches of all buckets are shuffled. Thus, batches consist of
+    # graphs of similar sizes, and use a steady amount of memory.
+    #
+    # The order depends only on `seed` and on the epoch, that must be set by
+    # `set_epoch` before each epoch.
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self, dataset, max_nodes = None, max_edges = None, max_graphs = None,
+        n_buckets = 8, shuffle = True, seed = 0,
+    ):
+        # `dataset` is a `LAGRDataset`, or `GraphSizes` of its graphs
+        # pylint: disable=too-many-arguments
+        super().__init__()
+
+        if isinstance(dataset, GraphSizes):
+            sizes = dataset
+        else:
+            sizes = dataset.graph_sizes
+
+        if sizes is None:
+            raise ValueError(
+                'Dataset has no graph sizes. Rerun scripts/preprocess'
+            )
+
+        if all(x is None for x in ( max_nodes, max_edges, max_graphs )):
+            raise ValueError('At least one batch budget must be specified')
+
+        self._n_nodes    = sizes.n_nodes.tolist()
+        self._n_edges    = sizes.n_edges.tolist()
+        self._max_nodes  = max_nodes
+        self._max_edges  = max_edges
+        self._max_graphs = max_graphs
+        self._shuffle    = shuffle
+        self._seed       = seed
+        self._epoch      = 0
+        self._batches    = None
+
+        if (max_nodes is not None) or (max_edges is None):
+            order = np.argsort(sizes.n_nodes, kind = 'stable')
+        else:
+            order = np.argsort(sizes.n_edges, kind = 'stable')
+
+        n_buckets     = max(min(n_buckets, len(order)), 1)
+        self._buckets = np.array_split(order, n_buckets)
+
+    def set_epoch(self, epoch):
+        self._epoch   = epoch
+        self._batches = None
+
+    def fits(self, n_graphs, n_nodes, n_edges):
+        return (
+                ((self._max_graphs is None) or (n_graphs <= self._max_graphs))
+            and ((self._max_nodes  is None) or (n_nodes  <= self._max_nodes))
+            and ((self._max_edges  is None) or (n_edges  <= self._max_edges))
+        )
+
+    def pack_bucket(self, indices):
+        result  = []
+        batch   = []
+        n_nodes = 0
+        n_edges = 0
+
+        for idx in indices:
+            node_count = self._n_nodes[idx]
+            edge_count = self._n_edges[idx]
+
+            if batch and not self.fits(
+                len(batch) + 1, n_nodes + node_count, n_edges + edge_count
+            ):
+                result.append(batch)
+                batch   = []
+                n_nodes = 0
+                n_edges = 0
+
+            batch.append(idx)
+            n_nodes += node_count
+            n_edges += edge_count
+
+        if batch:
+            result.append(batch)
+
+        return result
+
+    def get_batches(self):
+        # Batches of the current epoch
+        if self._batches is not None:
+            return self._batches
+
+        rng     = np.random.default_rng([ self._seed, self._epoch ])
+        batches = []
+
+        for bucket in self._buckets:
+            if self._shuffle:
+                bucket = rng.permutation(bucket)
+
+            batches += self.pack_bucket(bucket.tolist())
+
+        if self._shuffle:
+            batches = [ batches[idx] for idx in rng.permutation(len(batches)) ]
+
+        self._batches = batches
+        return batches
+
+    def __len__(self):
+        return len(self.get_batches())
+
+    def __iter__(self):
+        return iter(self.get_batches())
+
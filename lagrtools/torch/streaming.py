@@ -0,0 +1,216 @@
+import collections
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from lagrtools               import instrument
+from lagrtools.funcs         import load_merged_graph
+from lagrtools.index         import load_dataset_index
+from lagrtools.normalization import get_dataset_normalization
+from lagrtools.shards        import Shard, is_sharded, load_shards_index
+
+from .dataset import (
+    check_transform, convert_merged_graph, get_merged_graphs_size,
+    list_dataset_files
+)
+
+# Streaming access to preprocessed datasets, for storage with high latency
+# of random access (e.g. network filesystems).
+#
+# The dataset is read in units: per-cluster files, or whole shards. Each
+# epoch, the units are permuted and split between `DataLoader` workers. Each
+# worker reads its units in this order by `io_threads` background threads,
+# with at most `prefetch` units in flight, and shuffles their graphs locally
+# through a buffer of `shuffle_buffer` graphs.
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    return [ load_merged_graph(io.BytesIO(data)) ]
+
+def read_shard(path):
+    # The whole shard is read into memory at once
+    shard = Shard(path, mmap_mode = None)
+    return [ shard[idx] for idx in range(len(shard)) ]
+
+def iterate_prefetched(func, items, n_threads, prefetch):
+    # Yields `func(item)` in the order of `items`, computing up to `prefetch`
+    # results ahead in background threads
+    with ThreadPoolExecutor(n_threads) as executor:
+        pending = collections.deque()
+
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+
+                if len(pending) < prefetch:
+                    continue
+
+                with instrument.timer('dataset.wait'):
+                    result = pending.popleft().result()
+
+                yield result
+
+            while pending:
+                with instrument.timer('dataset.wait'):
+                    result = pending.popleft().result()
+
+                yield result
+
+        finally:
+            # Iteration was stopped early
+            for future in pending:
+                future.cancel()
+
+def shuffle_buffered(items, buffer_size, rng):
+    # Yields `items` in a random order. Each item is yielded at most
+    # `buffer_size` items later than it is taken from `items`.
+    if buffer_size <= 1:
+        yield from items
+        return
+
+    buffer = []
+
+    for item in items:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+
+        idx = rng.integers(buffer_size)
+
+        yield buffer[idx]
+        buffer[idx] = item
+
+    rng.shuffle(buffer)
+    yield from buffer
+
+class LAGRStreamingDataset(torch.utils.data.IterableDataset):
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self, root, transform = None, shuffle = True, shuffle_buffer = 64,
+        io_threads = 4, prefetch = 8, seed = None,
+        float_dtype = torch.float32, index_dtype = torch.long,
+    ):
+        # If `seed` is None, each epoch has a new random order (common to
+        # all `DataLoader` workers). Otherwise, the order depends on `seed`
+        # and on the epoch, that must be set by `set_epoch`, unless the
+        # dataset is iterated in the main process. There, the epoch advances
+        # after each iteration, until `set_epoch` is called for the first
+        # time. From then on, only `set_epoch` changes it.
+        #
+        # Each worker keeps up to `prefetch` units and `shuffle_buffer`
+        # graphs in memory.
+        # pylint: disable=too-many-arguments
+        super().__init__()
+
+        self._root           = root
+        self._transform      = transform
+        self._normalization  = get_dataset_normalization(root)
+        self._shuffle        = shuffle
+        self._shuffle_buffer = shuffle_buffer
+        self._io_threads     = io_threads
+        self._prefetch       = max(prefetch, 1)
+        self._seed           = seed
+        self._epoch          = 0
+        self._auto_epoch     = True
+        self._dtypes         = {
+            'float_dtype' : float_dtype, 'index_dtype' : index_dtype
+        }
+
+        check_transform(root, self._normalization, transform)
+
+        if is_sharded(root):
+            shards = load_shards_index(root)
+
+            self._units  = [ os.path.join(root, x['name']) for x in shards ]
+            self._sizes  = [ x['size'] for x in shards ]
+            self._reader = read_shard
+        else:
+            self._units  = list_dataset_files(root, load_dataset_index(root))
+            self._sizes  = [ 1, ] * len(self._units)
+            self._reader = read_file
+
+    @property
+    def normalization(self):
+        return self._normalization
+
+    @property
+    def units(self):
+        return self._units
+
+    def __len__(self):
+        return sum(self._sizes)
+
+    def set_epoch(self, epoch):
+        self._epoch      = epoch
+        self._auto_epoch = False
+
+    def get_epoch_seed(self):
+        # Seed of the order of units, that is common to all the workers
+        if self._seed is not None:
+            return [ self._seed, self._epoch ]
+
+        worker_info = torch.utils.data.get_worker_info()
+
+        if worker_info is not None:
+            # Base seed of the `DataLoader`, which changes every epoch
+            return [ worker_info.seed - worker_info.id ]
+
+        return [ int(torch.randint(2**62, ())) ]
+
+    def get_worker_units(self, rng):
+        if self._shuffle:
+            order = rng.permutation(len(self._units))
+        else:
+            order = np.arange(len(self._units))
+
+        worker_info = torch.utils.data.get_worker_info()
+
+        if worker_info is not None:
+            order = order[worker_info.id::worker_info.num_workers]
+
+        return [ self._units[idx] for idx in order ]
+
+    def iterate_merged_graphs(self):
+        worker_info = torch.utils.data.get_worker_info()
+        worker_id   = 0 if (worker_info is None) else worker_info.id
+
+        seed  = self.get_epoch_seed()
+        units = self.get_worker_units(np.random.default_rng(seed))
+
+        if self._auto_epoch:
+            self._epoch += 1
+
+        result = (
+            graph
+                for graphs in iterate_prefetched(
+                    self._reader, units, self._io_threads, self._prefetch
+                )
+                for graph in graphs
+        )
+
+        if self._shuffle:
+            result = shuffle_buffered(
+                result, self._shuffle_buffer,
+                np.random.default_rng([ *seed, worker_id ])
+            )
+
+        return result
+
+    def __iter__(self):
+        for merged_graph in self.iterate_merged_graphs():
+            with instrument.timer('dataset.convert') as t:
+                graph = convert_merged_graph(merged_graph, **self._dtypes)
+                t.add(**get_merged_graphs_size([ merged_graph, ]))
+
+            if self._transform is not None:
+                with instrument.timer('dataset.transform'):
+                    graph = self._transform(graph)
+
+            yield graph
+
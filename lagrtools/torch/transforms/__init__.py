@@ -1,4 +1,5 @@
 from .normalization   import NodeFeatureNorm
+from .pipeline        import TransformPipeline
 from .threshold_label import ThresholdLabel
 
-__all__ = [ 'NodeFeatureNorm', 'ThresholdLabel' ]
+__all__ = [ 'NodeFeatureNorm', 'ThresholdLabel', 'TransformPipeline' ]
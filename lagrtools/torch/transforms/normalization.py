@@ -1,26 +1,26 @@
-import json
-import os
 from typing import Any, Dict, List, Tuple
 
-from torch_geometric.transforms.base_transform import BaseTransform
 import numpy as np
+import torch
+from torch_geometric.data import Batch
+from torch_geometric.transforms.base_transform import BaseTransform
 
-# FeaturePath : (node_name, io_type)
-FeaturePath = Tuple[str, str]
-
-# StatDict : { feature_path : { stat : [ value, ] } }
-StatDict    = Dict[FeaturePath, Dict[str, List[float]]]
-
-def unpack_stat_name(name : str) -> FeaturePath:
-    tokens = name.split(':', maxsplit = 2)
-    assert tokens[0] == 'node'
-
-    io_type   = tokens[1]
-    node_name = tokens[2]
+from lagrtools.normalization import (
+    FeaturePath, StatDict, check_not_normalized, get_norm_params,
+    load_feature_stats
+)
 
-    return (node_name, io_type)
+# AffineParams : { node_name : [ (io_type, weight, bias), ] }, s.t.
+#   normalized = values * weight + bias
+AffineParams = Dict[str, List[Tuple[str, np.ndarray, np.ndarray]]]
 
 class NodeFeatureNorm(BaseTransform):
+    # Works on single graphs and on batches alike, since every node is
+    # normalized independently, by one `addcmul` per feature tensor.
+    #
+    # Features of collated batches, which own their buffers, are normalized
+    # in place. Features of single graphs may be views of memory maps or
+    # cached arrays, that are read again later, so they are replaced.
 
     def __init__(
         self,
@@ -28,45 +28,78 @@ class NodeFeatureNorm(BaseTransform):
         norm_type : str   = 'standartize',
         eps       : float = 1e-6
     ):
+        check_not_normalized(root)
+
         self._root       = root
         self._stats_dict = NodeFeatureNorm.load_feature_stats(root)
         self._norm_type  = norm_type
         self._eps        = eps
+        self._params     = self.get_affine_params()
+
+        # { (device, dtype) : { feature_path : (weight, bias) } }
+        self._tensors = {}
 
     @staticmethod
     def load_feature_stats(root : str) -> StatDict:
-        path = os.path.join(root, 'stats.json')
+        return load_feature_stats(root)
+
+    def get_affine_params(self) -> AffineParams:
+        result = {}
 
-        with open(path, 'rt', encoding = 'utf-8') as f:
-            result = json.load(f)
+        for ((node, io_type), stats) in sorted(self._stats_dict.items()):
+            shift, scale = get_norm_params(stats, self._norm_type, self._eps)
 
-        return {
-            unpack_stat_name(name) : {
-                stat : np.array(values, dtype = np.float32)
-                for (stat, values) in values_dict.items()
+            weight = 1 / np.asarray(scale, dtype = np.float64)
+            bias   = -np.asarray(shift, dtype = np.float64) * weight
+
+            result.setdefault(node, []).append((io_type, weight, bias))
+
+        return result
+
+    def get_tensors(self, device, dtype) -> Dict[FeaturePath, Any]:
+        # Constants are converted once per device and dtype
+        key = (device, dtype)
+
+        if key not in self._tensors:
+            self._tensors[key] = {
+                (node, io_type) : (
+                    torch.as_tensor(weight, dtype = dtype, device = device),
+                    torch.as_tensor(bias,   dtype = dtype, device = device),
+                )
+                    for (node, params) in self._params.items()
+                    for (io_type, weight, bias) in params
             }
-            for (name, values_dict) in result.items()
-        }
 
-    def normalize(self, data, node, io_type):
-        feature_path = (node, io_type)
-        if feature_path not in self._stats_dict:
-            return
+        return self._tensors[key]
 
-        if self._norm_type == 'standartize':
-            mean = self._stats_dict[feature_path]['mean']
-            std  = self._stats_dict[feature_path]['stdev']
+    def normalize(self, store, node, inplace):
+        for (io_type, _, _) in self._params[node]:
+            values = getattr(store, io_type, None)
 
-            data[node][io_type] -= mean
-            data[node][io_type] /= (std + self._eps)
+            if values is None:
+                continue
 
-        else:
-            raise ValueError(f'Unknown norm type: {self._norm_type}')
+            tensors      = self.get_tensors(values.device, values.dtype)
+            weight, bias = tensors[(node, io_type)]
+
+            if inplace:
+                torch.addcmul(bias, values, weight, out = values)
+            else:
+                store[io_type] = torch.addcmul(bias, values, weight)
 
     def __call__(self, data: Any) -> Any:
+        inplace = isinstance(data, Batch)
+
         for node_name in data.node_types:
-            for io_type in data[node_name].keys():
-                self.normalize(data, node_name, io_type)
+            if node_name in self._params:
+                self.normalize(data[node_name], node_name, inplace)
 
         return data
 
+    def __getstate__(self):
+        # Cached tensors may live on a training device
+        result = self.__dict__.copy()
+        result['_tensors'] = {}
+
+        return result
+
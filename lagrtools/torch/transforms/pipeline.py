@@ -0,0 +1,87 @@
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+import torch
+
+from lagrtools import instrument
+
+# Transforms that act on each node independently (e.g. `NodeFeatureNorm`,
+# `ThresholdLabel`) give the same result on a graph, and on a batch of
+# graphs. `TransformPipeline` runs them either per sample, as the dataset
+# `transform`, or once per batch, after `DataLoader` collation:
+#
+#   pipeline = TransformPipeline(transforms, mode = 'batch', device = 'cuda')
+#   dataset  = LAGRDataset(root, transform = pipeline)
+#   loader   = DataLoader(dataset, ...)
+#
+#   for batch in pipeline.iterate(loader):
+#       ...
+#
+# In the 'batch' mode, the dataset calls are no-ops, and batches are moved
+# to `device` (if given) before the transforms, which run in the main
+# process.
+
+PIPELINE_MODES = ( 'sample', 'batch' )
+
+class TransformPipeline:
+
+    def __init__(
+        self,
+        transforms   : Sequence[Callable[[Any], Any]],
+        mode         : str = 'batch',
+        device       : Optional[Any] = None,
+        non_blocking : bool = False,
+    ):
+        if mode not in PIPELINE_MODES:
+            raise ValueError(f'Unknown pipeline mode: {mode}')
+
+        self._transforms   = list(transforms)
+        self._mode         = mode
+        self._device       = None if (device is None) else torch.device(device)
+        self._non_blocking = non_blocking
+
+    @property
+    def transforms(self):
+        return self._transforms
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def device(self):
+        return self._device
+
+    def apply(self, data : Any) -> Any:
+        for transform in self._transforms:
+            data = transform(data)
+
+        return data
+
+    def __call__(self, data : Any) -> Any:
+        # Per-sample transform
+        if self._mode != 'sample':
+            return data
+
+        return self.apply(data)
+
+    def transform_batch(self, batch : Any) -> Any:
+        if self._device is not None:
+            batch = batch.to(self._device, non_blocking = self._non_blocking)
+
+        if self._mode != 'batch':
+            return batch
+
+        with instrument.timer('dataset.batch_transform'):
+            return self.apply(batch)
+
+    def iterate(self, batches : Iterable[Any]) -> Iterator[Any]:
+        for batch in batches:
+            yield self.transform_batch(batch)
+
+    def __repr__(self) -> str:
+        transforms = ', '.join(repr(t) for t in self._transforms)
+        return (
+            f'{self.__class__.__name__}([{transforms}],'
+            f' mode={self._mode!r}, device={self._device})'
+        )
+
@@ -1,7 +1,10 @@
 from typing import Any
+import torch
 import torch_geometric.transforms as T
 
 class ThresholdLabel(T.BaseTransform):
+    # Works on single graphs and on batches alike. The label is written by
+    # a single comparison into an int tensor.
 
     def __init__(
         self, node_name, io_type, target_label,
@@ -17,10 +20,23 @@ class ThresholdLabel(T.BaseTransform):
         self._threshold     = threshold
 
     def __call__(self, data : Any) -> Any:
-        label = data[self._node_name][self._io_type][:, self._feature_index]
-        label = (label > self._threshold).unsqueeze(1)
+        values     = data[self._node_name][self._io_type]
+        n_features = values.shape[1]
 
-        data[self._node_name][self._target_label] = label.int()
+        if not -n_features <= self._feature_index < n_features:
+            raise IndexError(
+                f'Feature index {self._feature_index} is out of range for'
+                f' {n_features} features of'
+                f' {self._node_name}:{self._io_type}'
+            )
+
+        column = values.narrow(1, self._feature_index % n_features, 1)
+        label  = torch.empty(
+            column.shape, dtype = torch.int32, device = column.device
+        )
+
+        torch.gt(column, self._threshold, out = label)
+        data[self._node_name][self._target_label] = label
 
         return data
 
@@ -15,5 +15,8 @@ setuptools.setup(
         include = [ 'lagrtools', 'lagrtools.*' ]
     ),
     install_requires = [ 'numpy' ],
+    entry_points     = {
+        'console_scripts' : [ 'lagrtools = lagrtools.cli:main' ],
+    },
 )
 
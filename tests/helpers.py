@@ -0,0 +1,42 @@
+import numpy as np
+
+def make_graph(
+    value, n_nodes = 2, n_edges = 1, n_features = 1, n_b_nodes = 0,
+    rng = None
+):
+    # Merged graph of `n_nodes` nodes of type 'a', whose features are equal
+    # to `value` (or random, if `rng` is given), without labels.
+    #
+    # If `n_b_nodes` > 0, the graph also has nodes of type 'b' with a single
+    # feature (zero, or random), and its `n_edges` edges go from 'a' to 'b'.
+    # Otherwise, they go from 'a' to 'a'.
+    # pylint: disable=too-many-arguments
+    def get_values(shape, fill):
+        if rng is None:
+            return np.full(shape, fill, dtype = np.float32)
+
+        return rng.normal(size = shape).astype(np.float32)
+
+    result = {
+        ('node', 'x', 'a') : get_values((n_nodes, n_features), value),
+        ('node', 'y', 'a') : np.zeros((n_nodes, 0), dtype = np.float32),
+    }
+
+    if n_b_nodes > 0:
+        result[('node', 'x', 'b')] = get_values((n_b_nodes, 1), 0)
+        result[('edge', 'a', 'b')] = np.zeros((n_edges, 2), dtype = np.int64)
+    else:
+        result[('edge', 'a', 'a')] = np.zeros((n_edges, 2), dtype = np.int64)
+
+    return result
+
+def make_graphs(n_nodes, edges_per_node = 1., n_b_nodes = 0):
+    # Graphs of `n_nodes[idx]` nodes each, whose features are equal to `idx`
+    return [
+        make_graph(
+            idx, n_nodes = n, n_edges = int(n * edges_per_node),
+            n_b_nodes = n_b_nodes
+        )
+            for (idx, n) in enumerate(n_nodes)
+    ]
+
@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import pickle
+import unittest
+import numpy as np
+
+from lagrtools.cache import SharedGraphCache
+
+from .helpers import make_graph
+
+GRAPH_SIZE = { 'n_nodes' : 8, 'n_features' : 2 }
+
+def put_graph(args):
+    cache, index = args
+    return cache.put(index, make_graph(index, **GRAPH_SIZE))
+
+class TestsSharedGraphCache(unittest.TestCase):
+
+    def setUp(self):
+        self._cache = SharedGraphCache(4, max_bytes = 10**6)
+
+    def tearDown(self):
+        self._cache.close()
+
+    def test_roundtrip(self):
+        graph = make_graph(1.5, **GRAPH_SIZE)
+
+        self.assertIsNone(self._cache.get(0))
+        self.assertTrue(self._cache.put(0, graph))
+
+        cached = self._cache.get(0)
+        self.assertEqual(set(cached.keys()), set(graph.keys()))
+
+        for (k, v) in graph.items():
+            self.assertEqual(cached[k].dtype, v.dtype)
+            self.assertTrue(np.array_equal(cached[k], v))
+
+        stats = self._cache.stats()
+        self.assertEqual(stats['hits'],   1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['items'],  1)
+
+    def test_lru_eviction(self):
+        self._cache.put(0, make_graph(0, **GRAPH_SIZE))
+        graph_size = self._cache.stats()['nbytes']
+
+        cache = SharedGraphCache(4, max_bytes = 2 * graph_size + 1)
+
+        cache.put(0, make_graph(0, **GRAPH_SIZE))
+        cache.put(1, make_graph(1, **GRAPH_SIZE))
+        cache.get(0)
+        cache.put(2, make_graph(2, **GRAPH_SIZE))
+
+        self.assertIsNotNone(cache.get(0))
+        self.assertIsNone(cache.get(1))
+        self.assertIsNotNone(cache.get(2))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        cache.close()
+
+    def test_too_large(self):
+        cache = SharedGraphCache(1, max_bytes = 16)
+
+        self.assertFalse(cache.put(0, make_graph(0, **GRAPH_SIZE)))
+        self.assertIsNone(cache.get(0))
+
+        cache.close()
+
+    def test_close(self):
+        cache = SharedGraphCache(1, max_bytes = 16)
+        path  = cache.path
+
+        self.assertTrue(os.path.isdir(path))
+        cache.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_shared_between_processes(self):
+        with multiprocessing.get_context('spawn').Pool(2) as pool:
+            pool.map(put_graph, [ (self._cache, idx) for idx in range(4) ])
+
+        for index in range(4):
+            graph = self._cache.get(index)
+            self.assertTrue(np.all(graph[('node', 'x', 'a')] == index))
+
+        cache = pickle.loads(pickle.dumps(self._cache))
+        self.assertEqual(cache.stats()['items'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
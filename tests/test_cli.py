@@ -0,0 +1,129 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools           import instrument
+from lagrtools.cli       import COMMANDS, main
+from lagrtools.index     import load_dataset_index
+from lagrtools.meta      import update_dataset_meta
+from lagrtools.synthetic import write_raw_files
+
+CONFIG = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'examples', 'preprocess_configs', 'simple.toml'
+)
+
+def run_main(argv):
+    stdout = io.StringIO()
+
+    with contextlib.redirect_stdout(stdout):
+        main(argv)
+
+    return stdout.getvalue()
+
+def get_imported_modules(code):
+    result = subprocess.run(
+        [ sys.executable, '-c', code + '; import sys; print(*sys.modules)' ],
+        check = True, capture_output = True, text = True
+    )
+
+    return set(result.stdout.split())
+
+class TestsCLI(unittest.TestCase):
+
+    def test_help(self):
+        for argv in ([ '--help', ], [ 'inspect', '--help' ]):
+            with self.assertRaises(SystemExit) as cm:
+                run_main(argv)
+
+            self.assertEqual(cm.exception.code, 0)
+
+        with self.assertRaises(SystemExit) as cm:
+            with contextlib.redirect_stderr(io.StringIO()):
+                main([ 'unknown', ])
+
+        self.assertNotEqual(cm.exception.code, 0)
+
+    def test_lazy_imports(self):
+        modules = get_imported_modules(
+            'import lagrtools.torch; '
+            + '; '.join(f'import {m}' for (m, _) in COMMANDS.values())
+        )
+
+        for name in ( 'torch', 'torch_geometric', 'tqdm', 'toml' ):
+            self.assertNotIn(name, modules)
+
+    def test_preprocess_inspect(self):
+        with tempfile.TemporaryDirectory() as root:
+            rawdir = os.path.join(root, 'raw')
+            outdir = os.path.join(root, 'out')
+
+            write_raw_files(rawdir, np.random.default_rng(0), 2, 3)
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                run_main([
+                    'preprocess', rawdir, outdir, '--config', CONFIG,
+                    '--workers', '1'
+                ])
+
+            index = load_dataset_index(outdir)
+            self.assertEqual(len(index), 6)
+
+            output = run_main([ 'inspect', outdir ])
+            self.assertIn(index.checksum, output)
+            self.assertIn('node:bnodes', output)
+
+            output = run_main([ 'inspect', outdir, '--graph', '0' ])
+            self.assertIn(index.get_name(0), output)
+
+
+    def test_preprocess_instrument(self):
+        # Counters of all the workers are saved, when they exit
+        with tempfile.TemporaryDirectory() as root:
+            rawdir  = os.path.join(root, 'raw')
+            instdir = os.path.join(root, 'instrument')
+
+            write_raw_files(rawdir, np.random.default_rng(0), 2, 3)
+
+            try:
+                with contextlib.redirect_stderr(io.StringIO()):
+                    run_main([
+                        'preprocess', rawdir, os.path.join(root, 'out'),
+                        '--config', CONFIG, '--workers', '2',
+                        '--instrument', instdir
+                    ])
+            finally:
+                instrument.disable()
+
+            summary = instrument.load_summary(instdir)
+
+        self.assertEqual(summary['preprocess.load']['calls'], 6)
+
+    def test_incremental_normalized(self):
+        with tempfile.TemporaryDirectory() as root:
+            rawdir = os.path.join(root, 'raw')
+            outdir = os.path.join(root, 'out')
+            argv   = [
+                'preprocess', rawdir, outdir, '--config', CONFIG,
+                '--workers', '1', '--incremental'
+            ]
+
+            write_raw_files(rawdir, np.random.default_rng(0), 2, 3)
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                run_main(argv)
+
+            update_dataset_meta(
+                outdir, normalization = { 'norm_type' : 'standartize' }
+            )
+            write_raw_files(rawdir, np.random.default_rng(1), 3, 3)
+
+            with self.assertRaises(RuntimeError):
+                run_main(argv)
+
+            self.assertEqual(len(load_dataset_index(outdir)), 6)
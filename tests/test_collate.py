@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.funcs import (
+    cast_merged_graph, load_merged_graph, save_merged_graph
+)
+
+try:
+    import torch
+    from torch_geometric.data import Batch
+
+    from lagrtools.torch.collate import collate_merged_graphs
+    from lagrtools.torch.dataset import convert_merged_graph
+except ImportError:
+    torch = None
+
+GRAPHS = [
+    {
+        ('node', 'x', 'a') : np.array([ [1., 2.], [3., 4.], ]),
+        ('node', 'y', 'a') : np.array([ [1.], [0.], ]),
+        ('node', 'x', 'b') : np.array([ [5.], ]),
+        ('node', 'y', 'b') : np.zeros((1, 0)),
+        ('edge', 'a', 'b') : np.array([ [0, 0], [1, 0], ]),
+        ('edge', 'a', 'a') : np.array([ [1, 0], ]),
+    },
+    {
+        ('node', 'x', 'a') : np.array([ [5., 6.], ]),
+        ('node', 'y', 'a') : np.array([ [1.], ]),
+        ('node', 'x', 'b') : np.array([ [7.], [8.], ]),
+        ('node', 'y', 'b') : np.zeros((2, 0)),
+        ('edge', 'a', 'b') : np.array([ [0, 1], ]),
+        ('edge', 'a', 'a') : np.zeros((0, 2), dtype = np.int64),
+    },
+]
+
+@unittest.skipIf(torch is None, 'torch_geometric is not available')
+class TestsCollate(unittest.TestCase):
+
+    def test_collate(self):
+        batch_null = Batch.from_data_list(
+            [ convert_merged_graph(g) for g in GRAPHS ]
+        )
+        batch_test = collate_merged_graphs(GRAPHS)
+
+        self.assertEqual(batch_test.num_graphs, 2)
+        self.assertEqual(
+            set(batch_test.node_types), set(batch_null.node_types)
+        )
+        self.assertEqual(
+            set(batch_test.edge_types), set(batch_null.edge_types)
+        )
+
+        for node in batch_null.node_types:
+            for (attr, values) in batch_null[node].items():
+                self.assertTrue(torch.equal(batch_test[node][attr], values))
+
+        for edge in batch_null.edge_types:
+            self.assertTrue(torch.equal(
+                batch_test[edge].edge_index, batch_null[edge].edge_index
+            ))
+
+    def test_get_example(self):
+        batch = collate_merged_graphs(GRAPHS)
+        graph = batch.get_example(1)
+
+        self.assertTrue(torch.equal(
+            graph['a', 'a-b', 'b'].edge_index, torch.tensor([ [0], [1] ])
+        ))
+        self.assertTrue(torch.equal(
+            graph['b'].x, torch.tensor([ [7.], [8.] ])
+        ))
+
+    def test_missing_key(self):
+        graphs = [ GRAPHS[0], { ('node', 'x', 'a') : np.array([ [0., 0.] ]) } ]
+        batch  = collate_merged_graphs(graphs)
+
+        self.assertTrue(torch.equal(batch['b'].ptr, torch.tensor([ 0, 1, 1 ])))
+        self.assertTrue(torch.equal(batch['a'].ptr, torch.tensor([ 0, 2, 3 ])))
+
+    def test_stored_layout(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'graph.npz')
+            save_merged_graph(path, cast_merged_graph(GRAPHS[0]))
+            graph = load_merged_graph(path)
+
+        edges = graph[('edge', 'a', 'b')]
+        data  = convert_merged_graph(graph)
+
+        # Stored arrays of the requested dtypes are not copied
+        self.assertEqual(
+            data['a', 'a-b', 'b'].edge_index.data_ptr(),
+            edges.__array_interface__['data'][0]
+        )
+        self.assertEqual(
+            data['a'].x.data_ptr(),
+            graph[('node', 'x', 'a')].__array_interface__['data'][0]
+        )
+
+        data = convert_merged_graph(
+            graph, float_dtype = torch.float16, index_dtype = torch.int32
+        )
+        self.assertEqual(data['a'].x.dtype, torch.float16)
+        self.assertEqual(data['a', 'a-b', 'b'].edge_index.dtype, torch.int32)
+
+        batch = collate_merged_graphs([ graph, GRAPHS[1] ])
+        self.assertTrue(torch.equal(
+            batch['a', 'a-b', 'b'].edge_index,
+            collate_merged_graphs(GRAPHS)['a', 'a-b', 'b'].edge_index
+        ))
+
+if __name__ == '__main__':
+    unittest.main()
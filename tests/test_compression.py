@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.compression import (
+    CODECS, available_codecs, load_arrays, parse_codec, save_arrays
+)
+
+ARRAYS = {
+    'node:x:a' : np.arange(12, dtype = np.float32).reshape((4, 3)),
+    'node:y:a' : np.zeros((4, 0)),
+    'edge:a:a' : np.array([ [0, 1], [2, 3], ]),
+}
+
+class TestsCompression(unittest.TestCase):
+
+    def _check_roundtrip(self, codec):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'graph.npz')
+
+            save_arrays(path, ARRAYS, codec)
+            arrays = load_arrays(path)
+
+        self.assertEqual(set(arrays.keys()), set(ARRAYS.keys()))
+
+        for (k, v) in ARRAYS.items():
+            self.assertEqual(arrays[k].dtype, v.dtype)
+            self.assertTrue(np.array_equal(arrays[k], v))
+
+    def test_roundtrip(self):
+        codecs = available_codecs()
+
+        for name in CODECS:
+            with self.subTest(codec = name):
+                if name not in codecs:
+                    self.skipTest(f'Codec {name} is not available')
+
+                self._check_roundtrip(name)
+
+    def test_zlib_level(self):
+        self._check_roundtrip('zlib:1')
+
+    def test_numpy_compatible(self):
+        for codec in [ 'none', 'zlib' ]:
+            with tempfile.TemporaryDirectory() as root:
+                path = os.path.join(root, 'graph.npz')
+                save_arrays(path, ARRAYS, codec)
+
+                with np.load(path) as f:
+                    self.assertTrue(
+                        np.array_equal(f['node:x:a'], ARRAYS['node:x:a'])
+                    )
+
+    def test_parse_codec(self):
+        self.assertEqual(parse_codec('zlib'),   ('zlib', None))
+        self.assertEqual(parse_codec('zstd:3'), ('zstd', 3))
+
+        with self.assertRaises(ValueError):
+            parse_codec('gzip')
+
+        with self.assertRaises(ValueError):
+            parse_codec('none:1')
+
+if __name__ == '__main__':
+    unittest.main()
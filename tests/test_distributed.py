@@ -0,0 +1,165 @@
+import json
+import os
+import tempfile
+import unittest
+
+try:
+    import torch
+    import torch.distributed as dist
+    import torch.multiprocessing as mp
+
+    from lagrtools.torch import LAGRDataset, PartitionSampler
+except ImportError:
+    torch = None
+
+from lagrtools.funcs     import save_merged_graph
+from lagrtools.partition import partition_units
+from lagrtools.shards    import ShardWriter
+
+from .helpers import make_graphs
+
+N_GRAPHS   = 11
+WORLD_SIZE = 2
+
+def get_graph_ids(dataset, indices):
+    return [ int(dataset[i]['a'].x[0, 0]) for i in indices ]
+
+def run_rank(rank, tmpdir, roots):
+    dist.init_process_group(
+        'gloo', init_method = 'file://' + os.path.join(tmpdir, 'init'),
+        rank = rank, world_size = WORLD_SIZE
+    )
+
+    result = {}
+
+    for root in roots:
+        dataset = LAGRDataset(root, world_size = WORLD_SIZE)
+        sampler = PartitionSampler(dataset, seed = 1)
+
+        epochs = []
+
+        for epoch in range(2):
+            sampler.set_epoch(epoch)
+            epochs.append(get_graph_ids(dataset, sampler))
+
+        result[root] = {
+            'rank'   : dataset.rank,
+            'graphs' : get_graph_ids(dataset, range(len(dataset))),
+            'epochs' : epochs,
+        }
+
+    path = os.path.join(tmpdir, f'result_{rank}.json')
+
+    with open(path, 'wt', encoding = 'utf-8') as f:
+        json.dump(result, f)
+
+    dist.destroy_process_group()
+
+class TestsPartition(unittest.TestCase):
+
+    def test_partition_units(self):
+        weights = [ 5, 1, 1, 1, 1, 1 ]
+        result  = partition_units(weights, 2)
+
+        self.assertEqual(result, [ [ 0, ], [ 1, 2, 3, 4, 5 ] ])
+        self.assertEqual(partition_units(weights, 2), result)
+        self.assertEqual(partition_units([ 1, ], 3), [ [ 0, ], [], [] ])
+
+        with self.assertRaises(ValueError):
+            partition_units(weights, 0)
+
+@unittest.skipIf(torch is None, 'torch_geometric is not available')
+class TestsDistributed(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self._tmpdir = tempfile.TemporaryDirectory()
+
+        self._root_files  = os.path.join(self._tmpdir.name, 'files')
+        self._root_shards = os.path.join(self._tmpdir.name, 'shards')
+
+        os.makedirs(self._root_files)
+
+        with ShardWriter(self._root_shards, shard_size = 2) as writer:
+            # Graphs of different sizes
+            graphs = make_graphs([ 1 + idx % 4 for idx in range(N_GRAPHS) ])
+
+            for (idx, graph) in enumerate(graphs):
+                save_merged_graph(
+                    os.path.join(self._root_files, f'graph_{idx:02d}'), graph
+                )
+                writer.append(f'graph_{idx}', graph)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_local(self):
+        for balance in ( 'size', 'count' ):
+            graphs = []
+
+            for rank in range(3):
+                dataset = LAGRDataset(
+                    self._root_shards, rank = rank, world_size = 3,
+                    balance = balance
+                )
+                graphs += get_graph_ids(dataset, range(len(dataset)))
+
+                self.assertEqual(sum(dataset.partition_counts), N_GRAPHS)
+
+            self.assertEqual(sorted(graphs), list(range(N_GRAPHS)))
+
+        with self.assertRaises(ValueError):
+            LAGRDataset(self._root_files, rank = 2, world_size = 2)
+
+    def test_sampler(self):
+        dataset = LAGRDataset(self._root_files, rank = 0, world_size = 4)
+        counts  = dataset.partition_counts
+
+        sampler = PartitionSampler(dataset)
+        self.assertEqual(len(list(sampler)), max(counts))
+        self.assertEqual(set(sampler), set(range(len(dataset))))
+
+        sampler = PartitionSampler(dataset, drop_last = True)
+        self.assertEqual(len(list(sampler)), min(counts))
+
+        epoch0 = list(sampler)
+        sampler.set_epoch(1)
+        sampler.set_epoch(0)
+        self.assertEqual(list(sampler), epoch0)
+
+    def test_gloo(self):
+        if not dist.is_available():
+            self.skipTest('torch.distributed is not available')
+
+        roots = [ self._root_files, self._root_shards ]
+
+        mp.spawn(
+            run_rank, args = (self._tmpdir.name, roots),
+            nprocs = WORLD_SIZE, join = True
+        )
+
+        results = []
+
+        for rank in range(WORLD_SIZE):
+            path = os.path.join(self._tmpdir.name, f'result_{rank}.json')
+
+            with open(path, 'rt', encoding = 'utf-8') as f:
+                results.append(json.load(f))
+
+        for root in roots:
+            graphs = [ r[root]['graphs'] for r in results ]
+
+            self.assertEqual([ r[root]['rank'] for r in results ], [ 0, 1 ])
+            self.assertEqual(
+                sorted(graphs[0] + graphs[1]), list(range(N_GRAPHS))
+            )
+
+            n_steps = len(results[0][root]['epochs'][0])
+
+            for (r, rank_graphs) in zip(results, graphs):
+                epoch0, epoch1 = r[root]['epochs']
+
+                self.assertEqual(len(epoch0), n_steps)
+                self.assertEqual(set(epoch0), set(rank_graphs))
+                self.assertNotEqual(epoch0, epoch1)
+
@@ -1,7 +1,8 @@
+import pickle
 import unittest
 import numpy as np
 
-from lagrtools.edges import Edges
+from lagrtools.edges import Edges, ReindexPlan, reindex_map
 
 class TestsEdgeFilter(unittest.TestCase):
 
@@ -79,6 +80,55 @@ class TestsEdgeFilter(unittest.TestCase):
 
         self.assertEqual(edges1.filter(mask_src, mask_dst), edges2)
 
+    def test_reindex_random(self):
+        rng    = np.random.default_rng(0)
+        values = rng.integers(0, 50, size = (300, 2))
+        edges  = Edges(values)
+
+        for (mask_src, mask_dst) in [
+            (rng.random(50) < 0.5, rng.random(50) < 0.7),
+            (rng.random(50) < 0.5, None),
+            (None, np.ones(50, dtype = bool)),
+        ]:
+            new_values = values.copy()
+            keep       = np.ones(len(values), dtype = bool)
+
+            for (col, mask) in enumerate((mask_src, mask_dst)):
+                if mask is not None:
+                    new_values[:, col] = reindex_map(mask)[values[:, col]]
+                    keep &= mask[values[:, col]]
+
+            result = edges.reindex(
+                ReindexPlan.from_mask(mask_src),
+                ReindexPlan.from_mask(mask_dst)
+            )
+
+            self.assertEqual(result, Edges(new_values[keep]))
+            self.assertEqual(result.values.dtype, values.dtype)
+
+    def test_reindex_identity(self):
+        edges = Edges(np.array([ [0, 1], [1, 2], ]))
+        plan  = ReindexPlan.from_mask(np.ones(3, dtype = bool))
+
+        self.assertTrue(plan.is_identity)
+        self.assertIs(edges.reindex(plan, plan), edges)
+
+    def test_src_dst_sets(self):
+        edges = Edges(np.array([
+            [2, 1],
+            [0, 1],
+            [2, 3],
+        ]))
+
+        self.assertEqual(edges.src_set, { 0, 2 })
+        self.assertEqual(edges.dst_set, { 1, 3 })
+
+    def test_pickle(self):
+        edges1 = Edges(np.array([ [0, 1], [1, 2], ]))
+        edges2 = pickle.loads(pickle.dumps(edges1))
+
+        self.assertEqual(edges1, edges2)
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+
+from lagrtools.edges import Edges
+
+def get_naive_neighbors(values, ids, src_col, dst_col):
+    return [ values[values[:, src_col] == i, dst_col] for i in ids ]
+
+class TestsEdgesIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self._values = np.stack(
+            (rng.integers(0, 20, size = 200), rng.integers(0, 30, size = 200)),
+            axis = 1
+        )
+
+    def _check_segments(self, segments, expected):
+        values, ptr = segments
+
+        self.assertEqual(len(ptr), len(expected) + 1)
+
+        for (idx, exp) in enumerate(expected):
+            self.assertTrue(np.array_equal(values[ptr[idx]:ptr[idx + 1]], exp))
+
+    def test_neighbors(self):
+        edges = Edges(self._values)
+        ids   = np.array([ 3, 0, 19, 3, 25, -1 ])
+
+        self._check_segments(
+            edges.neighbors(ids), get_naive_neighbors(self._values, ids, 0, 1)
+        )
+        self._check_segments(
+            edges.neighbors(ids, 'in'),
+            get_naive_neighbors(self._values, ids, 1, 0)
+        )
+
+    def test_out_edges(self):
+        edges = Edges(self._values)
+        ids   = np.array([ 5, 7 ])
+
+        edge_idx, ptr = edges.out_edges(ids)
+
+        self.assertTrue(np.all(self._values[edge_idx[:ptr[1]], 0] == 5))
+        self.assertTrue(np.all(self._values[edge_idx[ptr[1]:], 0] == 7))
+        self.assertEqual(ptr[-1], np.count_nonzero(
+            np.isin(self._values[:, 0], ids)
+        ))
+
+    def test_degree(self):
+        edges = Edges(self._values)
+
+        self.assertTrue(np.array_equal(
+            edges.degree(n_nodes = 25),
+            np.bincount(self._values[:, 0], minlength = 25)
+        ))
+        self.assertTrue(np.array_equal(
+            edges.degree('in', n_nodes = 10),
+            np.bincount(self._values[:, 1])[:10]
+        ))
+
+        with self.assertRaises(ValueError):
+            edges.degree('unknown')
+
+    def test_filter_remap(self):
+        rng      = np.random.default_rng(1)
+        mask_src = rng.random(20) < 0.7
+        mask_dst = rng.random(30) < 0.7
+
+        edges = Edges(self._values)
+        _ = edges.csr, edges.csc
+
+        remapped = edges.filter(mask_src, mask_dst)
+        rebuilt  = Edges(remapped.values.copy())
+
+        for direction in [ 'out', 'in' ]:
+            n_nodes = np.count_nonzero(
+                mask_src if direction == 'out' else mask_dst
+            )
+            ids = np.arange(n_nodes)
+
+            self.assertTrue(np.array_equal(
+                remapped.degree(direction), rebuilt.degree(direction, n_nodes)
+            ))
+
+            for (x, y) in zip(
+                remapped.neighbors(ids, direction),
+                rebuilt.neighbors(ids, direction)
+            ):
+                self.assertTrue(np.array_equal(x, y))
+
+    def test_empty(self):
+        edges = Edges(np.zeros((0, 2), dtype = np.int64))
+
+        neighbors, ptr = edges.neighbors(np.array([ 0, 1 ]))
+
+        self.assertEqual(len(neighbors), 0)
+        self.assertTrue(np.array_equal(ptr, [ 0, 0, 0 ]))
+        self.assertTrue(np.array_equal(edges.degree(n_nodes = 2), [ 0, 0 ]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.funcs import parse_features_config
+from lagrtools.nodes import (
+    NODE_FEATURES, FeaturePlan, Nodes, compile_columns
+)
+
+CONFIG = """
+[img]
+bnodes = [ "value", "uncertainty", "start", "span" ]
+wnodes = [ "tailx", "taily", "tailz" ]
+
+[tru]
+bnodes = [ "value", ]
+wnodes = []
+"""
+
+def get_values(name, n = 5):
+    values = np.arange(n * len(NODE_FEATURES[name]), dtype = np.float64)
+    return values.reshape((n, -1))
+
+class TestsFeaturePlan(unittest.TestCase):
+
+    def test_compile_columns(self):
+        self.assertEqual(compile_columns([ 2, 3, 4 ]), slice(2, 5))
+        self.assertEqual(compile_columns([]), slice(0, 0))
+        self.assertTrue(
+            np.array_equal(compile_columns([ 1, 3 ]), np.array([ 1, 3 ]))
+        )
+
+    def test_views(self):
+        plan   = FeaturePlan.from_config({ 'wnodes' : [ 'tailx', 'taily' ] })
+        values = get_values('wnodes')
+        nodes  = Nodes.from_values('wnodes', values, plan)
+
+        self.assertTrue(np.shares_memory(nodes.values, values))
+        self.assertEqual(nodes.features, [ 'tailx', 'taily' ])
+        self.assertEqual(nodes.ids.shape, (5, 2))
+
+    def test_same_as_config(self):
+        config = { 'bnodes' : [ 'value', 'start', 'max3' ], 'snodes' : [] }
+        plan   = FeaturePlan.from_config(config)
+
+        for name in ( 'bnodes', 'snodes', 'cnodes' ):
+            values = get_values(name)
+            nodes1 = Nodes.from_values(name, values, config)
+            nodes2 = Nodes.from_values(name, values, plan)
+
+            if name not in config:
+                self.assertIsNone(nodes1)
+                self.assertIsNone(nodes2)
+                continue
+
+            self.assertEqual(nodes1, nodes2)
+            self.assertEqual(nodes2.values.shape[1], len(config[name]))
+
+    def test_no_config(self):
+        values = get_values('bnodes')
+        nodes  = Nodes.from_values('bnodes', values, None)
+
+        self.assertTrue(np.array_equal(nodes.values, values))
+        self.assertEqual(nodes.features, NODE_FEATURES['bnodes'])
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            FeaturePlan.from_config({ 'bnodes' : [ 'value', 'charge' ] })
+
+        with self.assertRaises(ValueError):
+            FeaturePlan.from_config({ 'xnodes' : [] })
+
+    def test_parse(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'config.toml')
+
+            with open(path, 'wt', encoding = 'utf-8') as f:
+                f.write(CONFIG)
+
+            plan_img, plan_tru = parse_features_config(path)
+
+        self.assertEqual(set(plan_img), { 'bnodes', 'wnodes' })
+        self.assertEqual(plan_tru['wnodes'].features, [])
+        self.assertEqual(plan_img['wnodes'].feature_columns, slice(5, 8))
+
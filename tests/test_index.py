@@ -0,0 +1,189 @@
+import contextlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+
+try:
+    import torch
+
+    from lagrtools.torch import LAGRDataset
+except ImportError:
+    torch = None
+
+from lagrtools.cli.normalize import main as normalize_main
+from lagrtools.funcs import save_merged_graph
+from lagrtools.index import (
+    DATASET_INDEX, INDEX_META, LAYOUT_FILES, get_features_meta,
+    has_dataset_index, load_dataset_index, save_dataset_index,
+    update_dataset_index
+)
+from lagrtools.nodes import FeaturePlan
+from lagrtools.sizes import GraphSizes, get_merged_graph_sizes
+
+from .helpers import make_graphs
+
+N_GRAPHS = 6
+
+GRAPHS = make_graphs(
+    [ 1 + idx for idx in range(N_GRAPHS) ], edges_per_node = 2
+)
+
+def get_names():
+    return [ f'graph_{idx:02d}' for idx in range(N_GRAPHS) ]
+
+class TestsDatasetIndex(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._root   = self._tmpdir.name
+
+        names = get_names()
+        sizes = GraphSizes.from_dict({
+            name : get_merged_graph_sizes(GRAPHS[idx])
+                for (idx, name) in enumerate(names)
+        })
+
+        for (idx, name) in enumerate(names):
+            save_merged_graph(
+                os.path.join(self._root, name), GRAPHS[idx]
+            )
+
+        features = get_features_meta(
+            FeaturePlan.from_config({ 'bnodes' : [ 'value', 'start' ] }),
+            FeaturePlan.from_config({ 'bnodes' : [ 'value', ] }),
+        )
+
+        self._checksum = save_dataset_index(
+            self._root, LAYOUT_FILES, names,
+            [ (idx, 0) for idx in range(N_GRAPHS) ], sizes, [], features,
+            'hash'
+        )
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_load(self):
+        index = load_dataset_index(self._root)
+
+        self.assertEqual(len(index), N_GRAPHS)
+        self.assertEqual(index.get_names(), get_names())
+        self.assertEqual(index.checksum, self._checksum)
+        self.assertTrue(index.verify())
+        self.assertEqual(
+            index.features, { 'bnodes' : {
+                'x' : [ 'value', 'start' ], 'y' : [ 'value', ]
+            }}
+        )
+
+        self.assertEqual(
+            list(index.files[1:3]),
+            [ os.path.join(self._root, x + '.npz') for x in get_names()[1:3] ]
+        )
+
+        metadata = index.get_metadata(2)
+        self.assertEqual(metadata['name'], 'graph_02')
+        self.assertEqual(metadata['file'], 'graph_02.npz')
+        self.assertEqual(metadata['sizes'], { 'node:a' : 3, 'edge:a:a' : 6 })
+
+        self.assertEqual(
+            index.graph_sizes.n_nodes.tolist(), list(range(1, N_GRAPHS + 1))
+        )
+
+    def test_missing(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.assertFalse(has_dataset_index(root))
+            self.assertIsNone(load_dataset_index(root))
+
+    def test_verify(self):
+        path   = os.path.join(self._root, DATASET_INDEX, 'counts.npy')
+        counts = np.load(path)
+        counts[0, 0] += 1
+        np.save(path, counts)
+
+        self.assertFalse(load_dataset_index(self._root).verify())
+
+    def test_version(self):
+        path = os.path.join(self._root, DATASET_INDEX, INDEX_META)
+
+        with open(path, 'rt', encoding = 'utf-8') as f:
+            meta = json.load(f)
+
+        meta['version'] = -1
+
+        with open(path, 'wt', encoding = 'utf-8') as f:
+            json.dump(meta, f)
+
+        with self.assertRaises(RuntimeError):
+            load_dataset_index(self._root)
+
+    def test_update(self):
+        checksum = update_dataset_index(self._root, normalization = None)
+        self.assertNotEqual(checksum, self._checksum)
+
+        index = load_dataset_index(self._root)
+        self.assertEqual(index.checksum, checksum)
+        self.assertIsNone(index.normalization)
+        self.assertTrue(index.verify())
+
+        # In-place normalization changes the checksum
+        with open(
+            os.path.join(self._root, 'stats.json'), 'wt', encoding = 'utf-8'
+        ) as f:
+            json.dump(
+                { 'node:x:a' : { 'mean' : [ 1., ], 'stdev' : [ 2., ] } }, f
+            )
+
+        with contextlib.redirect_stdout(io.StringIO()), \
+             contextlib.redirect_stderr(io.StringIO()):
+            normalize_main([ self._root, ])
+
+        index = load_dataset_index(self._root)
+        self.assertNotIn(index.checksum, ( self._checksum, checksum ))
+        self.assertTrue(index.normalization['complete'])
+        self.assertEqual(index.normalization['norm_type'], 'standartize')
+        self.assertTrue(index.verify())
+
+    def test_pickle(self):
+        index  = load_dataset_index(self._root)
+        result = pickle.loads(pickle.dumps(index))
+
+        self.assertLess(len(pickle.dumps(index)), 1024)
+        self.assertEqual(result.get_names(), get_names())
+
+    @unittest.skipIf(torch is None, 'torch_geometric is not available')
+    def test_dataset(self):
+        # Files that are not in the index are not seen
+        save_merged_graph(
+            os.path.join(self._root, 'graph_99'), GRAPHS[0]
+        )
+
+        dataset = LAGRDataset(self._root)
+
+        self.assertEqual(len(dataset), N_GRAPHS)
+        self.assertEqual(int(dataset[5]['a'].x[0, 0]), 5)
+        self.assertEqual(dataset.get_graph_names(), get_names())
+
+        # Partitions are balanced by graph sizes (3, 6, ..., 18)
+        graphs = []
+        totals = []
+
+        for rank in range(2):
+            dataset = LAGRDataset(self._root, rank = rank, world_size = 2)
+            sizes   = dataset.graph_sizes
+
+            graphs += dataset.get_graph_names()
+
+            self.assertEqual(sizes.names, dataset.get_graph_names())
+            self.assertEqual(
+                dataset.get_graph_metadata(0)['name'], sizes.names[0]
+            )
+            totals.append(int(sizes.n_nodes.sum() + sizes.n_edges.sum()))
+
+        self.assertEqual(sorted(graphs), get_names())
+        self.assertEqual(totals, [ 33, 30 ])
+
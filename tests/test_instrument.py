@@ -0,0 +1,92 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from lagrtools import instrument
+
+def work(index):
+    with instrument.timer('test.work') as t:
+        t.add(nodes = index, edges = 2 * index)
+
+    instrument.flush()
+    return os.getpid()
+
+def work_unflushed(index):
+    with instrument.timer('test.work') as t:
+        t.add(nodes = index)
+
+    return os.getpid()
+
+class TestsInstrument(unittest.TestCase):
+
+    def tearDown(self):
+        instrument.disable()
+
+    def test_disabled(self):
+        instrument.disable()
+
+        self.assertFalse(instrument.is_enabled())
+        self.assertIs(instrument.timer('test.work'), instrument.NULL_TIMER)
+
+        with instrument.timer('test.work') as t:
+            t.add(bytes = 1)
+
+        instrument.count('test.work', bytes = 1)
+
+    def test_single_process(self):
+        with tempfile.TemporaryDirectory() as root:
+            instrument.enable(root)
+
+            for index in range(3):
+                work(index)
+
+            instrument.count('test.event', bytes = 10)
+            instrument.disable()
+
+            with open(os.path.join(root, instrument.SUMMARY), 'rt') as f:
+                summary = json.load(f)
+
+            with open(os.path.join(root, instrument.METRICS), 'rt') as f:
+                metrics = f.read()
+
+        self.assertEqual(summary['test.work']['calls'], 3)
+        self.assertEqual(summary['test.work']['nodes'], 3)
+        self.assertEqual(summary['test.work']['edges'], 6)
+        self.assertEqual(summary['test.event']['bytes'], 10)
+
+        self.assertIn('lagr_stage_calls_total{stage="test.work"} 3', metrics)
+
+    def test_pool(self):
+        with tempfile.TemporaryDirectory() as root:
+            instrument.enable(root)
+
+            with multiprocessing.Pool(2) as pool:
+                pids = set(pool.map(work, range(10)))
+
+            instrument.disable()
+            summary = instrument.load_summary(root)
+
+        self.assertEqual(summary['test.work']['calls'], 10)
+        self.assertEqual(summary['test.work']['nodes'], sum(range(10)))
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_pool_exit(self):
+        # Workers, that exit normally, save their counters once
+        with tempfile.TemporaryDirectory() as root:
+            instrument.enable(root)
+
+            with multiprocessing.Pool(2, maxtasksperchild = 3) as pool:
+                pids = set(pool.map(work_unflushed, range(10), 1))
+                pool.close()
+                pool.join()
+
+            instrument.disable()
+            summary = instrument.load_summary(root)
+            files   = [ x for x in os.listdir(root) if x.startswith('proc-') ]
+
+        self.assertEqual(summary['test.work']['calls'], 10)
+        self.assertEqual(summary['test.work']['nodes'], sum(range(10)))
+        self.assertEqual(len(files), len(pids))
+
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from lagrtools.manifest import Manifest, get_source_state, hash_config
+
+class TestsManifest(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._root   = self._tmpdir.name
+
+        for fname in [ 'img.npz', 'tru.npz', 'config.toml' ]:
+            with open(os.path.join(self._root, fname), 'wt') as f:
+                f.write(fname)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        state    = get_source_state(self._root, 'img.npz', 'tru.npz')
+        manifest = Manifest(self._root)
+
+        self.assertIsNone(manifest.config_hash)
+        self.assertFalse(manifest.is_up_to_date('a', state))
+
+        manifest.reset('hash')
+        manifest.add_source('a', state, [ 'out_2', 'out_1' ])
+        manifest.save()
+
+        manifest = Manifest(self._root)
+
+        self.assertEqual(manifest.config_hash, 'hash')
+        self.assertEqual(manifest.sources, [ 'a', ])
+        self.assertEqual(manifest.get_outputs('a'), [ 'out_1', 'out_2' ])
+        self.assertTrue(manifest.is_up_to_date('a', state))
+
+    def test_changed_source(self):
+        state    = get_source_state(self._root, 'img.npz', 'tru.npz')
+        manifest = Manifest(self._root)
+        manifest.add_source('a', state, [])
+
+        with open(os.path.join(self._root, 'tru.npz'), 'at') as f:
+            f.write('changed')
+
+        state = get_source_state(self._root, 'img.npz', 'tru.npz')
+        self.assertFalse(manifest.is_up_to_date('a', state))
+
+    def test_config_hash(self):
+        path = os.path.join(self._root, 'config.toml')
+
+        self.assertEqual(
+            hash_config(path, codec = 'zlib'), hash_config(path, codec = 'zlib')
+        )
+        self.assertNotEqual(
+            hash_config(path, codec = 'zlib'), hash_config(path, codec = 'none')
+        )
+
+if __name__ == '__main__':
+    unittest.main()
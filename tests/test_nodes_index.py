@@ -0,0 +1,46 @@
+import pickle
+import unittest
+import numpy as np
+
+from lagrtools.nodes import Nodes
+
+class TestsNodesIndex(unittest.TestCase):
+
+    def test_duplicates(self):
+        with self.assertRaises(AssertionError):
+            Nodes(np.array([ [1, 2], [3, 4], [1, 2], ]), np.zeros((3, 1)))
+
+    def test_composite_not_duplicates(self):
+        nodes = Nodes(np.array([ [1, 2], [2, 1], ]), np.zeros((2, 1)))
+        self.assertEqual(len(nodes), 2)
+
+    def test_index_of(self):
+        nodes = Nodes(
+            np.array([ [5, 1], [3, 4], [1, 2], ], dtype = np.int32),
+            np.zeros((3, 1)),
+        )
+        index = nodes.index_of(np.array([ [1, 2], [5, 1], [4, 3], [5, 1] ]))
+
+        self.assertTrue(np.array_equal(index, [ 2, 0, -1, 0 ]))
+
+    def test_index_of_empty(self):
+        nodes = Nodes(np.zeros((0, 1), dtype = np.int32), np.zeros((0, 1)))
+        index = nodes.index_of(np.array([ [1], ]))
+
+        self.assertTrue(np.array_equal(index, [ -1, ]))
+
+    def test_id_index_map(self):
+        nodes = Nodes(np.array([ [5, 1], [3, 4], ]), np.zeros((2, 1)))
+
+        self.assertEqual(nodes.id_set, { (5, 1), (3, 4) })
+        self.assertEqual(nodes.id_index_map, { (5, 1) : 0, (3, 4) : 1 })
+
+    def test_pickle(self):
+        nodes1 = Nodes(np.array([ [5], [3], ]), np.array([ [1], [2], ]))
+        nodes2 = pickle.loads(pickle.dumps(nodes1))
+
+        self.assertEqual(nodes1, nodes2)
+        self.assertTrue(np.array_equal(nodes2.index_of([ [3], ]), [ 1, ]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+
+from lagrtools.nodes import Nodes
+from lagrtools.intersect import get_node_intersection_masks
+
+class TestsNodesIntersection(unittest.TestCase):
+
+    def _check_masks(self, ids1, ids2, mask1_null, mask2_null):
+        nodes1 = Nodes(ids1, np.zeros((len(ids1), 1)))
+        nodes2 = Nodes(ids2, np.zeros((len(ids2), 1)))
+
+        mask1, mask2 = get_node_intersection_masks(nodes1, nodes2)
+
+        self.assertTrue(np.array_equal(mask1, np.array(mask1_null)))
+        self.assertTrue(np.array_equal(mask2, np.array(mask2_null)))
+
+    def test_single_column(self):
+        self._check_masks(
+            np.array([ [1], [3], [5], [7], ]),
+            np.array([ [7], [2], [1], ]),
+            [ True, False, False, True ],
+            [ True, False, True ],
+        )
+
+    def test_composite_key(self):
+        # Each column of (3, 1) is present in ids2, but the pair is not
+        self._check_masks(
+            np.array([ [1, 1], [3, 1], [3, 4], ], dtype = np.int32),
+            np.array([ [3, 4], [1, 1], [2, 3], ], dtype = np.int32),
+            [ True, False, True ],
+            [ True, True, False ],
+        )
+
+    def test_composite_key_negative(self):
+        self._check_masks(
+            np.array([ [-1, -1], [-1, 1], [1, -1], ], dtype = np.int32),
+            np.array([ [1, -1], [-1, -1], ], dtype = np.int32),
+            [ True, False, True ],
+            [ True, True ],
+        )
+
+    def test_composite_key_mixed_dtypes(self):
+        self._check_masks(
+            np.array([ [1, 2], [3, 4], ], dtype = np.int32),
+            np.array([ [3, 4], [2, 1], ], dtype = np.int64),
+            [ False, True ],
+            [ True, False ],
+        )
+
+    def test_wide_key(self):
+        self._check_masks(
+            np.array([ [1, 2, 3], [1, 2, 4], [2**40, 0, 0] ]),
+            np.array([ [1, 2, 4], [2**40, 0, 0], [1, 3, 2] ]),
+            [ False, True, True ],
+            [ True, True, False ],
+        )
+
+    def test_empty(self):
+        self._check_masks(
+            np.zeros((0, 2), dtype = np.int32),
+            np.array([ [1, 2], ], dtype = np.int32),
+            [ ],
+            [ False ],
+        )
+
+    def test_ids_in_set_mask(self):
+        nodes = Nodes(
+            np.array([ [1, 1], [3, 1], [3, 4], ], dtype = np.int32),
+            np.zeros((3, 1)),
+        )
+        mask = nodes.ids_in_set_mask({ (3, 4), (1, 3) })
+
+        self.assertTrue(np.array_equal(mask, [ False, False, True ]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.cli.normalize import NORMALIZE_LOG, main as normalize_main
+from lagrtools.funcs  import load_merged_graph, save_merged_graph
+from lagrtools.meta   import load_dataset_meta, update_dataset_meta
+from lagrtools.shards import ShardWriter, ShardedGraphs
+from lagrtools.normalization import (
+    check_not_normalized, get_dataset_normalization, get_norm_params,
+    normalize_values
+)
+
+class TestsNormalization(unittest.TestCase):
+
+    def test_standartize(self):
+        stats  = {
+            'mean'  : np.array([ 1., 2. ], dtype = np.float32),
+            'stdev' : np.array([ 2., 4. ], dtype = np.float32),
+        }
+        params = get_norm_params(stats, 'standartize', eps = 0)
+        values = normalize_values(np.array([ [ 3., 2. ], [ 1., 6. ] ]), params)
+
+        self.assertEqual(values.dtype, np.float64)
+        self.assertTrue(np.allclose(values, [ [ 1., 0. ], [ 0., 1. ] ]))
+
+        # Stored dtypes are kept
+        for dtype in ( np.float16, np.float32 ):
+            values = normalize_values(
+                np.array([ [ 3., 2. ], [ 1., 6. ] ], dtype = dtype), params
+            )
+
+            self.assertEqual(values.dtype, dtype)
+            self.assertTrue(np.allclose(values, [ [ 1., 0. ], [ 0., 1. ] ]))
+
+        values = normalize_values(np.array([ [ 3, 2 ], [ 1, 6 ] ]), params)
+        self.assertEqual(values.dtype, np.float32)
+
+    def test_robust(self):
+        stats  = {
+            'p25' : np.array([ 0., 1. ], dtype = np.float32),
+            'p50' : np.array([ 1., 2. ], dtype = np.float32),
+            'p75' : np.array([ 2., 5. ], dtype = np.float32),
+        }
+        params = get_norm_params(stats, 'robust', eps = 0)
+        values = normalize_values(np.array([ [ 3., 2. ], [ 1., 6. ] ]), params)
+
+        self.assertTrue(np.allclose(values, [ [ 1., 0. ], [ 0., 1. ] ]))
+
+        with self.assertRaises(ValueError):
+            get_norm_params({ 'mean' : stats['p50'] }, 'robust', eps = 0)
+
+    def test_minmax(self):
+        stats  = {
+            'min' : np.array([ 1., 2. ], dtype = np.float32),
+            'max' : np.array([ 3., 6. ], dtype = np.float32),
+        }
+        params = get_norm_params(stats, 'minmax', eps = 0)
+        values = normalize_values(np.array([ [ 3., 2. ], [ 1., 6. ] ]), params)
+
+        self.assertTrue(np.allclose(values, [ [ 1., 0. ], [ 0., 1. ] ]))
+
+    def test_unknown_norm_type(self):
+        with self.assertRaises(ValueError):
+            get_norm_params({}, 'unknown', eps = 0)
+
+    def test_refuse_twice(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.assertEqual(load_dataset_meta(root), {})
+            check_not_normalized(root)
+
+            update_dataset_meta(
+                root, normalization = { 'norm_type' : 'standartize' }
+            )
+
+            with self.assertRaises(RuntimeError):
+                check_not_normalized(root)
+
+    def test_record_robust(self):
+        stats = {
+            'node:x:a' : {
+                'mean' : [ 0., ], 'stdev' : [ 1., ],
+                'p25'  : [ 1., ], 'p50'   : [ 2., ], 'p75' : [ 5., ],
+            },
+        }
+
+        with tempfile.TemporaryDirectory() as root:
+            with open(
+                os.path.join(root, 'stats.json'), 'wt', encoding = 'utf-8'
+            ) as f:
+                json.dump(stats, f)
+
+            path = os.path.join(root, 'graph.npz')
+            save_merged_graph(
+                path, { ('node', 'x', 'a') : np.array([ [ 2. ], [ 6. ] ]) }
+            )
+
+            with contextlib.redirect_stdout(io.StringIO()), \
+                 contextlib.redirect_stderr(io.StringIO()):
+                normalize_main([ root, '--norm-type', 'robust', '--eps', '0' ])
+
+            normalization = load_dataset_meta(root)['normalization']
+            values        = load_merged_graph(path)[('node', 'x', 'a')]
+
+        self.assertEqual(normalization['norm_type'], 'robust')
+        self.assertEqual(
+            normalization['stats']['node:x:a'],
+            { 'p25' : [ 1., ], 'p50' : [ 2., ], 'p75' : [ 5., ] }
+        )
+        self.assertEqual(
+            normalization['params']['node:x:a'],
+            { 'shift' : [ 2., ], 'scale' : [ 4., ] }
+        )
+        self.assertTrue(np.allclose(values, [ [ 0. ], [ 1. ] ]))
+
+    def test_resume(self):
+        # A run is interrupted by an unreadable target, that is repaired
+        stats = { 'node:x:a' : { 'mean' : [ 1., ], 'stdev' : [ 2., ] } }
+
+        for sharded in ( False, True ):
+            with tempfile.TemporaryDirectory() as root:
+                with open(
+                    os.path.join(root, 'stats.json'), 'wt', encoding = 'utf-8'
+                ) as f:
+                    json.dump(stats, f)
+
+                broken = write_resume_dataset(root, sharded)
+
+                with open(broken, 'rb') as f:
+                    data = f.read()
+
+                with open(broken, 'wb') as f:
+                    f.write(b'broken')
+
+                with self.assertRaises(Exception), run_quietly():
+                    normalize_main([ root, ])
+
+                with self.assertRaises(RuntimeError):
+                    get_dataset_normalization(root)
+
+                with self.assertRaises(RuntimeError):
+                    check_not_normalized(root)
+
+                with self.assertRaises(RuntimeError), run_quietly():
+                    normalize_main([ root, ])
+
+                with open(broken, 'wb') as f:
+                    f.write(data)
+
+                with run_quietly():
+                    normalize_main([ root, '--resume' ])
+
+                self.assertTrue(get_dataset_normalization(root)['complete'])
+                self.assertFalse(
+                    os.path.exists(os.path.join(root, NORMALIZE_LOG))
+                )
+
+                for (idx, values) in enumerate(read_resume_dataset(root)):
+                    self.assertTrue(np.allclose(values, (idx - 1.) / 2))
+
+                with self.assertRaises(RuntimeError), run_quietly():
+                    normalize_main([ root, '--resume' ])
+
+N_RESUME_GRAPHS = 6
+
+def run_quietly():
+    stack = contextlib.ExitStack()
+    stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+    stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+
+    return stack
+
+def write_resume_dataset(root, sharded):
+    # Returns the path of a target in the middle of the dataset
+    graphs = [
+        { ('node', 'x', 'a') : np.full((2, 1), idx, dtype = np.float32) }
+            for idx in range(N_RESUME_GRAPHS)
+    ]
+
+    if not sharded:
+        for (idx, graph) in enumerate(graphs):
+            save_merged_graph(os.path.join(root, f'graph_{idx}'), graph)
+
+        return os.path.join(root, 'graph_3.npz')
+
+    with ShardWriter(root, shard_size = 2) as writer:
+        for (idx, graph) in enumerate(graphs):
+            writer.append(f'graph_{idx}', graph)
+
+    shard_name = ShardedGraphs(root).shard_names[1]
+    return os.path.join(root, shard_name, 'node:x:a.npy')
+
+def read_resume_dataset(root):
+    if os.path.exists(os.path.join(root, 'graph_0.npz')):
+        return [
+            load_merged_graph(os.path.join(root, f'graph_{idx}.npz'))[
+                ('node', 'x', 'a')
+            ]
+                for idx in range(N_RESUME_GRAPHS)
+        ]
+
+    graphs = ShardedGraphs(root)
+    return [ graphs[idx][('node', 'x', 'a')] for idx in range(len(graphs)) ]
+
+if __name__ == '__main__':
+    unittest.main()
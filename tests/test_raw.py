@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.raw import RawClusterFile
+
+ARRAYS = {
+    'cluster_0_bnodes' : np.arange(26, dtype = np.float64).reshape((2, 13)),
+    'cluster_0_cnodes' : np.arange(10, dtype = np.float64).reshape((2, 5)),
+    'cluster_0_bbedges': np.array([ [0, 1], ]),
+    'cluster_0_cbedges': np.array([ [1, 0], ]),
+    'cluster_1_bnodes' : np.zeros((0, 13)),
+    'cluster_1_bbedges': np.zeros((0, 2), dtype = np.int64),
+}
+
+class TestsRaw(unittest.TestCase):
+
+    def _check_file(self, save_func):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'clusters-img-a0.npz')
+            save_func(path, **ARRAYS)
+
+            with RawClusterFile(path) as f:
+                self.assertEqual(f.clusters, [ 'cluster_0', 'cluster_1' ])
+
+                cluster = f.get_cluster('cluster_0')
+                self.assertEqual(
+                    set(cluster.keys()),
+                    { 'bnodes', 'cnodes', 'bbedges', 'cbedges' }
+                )
+
+                for (name, values) in cluster.items():
+                    self.assertTrue(
+                        np.array_equal(values, ARRAYS['cluster_0_' + name])
+                    )
+
+                cluster = f.get_cluster('cluster_1')
+                self.assertEqual(cluster['bnodes'].shape, (0, 13))
+
+                self.assertEqual(len(f.get_cluster('cluster_2')), 0)
+
+    def test_stored(self):
+        self._check_file(np.savez)
+
+    def test_compressed(self):
+        self._check_file(np.savez_compressed)
+
+    def test_mmap_stored(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'clusters-img-a0.npz')
+
+            np.savez(path, **ARRAYS)
+            with RawClusterFile(path) as f:
+                values = f.get_cluster('cluster_0')['bnodes']
+                self.assertIsInstance(values, np.memmap)
+
+            np.savez_compressed(path, **ARRAYS)
+            with RawClusterFile(path) as f:
+                values = f.get_cluster('cluster_0')['bnodes']
+                self.assertNotIsInstance(values, np.memmap)
+
+    def test_feature_config(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'clusters-img-a0.npz')
+            np.savez(path, **ARRAYS)
+
+            with RawClusterFile(path) as f:
+                cluster = f.get_cluster('cluster_0', { 'bnodes' : [] })
+
+                self.assertEqual(
+                    set(cluster.keys()), { 'bnodes', 'bbedges' }
+                )
+
@@ -0,0 +1,113 @@
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+
+try:
+    import torch
+
+    from lagrtools.torch import LAGRDataset
+except ImportError:
+    torch = None
+
+from lagrtools.shards import ShardWriter, ShardedGraphs, is_sharded
+
+from .helpers import make_graphs
+
+GRAPHS = [
+    {
+        ('node', 'x', 'a') : np.array([ [1., 2.], [3., 4.], ]),
+        ('node', 'y', 'a') : np.array([ [1.], [0.], ]),
+        ('edge', 'a', 'a') : np.array([ [0, 1], ]),
+    },
+    {
+        ('node', 'x', 'a') : np.array([ [5., 6.], ]),
+        ('node', 'y', 'a') : np.array([ [1.], ]),
+    },
+    {
+        ('node', 'x', 'a') : np.zeros((0, 2)),
+        ('node', 'y', 'a') : np.zeros((0, 1)),
+        ('edge', 'a', 'a') : np.zeros((0, 2), dtype = np.int64),
+    },
+]
+
+class TestsShards(unittest.TestCase):
+
+    def _check_graphs_equal(self, g1, g2):
+        self.assertEqual(set(g1.keys()), set(g2.keys()))
+
+        for k in g1:
+            self.assertTrue(np.array_equal(g1[k], g2[k]))
+
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.assertFalse(is_sharded(root))
+
+            with ShardWriter(root, shard_size = 2) as writer:
+                for (idx, graph) in enumerate(GRAPHS):
+                    writer.append(f'graph_{idx}', graph)
+
+            self.assertTrue(is_sharded(root))
+            self.assertTrue(os.path.isdir(os.path.join(root, 'shard_000001')))
+
+            graphs = ShardedGraphs(root)
+            self.assertEqual(len(graphs), len(GRAPHS))
+
+            for (idx, graph) in enumerate(GRAPHS):
+                self._check_graphs_equal(graphs[idx], graph)
+
+            graphs = pickle.loads(pickle.dumps(graphs))
+            self._check_graphs_equal(graphs[1], GRAPHS[1])
+
+    def test_edge_layout(self):
+        # Edges of each graph are views of contiguous (2, E) arrays
+        with tempfile.TemporaryDirectory() as root:
+            with ShardWriter(root, shard_size = 3) as writer:
+                for (idx, graph) in enumerate(GRAPHS):
+                    writer.append(f'graph_{idx}', graph)
+
+            shard = ShardedGraphs(root).get_shard(0)
+            edges = shard[0][('edge', 'a', 'a')]
+
+            self.assertTrue(edges.T.flags['C_CONTIGUOUS'])
+            self.assertTrue(np.array_equal(
+                shard.get_array(('edge', 'a', 'a')), np.array([ [0, 1], ])
+            ))
+
+    def test_out_of_range(self):
+        with tempfile.TemporaryDirectory() as root:
+            with ShardWriter(root, shard_size = 2) as writer:
+                writer.append('graph', GRAPHS[0])
+
+            graphs = ShardedGraphs(root)
+
+            with self.assertRaises(IndexError):
+                _ = graphs[1]
+
+    @unittest.skipIf(torch is None, 'torch_geometric is not available')
+    def test_dataset_inplace_transform(self):
+        def transform(data):
+            data['a'].x.mul_(2)
+            return data
+
+        # Stored as float32, which is used without conversions
+        with tempfile.TemporaryDirectory() as root:
+            with ShardWriter(root, shard_size = 2) as writer:
+                for (idx, graph) in enumerate(make_graphs([ 2, 3, 1 ])):
+                    writer.append(f'graph_{idx}', graph)
+
+            dataset = LAGRDataset(root, transform = transform)
+            data1   = dataset[1]
+            data2   = dataset[1]
+
+        expected = torch.full((3, 1), 2.)
+
+        self.assertTrue(torch.equal(data1['a'].x, expected))
+        self.assertTrue(torch.equal(data2['a'].x, expected))
+        self.assertTrue(
+            data2['a', 'a-a', 'a'].edge_index.is_contiguous()
+        )
+
+if __name__ == '__main__':
+    unittest.main()
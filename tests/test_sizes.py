@@ -0,0 +1,179 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+try:
+    import torch
+
+    from lagrtools.torch import LAGRDataset, SizeBucketSampler
+except ImportError:
+    torch = None
+
+from lagrtools.funcs  import save_merged_graph
+from lagrtools.index  import LAYOUT_FILES, LAYOUT_SHARDS, save_dataset_index
+from lagrtools.shards import ShardWriter, load_shards_index
+from lagrtools.sizes  import (
+    GraphSizes, get_merged_graph_sizes, load_graph_sizes, save_graph_sizes
+)
+
+from .helpers import make_graphs
+
+N_GRAPHS = 30
+
+GRAPHS = make_graphs(
+    [ 1 + (7 * idx) % 20 for idx in range(N_GRAPHS) ],
+    edges_per_node = 0.5, n_b_nodes = 2
+)
+
+def get_sizes_dict():
+    return {
+        f'graph_{idx:02d}' : get_merged_graph_sizes(GRAPHS[idx])
+            for idx in range(N_GRAPHS)
+    }
+
+class TestsGraphSizes(unittest.TestCase):
+
+    def test_merged_graph_sizes(self):
+        self.assertEqual(
+            get_merged_graph_sizes(GRAPHS[1]),
+            { 'node:a' : 8, 'node:b' : 2, 'edge:a:b' : 4 }
+        )
+
+    def test_concatenate(self):
+        part1 = GraphSizes.from_dict({ 'x' : { 'node:a' : 3 } })
+        part2 = GraphSizes.from_dict(
+            { 'y' : { 'node:b' : 1, 'edge:b:b' : 2 } }
+        )
+        part3 = GraphSizes.from_dict({})
+
+        sizes = GraphSizes.concatenate([ part1, part3, part2 ])
+
+        self.assertEqual(sizes.names, [ 'x', 'y' ])
+        self.assertEqual(sizes.keys,  [ 'edge:b:b', 'node:a', 'node:b' ])
+        self.assertEqual(sizes.n_nodes.tolist(), [ 3, 1 ])
+        self.assertEqual(sizes.n_edges.tolist(), [ 0, 2 ])
+
+        selected = sizes.select([ 'y', 'x' ])
+        self.assertEqual(selected.n_nodes.tolist(), [ 1, 3 ])
+
+        with self.assertRaises(KeyError):
+            sizes.select([ 'z', ])
+
+    def test_save_load(self):
+        sizes = GraphSizes.from_dict(get_sizes_dict())
+
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'sizes.npz')
+            save_graph_sizes(path, sizes)
+            result = load_graph_sizes(path)
+
+        self.assertEqual(result.names, sizes.names)
+        self.assertEqual(result.keys,  sizes.keys)
+        self.assertTrue(np.array_equal(result.counts, sizes.counts))
+
+@unittest.skipIf(torch is None, 'torch_geometric is not available')
+class TestsSizeBucketSampler(unittest.TestCase):
+
+    def setUp(self):
+        self._sizes = GraphSizes.from_dict(get_sizes_dict())
+
+    def test_budget(self):
+        sampler = SizeBucketSampler(
+            self._sizes, max_nodes = 25, n_buckets = 4
+        )
+        batches = list(sampler)
+
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(
+            sorted(idx for batch in batches for idx in batch),
+            list(range(N_GRAPHS))
+        )
+
+        n_nodes = self._sizes.n_nodes
+
+        for batch in batches:
+            self.assertTrue(
+                (n_nodes[batch].sum() <= 25) or (len(batch) == 1)
+            )
+
+        sampler = SizeBucketSampler(
+            self._sizes, max_edges = 5, max_graphs = 2
+        )
+
+        for batch in sampler:
+            self.assertLessEqual(len(batch), 2)
+            self.assertTrue(
+                (self._sizes.n_edges[batch].sum() <= 5) or (len(batch) == 1)
+            )
+
+        with self.assertRaises(ValueError):
+            SizeBucketSampler(self._sizes)
+
+    def test_epochs(self):
+        sampler = SizeBucketSampler(self._sizes, max_nodes = 30, seed = 1)
+
+        epoch0 = list(sampler)
+        sampler.set_epoch(1)
+        epoch1 = list(sampler)
+        sampler.set_epoch(0)
+
+        self.assertNotEqual(epoch0, epoch1)
+        self.assertEqual(list(sampler), epoch0)
+
+        sampler = SizeBucketSampler(
+            self._sizes, max_graphs = 5, n_buckets = 1, shuffle = False
+        )
+        self.assertEqual(
+            list(sampler)[0],
+            np.argsort(self._sizes.n_nodes, kind = 'stable')[:5].tolist()
+        )
+
+    def test_dataset(self):
+        with tempfile.TemporaryDirectory() as root:
+            root_files  = os.path.join(root, 'files')
+            root_shards = os.path.join(root, 'shards')
+
+            os.makedirs(root_files)
+
+            with ShardWriter(root_shards, shard_size = 7) as writer:
+                # Shards in a different order than the sizes
+                for idx in reversed(range(N_GRAPHS)):
+                    graph = GRAPHS[idx]
+
+                    save_merged_graph(
+                        os.path.join(root_files, f'graph_{idx:02d}'), graph
+                    )
+                    writer.append(f'graph_{idx:02d}', graph)
+
+            names  = [ f'graph_{idx:02d}' for idx in range(N_GRAPHS) ]
+            shards = [ x['name'] for x in load_shards_index(root_shards) ]
+
+            save_dataset_index(
+                root_files, LAYOUT_FILES, names,
+                [ (idx, 0) for idx in range(N_GRAPHS) ],
+                self._sizes.select(names), [], {}
+            )
+            save_dataset_index(
+                root_shards, LAYOUT_SHARDS, names[::-1],
+                [ divmod(idx, 7) for idx in range(N_GRAPHS) ],
+                self._sizes.select(names[::-1]), shards, {}
+            )
+
+            for path in ( root_files, root_shards ):
+                dataset = LAGRDataset(path)
+
+                sizes   = dataset.graph_sizes
+                n_nodes = sizes.counts[:, sizes.keys.index('node:a')]
+
+                self.assertEqual(len(dataset), N_GRAPHS)
+                self.assertEqual(
+                    [ len(dataset[i]['a'].x) for i in range(N_GRAPHS) ],
+                    n_nodes.tolist()
+                )
+
+                sampler = SizeBucketSampler(dataset, max_nodes = 40)
+                self.assertEqual(
+                    sum(len(batch) for batch in sampler), N_GRAPHS
+                )
+
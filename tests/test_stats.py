@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.stats import (
+    PERCENTILES, SKETCH_ALPHA, StatsAccumulator, load_stats_state,
+    save_stats_state
+)
+
+class TestsStats(unittest.TestCase):
+
+    def _check_stats(self, stats, values):
+        result = stats.to_dict()['node:x:a']
+
+        self.assertTrue(np.allclose(result['mean'], np.mean(values, axis = 0)))
+        self.assertTrue(np.allclose(result['var'],  np.var(values, axis = 0)))
+        self.assertTrue(np.allclose(result['min'],  np.min(values, axis = 0)))
+        self.assertTrue(np.allclose(result['max'],  np.max(values, axis = 0)))
+
+    def test_single(self):
+        values = np.random.default_rng(0).normal(size = (100, 3))
+
+        stats = StatsAccumulator()
+        stats.append({ 'node:x:a' : values })
+
+        self._check_stats(stats, values)
+
+    def test_merge(self):
+        values = np.random.default_rng(0).normal(size = (100, 3))
+
+        stats = StatsAccumulator()
+        stats.append({ 'node:x:a' : values[:10] })
+        stats.append({ 'node:x:a' : values[:0] })
+
+        other = StatsAccumulator()
+        other.append({ 'node:x:a' : values[10:70] })
+        other.append({ 'node:x:a' : values[70:] })
+
+        stats += other
+        self._check_stats(stats, values)
+
+    def test_state_roundtrip(self):
+        values = np.random.default_rng(0).normal(size = (100, 3))
+
+        stats = StatsAccumulator()
+        stats.append({ 'node:x:a' : values[:50] })
+
+        stats  = StatsAccumulator.from_state(stats.get_state())
+        stats += StatsAccumulator.from_state({})
+        stats.append({ 'node:x:a' : values[50:] })
+
+        self._check_stats(stats, values)
+
+    def test_large_offset(self):
+        # Sums of squares lose all the precision here
+        values = 1e9 + np.random.default_rng(0).normal(size = (1000, 1))
+
+        stats = StatsAccumulator()
+
+        for chunk in np.split(values, 10):
+            stats.append({ 'node:x:a' : chunk })
+
+        var = stats.to_dict()['node:x:a']['var'][0]
+        self.assertAlmostEqual(var, np.var(values - 1e9), places = 6)
+
+    def test_empty(self):
+        stats = StatsAccumulator()
+        stats.append({ 'node:y:a' : np.zeros((0, 2)) })
+
+        self.assertEqual(stats.names, [ 'node:y:a', ])
+        self.assertEqual(stats.get_state()['node:y:a#count'], 0)
+
+    def test_percentiles(self):
+        rng    = np.random.default_rng(0)
+        values = np.stack(
+            (
+                rng.lognormal(size = 10000),
+                rng.normal(size = 10000),
+                np.zeros(10000),
+            ),
+            axis = 1
+        )
+
+        stats = StatsAccumulator()
+        other = StatsAccumulator()
+
+        stats.append({ 'node:x:a' : values[:3000] })
+        other.append({ 'node:x:a' : values[3000:] })
+
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'stats.npz')
+            save_stats_state(path, stats)
+            stats = load_stats_state(path)
+
+        stats += other
+        result = stats.to_dict()['node:x:a']
+
+        for percentile in PERCENTILES:
+            # Sketch error plus the rank error of a discrete sample
+            expected = np.percentile(values, percentile, axis = 0)
+            self.assertTrue(np.allclose(
+                result[f'p{percentile}'], expected,
+                rtol = 2 * SKETCH_ALPHA, atol = 0.02
+            ))
+
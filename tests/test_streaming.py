@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+try:
+    import torch
+
+    from lagrtools.torch.streaming import (
+        LAGRStreamingDataset, iterate_prefetched, shuffle_buffered
+    )
+except ImportError:
+    torch = None
+
+from lagrtools.funcs  import save_merged_graph
+from lagrtools.shards import ShardWriter
+
+from .helpers import make_graph
+
+N_GRAPHS = 10
+
+def get_graph_ids(graphs):
+    return [ int(g['a'].x[0, 0]) for g in graphs ]
+
+@unittest.skipIf(torch is None, 'torch_geometric is not available')
+class TestsStreaming(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self._tmpdir = tempfile.TemporaryDirectory()
+
+        self._root_files  = os.path.join(self._tmpdir.name, 'files')
+        self._root_shards = os.path.join(self._tmpdir.name, 'shards')
+
+        os.makedirs(self._root_files)
+
+        with ShardWriter(self._root_shards, shard_size = 3) as writer:
+            for idx in range(N_GRAPHS):
+                graph = make_graph(idx)
+
+                save_merged_graph(
+                    os.path.join(self._root_files, f'graph_{idx:02d}'), graph
+                )
+                writer.append(f'graph_{idx}', graph)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_prefetch_order(self):
+        result = list(iterate_prefetched(lambda x: 2 * x, range(20), 3, 4))
+        self.assertEqual(result, [ 2 * x for x in range(20) ])
+
+    def test_shuffle_buffered(self):
+        rng    = np.random.default_rng(0)
+        result = list(shuffle_buffered(range(100), 10, rng))
+
+        self.assertEqual(sorted(result), list(range(100)))
+        self.assertNotEqual(result, list(range(100)))
+
+        # Items are delayed by at most the buffer size
+        self.assertTrue(
+            all(result.index(x) >= x - 10 for x in range(100))
+        )
+
+    def test_epochs(self):
+        for root in (self._root_files, self._root_shards):
+            dataset = LAGRStreamingDataset(
+                root, shuffle_buffer = 4, io_threads = 2, seed = 1
+            )
+            self.assertEqual(len(dataset), N_GRAPHS)
+
+            # The epoch advances by itself, until it is set
+            epoch0 = get_graph_ids(dataset)
+            epoch1 = get_graph_ids(dataset)
+
+            self.assertEqual(sorted(epoch0), list(range(N_GRAPHS)))
+            self.assertEqual(sorted(epoch1), list(range(N_GRAPHS)))
+            self.assertNotEqual(epoch0, epoch1)
+
+            for (epoch, ids) in enumerate([ epoch0, epoch1 ]):
+                dataset.set_epoch(epoch)
+                self.assertEqual(get_graph_ids(dataset), ids)
+                self.assertEqual(get_graph_ids(dataset), ids)
+
+    def test_no_shuffle(self):
+        dataset = LAGRStreamingDataset(self._root_files, shuffle = False)
+        self.assertEqual(get_graph_ids(dataset), list(range(N_GRAPHS)))
+
+    def test_workers(self):
+        for root in (self._root_files, self._root_shards):
+            dataset = LAGRStreamingDataset(root, shuffle_buffer = 4)
+            loader  = torch.utils.data.DataLoader(
+                dataset, batch_size = None, num_workers = 2
+            )
+
+            self.assertEqual(
+                sorted(get_graph_ids(loader)), list(range(N_GRAPHS))
+            )
+
@@ -0,0 +1,175 @@
+import unittest
+import numpy as np
+
+from lagrtools.graph    import Graph, Edges, Nodes
+from lagrtools.subgraph import (
+    SEED_IO, count_masked_nodes, filter_merged_graph, get_k_hop_masks,
+    get_merged_graph_range_tile, get_merged_graph_structure,
+    get_merged_graph_tiles, get_partition_masks, get_tile_seed_ranges,
+    get_unreachable_types
+)
+
+N_NODES = { 'a' : 40, 'b' : 30 }
+
+def get_random_edges(rng, n_src, n_dst, n_edges):
+    return Edges(np.stack(
+        (
+            rng.integers(0, n_src, size = n_edges),
+            rng.integers(0, n_dst, size = n_edges),
+        ),
+        axis = 1
+    ))
+
+def get_naive_k_hop_masks(edges_dict, seeds, n_hops):
+    reached = { name : set() for name in N_NODES }
+
+    for (name, ids) in seeds.items():
+        reached[name].update(int(i) for i in ids)
+
+    for _ in range(n_hops):
+        new = { name : set(ids) for (name, ids) in reached.items() }
+
+        for ((src, dst), edges) in edges_dict.items():
+            for (s, d) in edges.values:
+                if s in reached[src]:
+                    new[dst].add(int(d))
+                if d in reached[dst]:
+                    new[src].add(int(s))
+
+        reached = new
+
+    return {
+        name : np.isin(np.arange(n), list(reached[name]))
+            for (name, n) in N_NODES.items()
+    }
+
+class TestsSubgraph(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+
+        self._edges_dict = {
+            ('a', 'a') : get_random_edges(rng, 40, 40, 30),
+            ('a', 'b') : get_random_edges(rng, 40, 30, 20),
+        }
+
+    def test_k_hop_masks(self):
+        for n_hops in range(4):
+            for seeds in ({ 'a' : [ 0, 5 ] }, { 'b' : [ 3, 3 ], 'a' : [] }):
+                masks = get_k_hop_masks(
+                    N_NODES, self._edges_dict, seeds, n_hops
+                )
+                expected = get_naive_k_hop_masks(
+                    self._edges_dict, seeds, n_hops
+                )
+
+                for name in N_NODES:
+                    self.assertTrue(
+                        np.array_equal(masks[name], expected[name])
+                    )
+
+    def test_directed(self):
+        edges_dict = { ('a', 'b') : Edges(np.array([ [0, 1], [2, 0] ])) }
+
+        masks = get_k_hop_masks(N_NODES, edges_dict, { 'b' : [ 1 ] }, 2, True)
+        self.assertEqual(count_masked_nodes(masks), 1)
+
+        masks = get_k_hop_masks(N_NODES, edges_dict, { 'b' : [ 1 ] }, 2)
+        self.assertEqual(np.flatnonzero(masks['a']).tolist(), [ 0, ])
+
+    def test_partition(self):
+        pieces = get_partition_masks(N_NODES, self._edges_dict, 'a', 20, 1)
+        seeds  = np.concatenate([ s for (s, _) in pieces ])
+
+        self.assertTrue(np.array_equal(seeds, np.arange(N_NODES['a'])))
+
+        for (s, masks) in pieces:
+            self.assertTrue(np.all(masks['a'][s]))
+            self.assertTrue(
+                (count_masked_nodes(masks) <= 20) or (len(s) == 1)
+            )
+
+    def test_graph_k_hop_subgraph(self):
+        nodes_dict = {
+            name : Nodes(np.arange(n)[:, None], np.zeros((n, 1)))
+                for (name, n) in N_NODES.items()
+        }
+        graph = Graph(nodes_dict, self._edges_dict)
+        seeds = { 'a' : np.array([ 1, 2 ]) }
+
+        self.assertEqual(
+            graph.k_hop_subgraph(seeds, 2),
+            graph.filter(graph.k_hop_masks(seeds, 2)),
+        )
+
+        pieces = graph.partition('a', 20, 1)
+        self.assertGreaterEqual(
+            sum(len(g.nodes_dict['a']) for g in pieces), N_NODES['a']
+        )
+
+    def test_merged_graph_tiles(self):
+        merged_graph = {
+            ('node', 'x', 'a') : np.arange(40.)[:, None],
+            ('node', 'x', 'b') : np.arange(30.)[:, None],
+        }
+        merged_graph.update({
+            ('edge', *key) : edges.values
+                for (key, edges) in self._edges_dict.items()
+        })
+
+        n_nodes_dict, edges_dict = get_merged_graph_structure(merged_graph)
+        self.assertEqual(n_nodes_dict, N_NODES)
+
+        masks  = get_k_hop_masks(n_nodes_dict, edges_dict, { 'a' : [ 0 ] }, 1)
+        result = filter_merged_graph(merged_graph, masks)
+        self.assertTrue(np.array_equal(
+            result[('node', 'x', 'a')][:, 0], np.flatnonzero(masks['a'])
+        ))
+
+        tiles = get_merged_graph_tiles(merged_graph, 'a', 20, 1)
+        seeds = np.concatenate([
+            t[('node', 'x', 'a')][t[('node', SEED_IO, 'a')], 0] for t in tiles
+        ])
+        self.assertTrue(np.array_equal(seeds, np.arange(40.)))
+
+        # Single tiles are rebuilt from their seed ranges
+        ranges = get_tile_seed_ranges(n_nodes_dict, edges_dict, 'a', 20, 1)
+        self.assertEqual(len(ranges), len(tiles))
+
+        for (seed_range, tile) in zip(ranges, tiles):
+            result = get_merged_graph_range_tile(
+                merged_graph, 'a', seed_range, 1
+            )
+
+            self.assertEqual(set(result), set(tile))
+            for key in tile:
+                self.assertTrue(np.array_equal(result[key], tile[key]))
+
+        tiles = get_merged_graph_tiles(merged_graph, 'a', 100, 1)
+        self.assertEqual(len(tiles), 1)
+        self.assertTrue(np.all(tiles[0][('node', SEED_IO, 'a')]))
+        self.assertEqual(
+            get_tile_seed_ranges(n_nodes_dict, edges_dict, 'a', 100, 1).shape,
+            (0, 2)
+        )
+
+
+    def test_unreachable_types(self):
+        node_types = [ 'bnodes', 'wnodes', 'cnodes', 'snodes' ]
+        edge_types = [
+            ('bnodes', 'wnodes'), ('cnodes', 'wnodes'), ('bnodes', 'snodes')
+        ]
+
+        self.assertEqual(
+            get_unreachable_types(node_types, edge_types, 'bnodes', 1),
+            [ 'cnodes', ]
+        )
+        self.assertEqual(
+            get_unreachable_types(node_types, edge_types, 'bnodes', 2), []
+        )
+        self.assertEqual(
+            get_unreachable_types(
+                node_types, edge_types, 'bnodes', 2, directed = True
+            ),
+            [ 'cnodes', ]
+        )
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from lagrtools.graph     import load_single_graph_from_dict
+from lagrtools.intersect import graph_intersection
+from lagrtools.raw       import RawClusterFile
+from lagrtools.synthetic import write_raw_files
+
+NODE_COUNTS = {
+    'cnodes' : 20,
+    'wnodes' : 40,
+    'bnodes' : 10,
+    'snodes' : 4,
+    'mnodes' : 5,
+}
+
+class TestsSynthetic(unittest.TestCase):
+
+    def test_write_raw_files(self):
+        rng = np.random.default_rng(0)
+
+        with tempfile.TemporaryDirectory() as root:
+            suffixes = write_raw_files(
+                root, rng, n_files = 2, n_clusters = 3,
+                node_counts = NODE_COUNTS, overlap = 0.5
+            )
+
+            self.assertEqual(suffixes, [ 's0', 's1' ])
+            self.assertEqual(len(os.listdir(root)), 4)
+
+            path_img = os.path.join(root, 'clusters-img-s1.npz')
+            path_tru = os.path.join(root, 'clusters-tru-s1.npz')
+
+            with RawClusterFile(path_img) as file_img, \
+                 RawClusterFile(path_tru) as file_tru:
+                self.assertEqual(len(file_img.clusters), 3)
+
+                graph_img = load_single_graph_from_dict(
+                    file_img.get_cluster('cluster_2')
+                )
+                graph_tru = load_single_graph_from_dict(
+                    file_tru.get_cluster('cluster_2')
+                )
+
+        graph_img, graph_tru = graph_intersection(graph_img, graph_tru)
+
+        for (name, n) in NODE_COUNTS.items():
+            self.assertEqual(len(graph_img.nodes_dict[name].ids), n // 2)
+            self.assertEqual(len(graph_tru.nodes_dict[name].ids), n // 2)
+
@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+import numpy as np
+
+try:
+    import torch
+
+    from lagrtools.torch import LAGRDataset
+except ImportError:
+    torch = None
+
+from lagrtools.shards   import ShardWriter
+from lagrtools.subgraph import SEED_IO
+
+def make_tiled_graph(idx, n_a = 40, n_b = 30):
+    rng = np.random.default_rng(idx)
+
+    def get_edges(n_src, n_dst, n_edges):
+        return np.stack(
+            (
+                rng.integers(0, n_src, size = n_edges),
+                rng.integers(0, n_dst, size = n_edges),
+            ),
+            axis = 1
+        )
+
+    return {
+        ('node', 'x', 'a') : rng.normal(size = (n_a, 1)).astype(np.float32),
+        ('node', 'y', 'a') : np.zeros((n_a, 0), dtype = np.float32),
+        ('node', 'x', 'b') : rng.normal(size = (n_b, 1)).astype(np.float32),
+        ('edge', 'a', 'a') : get_edges(n_a, n_a, 30),
+        ('edge', 'a', 'b') : get_edges(n_a, n_b, 20),
+    }
+
+GRAPHS = [ make_tiled_graph(0), make_tiled_graph(1), make_tiled_graph(2) ]
+
+def get_tile_key(data):
+    # Tiles of a graph differ by their seeds
+    return tuple(data['a'].x[data['a'].seed_mask].flatten().tolist())
+
+def get_merged_tile_key(merged_graph):
+    seed_mask = merged_graph[('node', SEED_IO, 'a')]
+    seeds     = merged_graph[('node', 'x', 'a')][seed_mask]
+
+    return tuple(seeds.flatten().tolist())
+
+@unittest.skipIf(torch is None, 'torch_geometric is not available')
+class TestsTiles(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._root   = self._tmpdir.name
+
+        with ShardWriter(self._root, shard_size = 2) as writer:
+            for (idx, graph) in enumerate(GRAPHS):
+                writer.append(f'graph_{idx}', graph)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def get_dataset(self, **kwargs):
+        return LAGRDataset(
+            self._root, max_nodes = 20, tile_type = 'a', **kwargs
+        )
+
+    def test_seeded_tiles(self):
+        dataset = self.get_dataset(tile_seed = 1)
+        other   = self.get_dataset(tile_seed = 1)
+
+        for index in range(len(dataset)):
+            keys = []
+
+            for epoch in range(10):
+                dataset.set_epoch(epoch)
+                other.set_epoch(epoch)
+
+                key = get_tile_key(dataset[index])
+                self.assertEqual(get_tile_key(dataset[index]), key)
+                self.assertEqual(get_tile_key(other[index]), key)
+
+                keys.append(key)
+
+            # Consecutive epochs go through all the tiles
+            # pylint: disable=protected-access
+            n_tiles = len(dataset._tile_ranges[index])
+            self.assertTrue(1 < n_tiles < 10)
+            self.assertEqual(len(set(keys[:n_tiles])), n_tiles)
+            self.assertEqual(keys[n_tiles], keys[0])
+
+    def test_get_tiles(self):
+        dataset = self.get_dataset(tile_seed = 1)
+
+        for (index, graph) in enumerate(GRAPHS):
+            tiles = dataset.get_tiles(index)
+            keys  = [ get_merged_tile_key(t) for t in tiles ]
+
+            # Every seed is in exactly one tile
+            self.assertGreater(len(tiles), 1)
+            self.assertEqual(
+                sorted(sum(keys, ())),
+                sorted(graph[('node', 'x', 'a')].flatten().tolist())
+            )
+
+            for tile in tiles:
+                self.assertLessEqual(
+                    sum(len(tile[('node', 'x', n)]) for n in ( 'a', 'b' )), 20
+                )
+
+            # Accesses of consecutive epochs return all of them
+            accessed = set()
+
+            for epoch in range(len(tiles)):
+                dataset.set_epoch(epoch)
+                accessed.add(get_tile_key(dataset[index]))
+
+            self.assertEqual(accessed, set(keys))
+
+        untiled = LAGRDataset(self._root).get_tiles(0)
+        self.assertEqual(len(untiled), 1)
+        self.assertTrue(np.array_equal(
+            untiled[0][('node', 'x', 'a')], GRAPHS[0][('node', 'x', 'a')]
+        ))
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -0,0 +1,200 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+
+try:
+    import torch
+
+    from lagrtools.torch.collate    import collate_merged_graphs
+    from lagrtools.torch.dataset    import (
+        LAGRDataset, convert_merged_graph, find_transforms
+    )
+    from lagrtools.torch.transforms import (
+        NodeFeatureNorm, ThresholdLabel, TransformPipeline
+    )
+except ImportError:
+    torch = None
+
+from lagrtools.normalization import get_norm_params, normalize_values
+from lagrtools.shards        import ShardWriter
+
+from .helpers import make_graph
+
+STATS = {
+    'node:x:a' : { 'mean' : [ 1., 2. ], 'stdev' : [ 2., 4. ] },
+    'node:y:a' : { 'mean' : [ 0.5, ],   'stdev' : [ 0.5, ] },
+    'node:x:b' : { 'mean' : [ -1., ],   'stdev' : [ 3., ] },
+}
+
+def make_labeled_graph(idx, n_a, n_b):
+    rng    = np.random.default_rng(idx)
+    result = make_graph(
+        idx, n_nodes = n_a, n_features = 2, n_b_nodes = n_b, rng = rng
+    )
+    result[('node', 'y', 'a')] = rng.integers(0, 2, size = (n_a, 1)) * 1.
+
+    return result
+
+GRAPHS = [
+    make_labeled_graph(0, 3, 1),
+    make_labeled_graph(1, 1, 2),
+    make_labeled_graph(2, 4, 3),
+]
+
+def get_samples_attr(graphs, transform, node, attr):
+    # Per-sample results, concatenated in the order of a batch
+    return torch.cat([
+        transform(convert_merged_graph(g))[node][attr] for g in graphs
+    ])
+
+@unittest.skipIf(torch is None, 'torch_geometric is not available')
+class TestsTransforms(unittest.TestCase):
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._root   = self._tmpdir.name
+
+        with open(
+            os.path.join(self._root, 'stats.json'), 'wt', encoding = 'utf-8'
+        ) as f:
+            json.dump(STATS, f)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_norm_values(self):
+        norm = NodeFeatureNorm(self._root, eps = 0)
+        data = norm(convert_merged_graph(GRAPHS[0]))
+
+        for (name, stats) in STATS.items():
+            _, io_type, node = name.split(':')
+            stats  = { k : np.array(v) for (k, v) in stats.items() }
+            values = normalize_values(
+                GRAPHS[0][('node', io_type, node)],
+                get_norm_params(stats, 'standartize', eps = 0)
+            )
+
+            self.assertTrue(
+                np.allclose(data[node][io_type].numpy(), values, atol = 1e-6)
+            )
+
+    def test_norm_batch(self):
+        norm  = NodeFeatureNorm(self._root)
+        batch = collate_merged_graphs(GRAPHS)
+        x_ptr = batch['a'].x.data_ptr()
+
+        self.assertIs(norm(batch), batch)
+        self.assertEqual(batch['a'].x.data_ptr(), x_ptr)
+
+        for (node, attr) in ( ('a', 'x'), ('a', 'y'), ('b', 'x') ):
+            self.assertTrue(torch.equal(
+                batch[node][attr], get_samples_attr(GRAPHS, norm, node, attr)
+            ))
+
+    def test_norm_sharded(self):
+        # Shards are memory-mapped: the stored features must stay intact
+        with ShardWriter(self._root, shard_size = 2) as writer:
+            for (idx, graph) in enumerate(GRAPHS):
+                writer.append(f'graph_{idx}', graph)
+
+        dataset = LAGRDataset(
+            self._root, transform = NodeFeatureNorm(self._root)
+        )
+        data1 = dataset[0]
+        x1    = data1['a'].x.clone()
+        data2 = dataset[0]
+
+        self.assertTrue(torch.equal(data2['a'].x, x1))
+        self.assertTrue(torch.equal(data1['a'].x, x1))
+        self.assertFalse(torch.equal(
+            x1, torch.from_numpy(GRAPHS[0][('node', 'x', 'a')])
+        ))
+
+    def test_norm_cache(self):
+        norm = NodeFeatureNorm(self._root)
+
+        params = norm.get_tensors(torch.device('cpu'), torch.float32)
+        self.assertIs(
+            norm.get_tensors(torch.device('cpu'), torch.float32), params
+        )
+        self.assertEqual(params[('a', 'x')][0].dtype, torch.float32)
+
+        params = norm.get_tensors(torch.device('cpu'), torch.float64)
+        self.assertEqual(params[('a', 'x')][0].dtype, torch.float64)
+
+        # pylint: disable=protected-access
+        self.assertEqual(pickle.loads(pickle.dumps(norm))._tensors, {})
+
+    def test_threshold_batch(self):
+        label = ThresholdLabel('a', 'x', 'label', feature_index = 1)
+        batch = label(collate_merged_graphs(GRAPHS))
+
+        self.assertEqual(batch['a'].label.shape, (8, 1))
+        self.assertEqual(batch['a'].label.dtype, torch.int32)
+
+        self.assertTrue(torch.equal(
+            batch['a'].label, get_samples_attr(GRAPHS, label, 'a', 'label')
+        ))
+        self.assertTrue(torch.equal(
+            batch['a'].label[:, 0], (batch['a'].x[:, 1] > 0).int()
+        ))
+
+    def test_threshold_index(self):
+        data = convert_merged_graph(GRAPHS[0])
+
+        label = ThresholdLabel('a', 'x', 'label', feature_index = -1)
+        self.assertTrue(torch.equal(
+            label(data)['a'].label[:, 0], (data['a'].x[:, 1] > 0).int()
+        ))
+
+        for feature_index in ( 2, 5, -3 ):
+            label = ThresholdLabel('a', 'x', 'label', feature_index)
+
+            with self.assertRaises(IndexError):
+                label(data)
+
+    def test_pipeline_modes(self):
+        transforms = [
+            NodeFeatureNorm(self._root), ThresholdLabel('a', 'y', 'label')
+        ]
+        pipeline_sample = TransformPipeline(transforms, mode = 'sample')
+        pipeline_batch  = TransformPipeline(
+            transforms, mode = 'batch', device = 'cpu'
+        )
+
+        batches_null = list(pipeline_sample.iterate(
+            [ collate_merged_graphs(GRAPHS), ]
+        ))
+        self.assertFalse(hasattr(batches_null[0]['a'], 'label'))
+
+        # Samples are untouched in the batch mode
+        data = convert_merged_graph(GRAPHS[0])
+        self.assertTrue(torch.equal(
+            pipeline_batch(data)['a'].x,
+            torch.from_numpy(GRAPHS[0][('node', 'x', 'a')]).float()
+        ))
+
+        batch_test = next(pipeline_batch.iterate(
+            [ collate_merged_graphs(GRAPHS), ]
+        ))
+        for attr in ( 'x', 'label' ):
+            self.assertTrue(torch.equal(
+                batch_test['a'][attr],
+                get_samples_attr(GRAPHS, pipeline_sample, 'a', attr)
+            ))
+
+        self.assertEqual(
+            find_transforms(pipeline_batch, NodeFeatureNorm),
+            transforms[:1]
+        )
+
+        with self.assertRaises(ValueError):
+            TransformPipeline(transforms, mode = 'epoch')
+
+if __name__ == '__main__':
+    unittest.main()
+